@@ -9,10 +9,8 @@ st.set_page_config(
 )
 
 def init_session_state():
-    if "sources" not in st.session_state:
-        st.session_state.sources = [] # List of Topic objects (dicts)
-    if "scraped_data" not in st.session_state:
-        st.session_state.scraped_data = {} # {topic_id: [posts]}
+    StorageService.ensure_sources() # List of Topic objects (dicts), persisted in the PostStore
+    # Posts are no longer kept in session_state: see StorageService.get_store()
     if "analysis_results" not in st.session_state:
         st.session_state.analysis_results = {}
     if "api_key" not in st.session_state:
@@ -0,0 +1,101 @@
+"""
+Benchmark du parsing des pages : parse_posts sur une soupe BeautifulSoup vs sur un arbre
+lxml natif (mode fast_parse, XPath compilés).
+
+Génère des pages synthétiques vBulletin et XenForo (posts + habillage réaliste : menus,
+barre latérale, scripts), vérifie que les deux modes produisent les mêmes posts et
+affiche le temps moyen par page.
+
+Usage : python benchmarks/bench_parsing.py [--posts 40] [--runs 20]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from scrapers import fastparse
+from scrapers.vbulletin import VBulletinScraper
+from scrapers.xenforo import XenForoScraper
+
+
+def _chrome(body: str) -> str:
+    """Habillage de page typique d'un forum autour du contenu"""
+    menu = "".join(f'<li class="navtab"><a href="/forum{i}">Sección {i}</a></li>' for i in range(60))
+    sidebar = "".join(
+        f'<div class="block"><h3>Tema {i}</h3><p>Último mensaje por <a href="/u/{i}">usuario{i}</a></p></div>'
+        for i in range(150)
+    )
+    scripts = "".join(f'<script>var cfg{i} = {{"a": {i}, "b": "{"x" * 200}"}};</script>' for i in range(30))
+    return (f'<html><head><title>Foro</title>{scripts}</head><body>'
+            f'<div id="header"><ul class="navbar">{menu}</ul></div>'
+            f'<div id="content">{body}</div><div id="sidebar">{sidebar}</div></body></html>')
+
+
+def vbulletin_page(n_posts: int) -> str:
+    posts = "".join(
+        f'<li class="postbit postcontainer" id="post_{i}"><a id="post{i}"></a>'
+        f'<div class="posthead"><span class="date">{i % 28 + 1} de marzo de 2024</span></div>'
+        f'<div class="userinfo"><a class="username" href="/member.php?u={i}">usuario{i % 7}</a>'
+        f'<span class="usertitle">Miembro</span></div>'
+        f'<div class="content"><div class="quote">cita anterior</div>'
+        f'<blockquote class="postcontent">{"Texto del mensaje número %d. " % i * 20}</blockquote></div>'
+        f'<a class="postcounter" href="/showthread.php?p={i}#post{i}">#{i}</a></li>'
+        for i in range(n_posts)
+    )
+    nav = '<div class="pagenav"><a href="?page=2">2</a><a title="Last Page" href="?page=37">Última</a></div>'
+    return _chrome(f'{nav}<ol id="posts">{posts}</ol>{nav}')
+
+
+def xenforo_page(n_posts: int) -> str:
+    posts = "".join(
+        f'<article class="message message--post js-post" data-content="post-{i}" data-author="usuario{i % 7}">'
+        f'<div class="message-inner"><div class="message-cell message-cell--user">'
+        f'<a class="username" href="/members/{i}/">usuario{i % 7}</a></div>'
+        f'<div class="message-attribution"><a class="u-concealed" href="/threads/t.1/post-{i}">'
+        f'<time datetime="2024-03-12T10:{i % 60:02d}:00+0100">12 Mar 2024</time></a></div>'
+        f'<div class="message-body"><div class="bbWrapper"><blockquote>cita</blockquote>'
+        f'{"Texto del mensaje número %d. " % i * 20}</div></div></div></article>'
+        for i in range(n_posts)
+    )
+    nav = ('<nav class="pageNavWrapper"><ul class="pageNav-main">'
+           '<li class="pageNav-page"><a>1</a></li><li class="pageNav-page"><a>37</a></li></ul></nav>')
+    return _chrome(f'{nav}<div class="block-body">{posts}</div>{nav}')
+
+
+def bench(scraper, html: str, fast: bool, runs: int):
+    start = time.perf_counter()
+    for _ in range(runs):
+        if fast:
+            tree = fastparse.build_tree(html)
+            total = scraper.get_total_pages(tree)
+            posts = scraper.parse_posts(tree, "bench")
+        else:
+            soup = BeautifulSoup(html, 'lxml')
+            total = scraper.get_total_pages(soup)
+            posts = scraper.parse_posts(soup, "bench")
+    return (time.perf_counter() - start) / runs, total, posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=40, help="Posts par page")
+    parser.add_argument("--runs", type=int, default=20, help="Répétitions par mesure")
+    args = parser.parse_args()
+
+    for name, scraper, html in [
+        ("vBulletin", VBulletinScraper(), vbulletin_page(args.posts)),
+        ("XenForo", XenForoScraper(), xenforo_page(args.posts)),
+    ]:
+        full_time, full_total, full_posts = bench(scraper, html, False, args.runs)
+        fast_time, fast_total, fast_posts = bench(scraper, html, True, args.runs)
+        assert (fast_total, fast_posts) == (full_total, full_posts), f"{name}: résultats différents"
+        print(f"{name:10s} {len(html) / 1024:6.0f} Ko, {len(full_posts)} posts | "
+              f"BeautifulSoup {full_time * 1000:7.1f} ms | fast_parse {fast_time * 1000:7.1f} ms | "
+              f"x{full_time / fast_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
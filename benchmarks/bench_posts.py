@@ -0,0 +1,103 @@
+"""
+Benchmark de la représentation des posts en mémoire.
+
+Compare, pour N posts répartis sur quelques auteurs :
+- dicts issus d'un dataclass classique + dataclasses.asdict (ancien Post.to_dict) ;
+- dicts issus de Post.to_dict (slots, construction directe, chaînes internées) ;
+- PostTable (colonnes par sujet) lue via des PostView.
+Affiche le temps de construction et la mémoire allouée par post (tracemalloc).
+
+Usage : python benchmarks/bench_posts.py [--posts 100000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.post import Post
+from models.post_table import PostTable
+
+
+@dataclass
+class LegacyPost:
+    """Post tel qu'il était avant les slots (référence)"""
+    id: str
+    topic_id: str
+    author: str
+    date: datetime
+    content_original: str
+    content_translated: Optional[str] = None
+    url: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['date'] = self.date.isoformat()
+        return data
+
+
+def raw_rows(n: int):
+    """Champs tels que sortis du parsing : chaînes neuves à chaque post (pas d'interning implicite)"""
+    start = datetime(2024, 3, 1)
+    for i in range(n):
+        yield (f"{i}", "".join(["topic-", "1234"]), "".join(["usuario", str(i % 50)]),
+               start + timedelta(minutes=i), f"Mensaje número {i} sobre el tema", f"/showthread.php?p={i}")
+
+
+def legacy_dicts(n):
+    return [LegacyPost(id=i, topic_id=t, author=a, date=d, content_original=c, url=u).to_dict()
+            for i, t, a, d, c, u in raw_rows(n)]
+
+
+def slot_dicts(n):
+    return [Post(id=i, topic_id=t, author=a, date=d, content_original=c, url=u).to_dict()
+            for i, t, a, d, c, u in raw_rows(n)]
+
+
+def table(n):
+    posts = PostTable("topic-1234")
+    for i, t, a, d, c, u in raw_rows(n):
+        posts.add(i, a, d, c, None, u)
+    return posts
+
+
+def measure(build, n):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = build(n)
+    elapsed = time.perf_counter() - t0
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=100000)
+    args = parser.parse_args()
+    n = args.posts
+
+    # Le contenu des messages est le même dans tous les cas : on le déduit pour comparer l'overhead
+    contents, _, content_bytes = measure(lambda k: [(c, u) for _, _, _, _, c, u in raw_rows(k)], n)
+    del contents
+
+    reference = None
+    for name, build in (("asdict", legacy_dicts), ("slots", slot_dicts), ("table", table)):
+        result, elapsed, allocated = measure(build, n)
+        overhead = (allocated - content_bytes) / n
+        print(f"{name:7s} construction {elapsed * 1e6 / n:6.2f} µs/post | "
+              f"mémoire {allocated / n:6.0f} o/post (dont structure ~{overhead:5.0f} o/post)")
+        sample = [dict(p) for p in result[:3]] if name == "table" else result[:3]
+        if reference is None:
+            reference = sample
+        assert sample == reference, f"{name}: posts différents"
+        del result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+import os
+
+# Répertoire des données persistantes (high-water marks, caches...).
+# Surcharger avec la variable d'environnement FORUMTRACKER_DATA_DIR.
+DATA_DIR = os.environ.get(
+    "FORUMTRACKER_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".forumtracker")
+)
+
+
+def data_path(*parts: str) -> str:
+    """Chemin d'un fichier dans DATA_DIR (le répertoire est créé si besoin)"""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,115 @@
+"""
+Lancement sans interface (cron, systemd) : extraction → traduction → analyse planifiées.
+
+Usage :
+    python -m forumtracker run --config forum_sources_config.json
+    python -m forumtracker run --once          # un passage sur les sources dues (cron)
+
+Sans --config, les sources configurées dans l'interface (PostStore) sont utilisées.
+La clé Gemini est lue dans GEMINI_API_KEY (ou --api-key) ; sans clé, pas d'analyse.
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+from typing import List
+from services.post_store import get_post_store
+from services.scheduler import DEFAULT_INSTRUCTIONS, PipelineScheduler
+
+
+def load_sources(path: str) -> List[dict]:
+    """Sources d'un export de configuration (ou d'une sauvegarde JSON complète)"""
+    with open(path, encoding="utf-8") as f:
+        content = json.load(f)
+    data = content.get("data", content) if isinstance(content, dict) else content
+    if isinstance(data, dict):
+        data = data.get("sources", [])
+    if not isinstance(data, list):
+        raise ValueError(f"Format de configuration invalide : {path}")
+    return [source for source in data if source.get("id") and source.get("url")]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="forumtracker", description="Forum Tracker sans interface")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Extraction, traduction et analyse planifiées")
+    run.add_argument("--config", help="Export de configuration des sources (JSON)")
+    run.add_argument("--save-sources", action="store_true",
+                     help="Enregistre les sources de --config dans le store (visibles dans l'interface)")
+    run.add_argument("--once", action="store_true", help="Un seul passage sur les sources dues, puis sortie")
+    run.add_argument("--interval", type=float, default=60,
+                     help="Intervalle par défaut entre deux passages d'un sujet, en minutes "
+                          "(surchargeable par source avec \"interval_minutes\")")
+    run.add_argument("--since-days", type=int, default=7, help="Période couverte par la première extraction")
+    run.add_argument("--max-pages", type=int, default=5)
+    run.add_argument("--delay", type=float, default=1.5, help="Délai entre requêtes vers un même forum (sec)")
+    run.add_argument("--workers", type=int, default=4)
+    run.add_argument("--no-translate", action="store_true")
+    run.add_argument("--source-lang", default="es")
+    run.add_argument("--target-lang", default="fr")
+    run.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"))
+    run.add_argument("--instructions", help="Instruction spéciale ajoutée aux instructions par défaut")
+    run.add_argument("--log-level", default="INFO")
+    return parser
+
+
+def run(args: argparse.Namespace) -> int:
+    store = get_post_store()
+    if args.config:
+        sources = load_sources(args.config)
+        if args.save_sources:
+            store.replace_sources(sources)
+    else:
+        sources = store.get_sources()
+    if not sources:
+        logging.error("Aucune source configurée.")
+        return 1
+
+    instructions = DEFAULT_INSTRUCTIONS
+    if args.instructions:
+        instructions += f"\n- INSTRUCTION SPECIALE : {args.instructions}"
+
+    scheduler = PipelineScheduler(
+        sources, store,
+        interval_minutes=args.interval,
+        since_days=args.since_days,
+        max_pages=args.max_pages,
+        delay=args.delay,
+        max_workers=args.workers,
+        translate=not args.no_translate,
+        source_lang=args.source_lang,
+        target_lang=args.target_lang,
+        api_key=args.api_key,
+        instructions=instructions,
+    )
+    if not args.api_key:
+        logging.warning("GEMINI_API_KEY absente : l'analyse IA est désactivée.")
+
+    if args.once:
+        scheduler.run_once()
+        return 0
+
+    # Arrêt propre sur SIGTERM (systemd) ou Ctrl+C, entre deux passages
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        scheduler.run_forever(stop)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s %(message)s")
+    if args.command == "run":
+        return run(args)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
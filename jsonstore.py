@@ -0,0 +1,49 @@
+import json
+import logging
+import os
+import threading
+from typing import Optional
+from config import data_path
+
+
+class JsonStore:
+    """
+    Petit état persistant (watermarks, état d'analyse, détections, cookies, planning) :
+    un dictionnaire par clé (sujet, domaine, hôte) dans un fichier JSON de DATA_DIR.
+    Chargé à la création ; un fichier illisible est ignoré (on repart de zéro).
+    Les sous-classes modifient self._data sous self._lock puis appellent self._save().
+    """
+
+    FILENAME = "store.json"  # Fichier par défaut dans DATA_DIR
+    LABEL = "État"  # Nom dans le message d'erreur de chargement
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path(self.FILENAME)
+        self._lock = threading.Lock()
+        self._data: dict = self._load()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"{self.LABEL} : fichier illisible ({self.path}), on repart de zéro: {e}")
+            return {}
+
+    def _save(self) -> None:
+        # Écriture atomique : fichier temporaire puis remplacement
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+    def reset(self, key: Optional[str] = None) -> None:
+        """Oublie l'entrée d'une clé, ou toutes les entrées si key est None"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            elif self._data.pop(key, None) is None:
+                return
+            self._save()
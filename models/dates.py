@@ -0,0 +1,221 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Sequence
+import re
+
+# Motifs compilés une seule fois (et non à chaque appel)
+# Horaire HH:MM, éventuellement au format 12 h ("10:00 PM", "10:00pm", "10:00 p.m.")
+MERIDIEM = r'(?:\s*([ap])\.?\s?m\b\.?)?'
+TIME_PATTERN = re.compile(r'(\d{1,2})[:\.](\d{2})' + MERIDIEM)
+CLOCK_PATTERN = re.compile(r'(\d{1,2}):(\d{2})' + MERIDIEM)
+NUMBER_PATTERN = re.compile(r'(\d+)')
+
+
+@dataclass(frozen=True)
+class DateLocale:
+    """Vocabulaire des dates d'une langue de forum"""
+    code: str
+    months: Dict[str, int]
+    today: Tuple[str, ...]
+    yesterday: Tuple[str, ...]
+    # Mots devant être tous présents pour "il y a N minutes" (ex: 'hace' + 'minuto')
+    minutes_ago: Tuple[str, ...]
+    # Mots de liaison retirés avant l'analyse jour / mois / année (ex: ' de ')
+    fillers: Tuple[str, ...] = field(default=())
+
+
+LOCALES: Dict[str, DateLocale] = {
+    'es': DateLocale(
+        code='es',
+        months={
+            'ene': 1, 'enero': 1, 'feb': 2, 'febrero': 2, 'mar': 3, 'marzo': 3,
+            'abr': 4, 'abril': 4, 'may': 5, 'mayo': 5, 'jun': 6, 'junio': 6,
+            'jul': 7, 'julio': 7, 'ago': 8, 'agosto': 8, 'sep': 9, 'septiembre': 9,
+            'oct': 10, 'octubre': 10, 'nov': 11, 'noviembre': 11, 'dic': 12, 'diciembre': 12
+        },
+        today=('hoy',),
+        yesterday=('ayer',),
+        minutes_ago=('hace', 'minuto'),
+        fillers=(' de ',),
+    ),
+    'en': DateLocale(
+        code='en',
+        months={
+            'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3,
+            'apr': 4, 'april': 4, 'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7,
+            'aug': 8, 'august': 8, 'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10,
+            'nov': 11, 'november': 11, 'dec': 12, 'december': 12
+        },
+        today=('today',),
+        yesterday=('yesterday',),
+        minutes_ago=('ago', 'minute'),
+        fillers=(' of ',),
+    ),
+    'fr': DateLocale(
+        code='fr',
+        months={
+            'janv': 1, 'janvier': 1, 'févr': 2, 'février': 2, 'mars': 3, 'avr': 4, 'avril': 4,
+            'mai': 5, 'juin': 6, 'juil': 7, 'juillet': 7, 'août': 8, 'sept': 9, 'septembre': 9,
+            'oct': 10, 'octobre': 10, 'nov': 11, 'novembre': 11, 'déc': 12, 'décembre': 12
+        },
+        today=("aujourd'hui", 'aujourd’hui'),
+        yesterday=('hier',),
+        minutes_ago=('il y a', 'minute'),
+    ),
+    'de': DateLocale(
+        code='de',
+        months={
+            'jan': 1, 'januar': 1, 'feb': 2, 'februar': 2, 'mär': 3, 'märz': 3, 'apr': 4, 'april': 4,
+            'mai': 5, 'jun': 6, 'juni': 6, 'jul': 7, 'juli': 7, 'aug': 8, 'august': 8,
+            'sep': 9, 'sept': 9, 'september': 9, 'okt': 10, 'oktober': 10, 'nov': 11, 'november': 11,
+            'dez': 12, 'dezember': 12
+        },
+        today=('heute',),
+        yesterday=('gestern',),
+        minutes_ago=('vor', 'minute'),
+    ),
+}
+
+
+class DateParser:
+    """
+    Analyse des dates de forums (ISO, relatives "Hoy a las 10:30", absolues "12 de marzo de 2024").
+
+    Les langues sont essayées dans l'ordre donné : l'espagnol en premier reste le chemin
+    rapide, les autres ne coûtent rien tant qu'un mot-clé espagnol suffit. Les résultats
+    sont mémorisés dans un cache LRU borné, indexé par (chaîne brute, minute de référence) :
+    les dates relatives restent justes d'une minute à l'autre, et les chaînes répétées
+    d'une page (en-têtes de jour, "Hoy a las ...") ne sont analysées qu'une fois.
+    """
+
+    def __init__(self, locales: Sequence[str] = ('es', 'en', 'fr', 'de'), cache_size: int = 4096):
+        self.locales = tuple(LOCALES[code] for code in locales)
+        # Table des mois fusionnée ; en cas de conflit, la première langue l'emporte
+        self.months: Dict[str, int] = {}
+        for locale in reversed(self.locales):
+            self.months.update(locale.months)
+        self.fillers = tuple(dict.fromkeys(f for locale in self.locales for f in locale.fillers))
+        self._parse_cached = lru_cache(maxsize=cache_size)(self._parse)
+        self._absolute_cached = lru_cache(maxsize=cache_size)(self._absolute)
+
+    def parse(self, date_str: str, now: Optional[datetime] = None) -> datetime:
+        """Analyse une date ; `now` sert de référence aux dates relatives (défaut : maintenant)"""
+        now = now or datetime.now()
+        if not date_str:
+            return now
+        return self._parse_cached(date_str, now.replace(second=0, microsecond=0))
+
+    def absolute(self, date_str: str) -> Optional[datetime]:
+        """
+        Date entièrement portée par la chaîne (ISO, ou jour, mois et année explicites), sinon
+        None : une date relative ("Hoy a las 10:30", "hace 3 horas"), sans année ou illisible
+        dépend du moment de l'analyse et ne peut pas servir à identifier un post.
+        """
+        if not date_str:
+            return None
+        return self._absolute_cached(date_str)
+
+    @staticmethod
+    def _clock(time_match: re.Match) -> Tuple[int, int]:
+        """(heure, minute) sur 24 h : "10:00 pm" -> (22, 0), "12:15 am" -> (0, 15)"""
+        hour, minute = int(time_match.group(1)), int(time_match.group(2))
+        meridiem = time_match.group(3)
+        if meridiem == 'p' and hour < 12:
+            hour += 12
+        elif meridiem == 'a' and hour == 12:
+            hour = 0
+        return hour, minute
+
+    @classmethod
+    def _at_time(cls, day: datetime, text: str, default: datetime) -> datetime:
+        time_match = TIME_PATTERN.search(text)
+        if time_match:
+            hour, minute = cls._clock(time_match)
+            return day.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return default
+
+    @staticmethod
+    def _parse_iso(date_str: str) -> Optional[datetime]:
+        try:
+            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+
+    def _is_relative(self, date_str_lower: str) -> bool:
+        return any(any(word in date_str_lower for word in locale.today + locale.yesterday)
+                   or all(word in date_str_lower for word in locale.minutes_ago)
+                   for locale in self.locales)
+
+    def _absolute(self, date_str: str) -> Optional[datetime]:
+        iso = self._parse_iso(date_str)
+        if iso:
+            return iso
+        date_str_lower = date_str.lower().strip()
+        if self._is_relative(date_str_lower):
+            return None
+        return self._parse_absolute(date_str_lower, None)
+
+    def _parse(self, date_str: str, now: datetime) -> datetime:
+        # Try ISO first (often found in <time> tags)
+        iso = self._parse_iso(date_str)
+        if iso:
+            return iso
+
+        date_str_lower = date_str.lower().strip()
+
+        # Relative dates
+        for locale in self.locales:
+            if any(word in date_str_lower for word in locale.today):
+                return self._at_time(now, date_str_lower, now)
+
+            if any(word in date_str_lower for word in locale.yesterday):
+                yesterday = now - timedelta(days=1)
+                return self._at_time(yesterday, date_str_lower,
+                                     yesterday.replace(hour=0, minute=0, second=0, microsecond=0))
+
+            if all(word in date_str_lower for word in locale.minutes_ago):
+                minutes = NUMBER_PATTERN.search(date_str_lower)
+                if minutes:
+                    return now - timedelta(minutes=int(minutes.group(1)))
+                return now
+
+        return self._parse_absolute(date_str_lower, now) or now  # Fail safe
+
+    def _parse_absolute(self, date_str_lower: str, now: Optional[datetime]) -> Optional[datetime]:
+        """Dates absolues ("DD de Month de YYYY", "DD Month YYYY", "12. März 2024"...) ; sans `now`, l'année est exigée"""
+        clean_str = date_str_lower
+        for filler in self.fillers:
+            clean_str = clean_str.replace(filler, ' ')
+
+        day, month, year = None, None, None
+        # Time extraction HH:MM (AM / PM compris)
+        clock = CLOCK_PATTERN.search(clean_str)
+        time_part = self._clock(clock) if clock else None
+
+        for part in clean_str.replace(',', '').split():
+            part = part.rstrip('.')
+            if part.isdigit():
+                val = int(part)
+                if val > 1900: year = val
+                elif val <= 31 and day is None: day = val
+            elif part in self.months:
+                month = self.months[part]
+
+        if not year:
+            if now is None:
+                return None
+            year = now.year # Default to current year if missing
+        if not day: day = 1
+
+        if month:
+            dt = datetime(year, month, day)
+            if time_part:
+                dt = dt.replace(hour=time_part[0], minute=time_part[1])
+            return dt
+
+        return None
+
+
+# Parseur partagé utilisé par Post.parse_spanish_date
+default_parser = DateParser()
@@ -1,11 +1,13 @@
-from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
-from typing import Optional
-import re
-
-@dataclass
+import hashlib
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Union
+from models.dates import default_parser
+
+@dataclass(slots=True)
 class Post:
-    id: str
+    id: Optional[str]
     topic_id: str
     author: str
     date: datetime
@@ -13,10 +15,42 @@ class Post:
     content_translated: Optional[str] = None
     url: Optional[str] = None
 
+    def __post_init__(self):
+        # Mêmes chaînes partagées par tous les posts d'un sujet / d'un auteur
+        self.topic_id = sys.intern(self.topic_id)
+        if self.author:
+            self.author = sys.intern(self.author)
+        if not self.id:
+            self.id = self.content_id(self.topic_id, self.author, self.date, self.content_original)
+
+    @staticmethod
+    def content_id(topic_id: str, author: Optional[str], date: Union[datetime, str, None],
+                   content: Optional[str]) -> str:
+        """
+        Identifiant déterministe d'un post sans id natif : hash de (sujet, auteur, date à la
+        minute, contenu aux espaces normalisés). Le même post re-scrapé garde le même id.
+        Au scraping, `date` est la chaîne brute de la page : une date relative ("Hoy a las
+        10:30", "hace 3 horas") ou illisible, dont la valeur analysée change d'un run à
+        l'autre, est laissée hors du hash (voir DateParser.absolute).
+        """
+        if isinstance(date, str):
+            date = default_parser.absolute(date)
+        date_key = date.isoformat(timespec='minutes') if isinstance(date, datetime) else ''
+        content_key = " ".join((content or "").split())
+        raw = "\x00".join((topic_id, author or "", date_key, content_key))
+        return "h-" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
     def to_dict(self) -> dict:
-        data = asdict(self)
-        data['date'] = self.date.isoformat()
-        return data
+        # Construction directe : asdict() fait une copie profonde inutile (champs immuables)
+        return {
+            'id': self.id,
+            'topic_id': self.topic_id,
+            'author': self.author,
+            'date': self.date.isoformat(),
+            'content_original': self.content_original,
+            'content_translated': self.content_translated,
+            'url': self.url,
+        }
 
     @classmethod
     def from_dict(cls, data: dict) -> 'Post':
@@ -39,78 +73,40 @@ class Post:
         - "Ayer a las HH:MM"
         - "DD de Month de YYYY"
         - "DD MMM YYYY"
+        English, French and German forms are also recognised (see models/dates.py).
+        Results are memoized by the shared DateParser.
         """
-        if not date_str:
-            return datetime.now()
+        return default_parser.parse(date_str)
+
 
-        # Try ISO first (often found in <time> tags)
+def post_datetime(post: dict) -> Optional[datetime]:
+    """
+    Date d'un post sérialisé sous forme de datetime naïf (heure locale).
+    Les posts issus de Post.to_dict() portent une date ISO (parfois avec fuseau).
+    """
+    value = post.get('date')
+    if isinstance(value, str):
         try:
-            return datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+            value = datetime.fromisoformat(value)
         except ValueError:
-            pass
-
-        now = datetime.now()
-        date_str_lower = date_str.lower().strip()
-
-        # Relative dates
-        if 'hoy' in date_str_lower:
-            # Extract time
-            time_match = re.search(r'(\d{1,2})[:\.](\d{2})', date_str_lower)
-            if time_match:
-                return now.replace(hour=int(time_match.group(1)), minute=int(time_match.group(2)), second=0, microsecond=0)
-            return now
-
-        if 'ayer' in date_str_lower:
-            yesterday = now - timedelta(days=1)
-            time_match = re.search(r'(\d{1,2})[:\.](\d{2})', date_str_lower)
-            if time_match:
-                return yesterday.replace(hour=int(time_match.group(1)), minute=int(time_match.group(2)), second=0, microsecond=0)
-            return yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        if 'hace' in date_str_lower and 'minuto' in date_str_lower:
-            minutes = re.search(r'(\d+)', date_str_lower)
-            if minutes:
-                return now - timedelta(minutes=int(minutes.group(1)))
-            return now
-
-        # Spanish Month Mapping
-        months = {
-            'enero': 1, 'feb': 2, 'febrero': 2, 'mar': 3, 'marzo': 3,
-            'abr': 4, 'abril': 4, 'may': 5, 'mayo': 5, 'jun': 6, 'junio': 6,
-            'jul': 7, 'julio': 7, 'ago': 8, 'agosto': 8, 'sep': 9, 'septiembre': 9,
-            'oct': 10, 'octubre': 10, 'nov': 11, 'noviembre': 11, 'dic': 12, 'diciembre': 12
-        }
-
-        # Try parsing "DD de Month de YYYY" or "DD Month YYYY"
-        # Remove "de" and extra spaces
-        clean_str = date_str_lower.replace(' de ', ' ').replace(',', '').split()
-
-        # Look for day, month, year
-        day, month, year = None, None, None
-        time_part = None
-
-        for part in clean_str:
-            if part.isdigit():
-                val = int(part)
-                if val > 1900: year = val
-                elif val <= 31 and day is None: day = val
-                elif val <= 31: pass # potential ambiguity, usually day comes first
-            elif part in months:
-                month = months[part]
-            elif ':' in part:
-                 # Time extraction HH:MM
-                 try:
-                     h, m = part.split(':')
-                     time_part = (int(h), int(m))
-                 except: pass
-
-        if not year: year = now.year # Default to current year if missing
-        if not day: day = 1
-
-        if month:
-            dt = datetime(year, month, day)
-            if time_part:
-                dt = dt.replace(hour=time_part[0], minute=time_part[1])
-            return dt
-
-        return now # Fail safe
+            return None
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def posts_after_mark(posts: List[dict], mark: dict) -> List[dict]:
+    """
+    Posts postérieurs à une marque (watermark d'extraction, état d'analyse incrémentale) :
+    ceux qui suivent last_post_id s'il figure dans la liste, sinon (post supprimé, page
+    décalée...) ceux dont la date dépasse last_post_date ; un post sans date est gardé.
+    """
+    ids = [post.get('id') for post in posts]
+    last_post_id = mark.get('last_post_id')
+    if last_post_id and last_post_id in ids:
+        return posts[ids.index(last_post_id) + 1:]
+
+    last_post_date = post_datetime({'date': mark.get('last_post_date')})
+    if last_post_date is None:
+        return posts
+    return [p for p in posts if (post_datetime(p) or datetime.max) > last_post_date]
@@ -0,0 +1,159 @@
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+# Clés exposées par PostView, dans l'ordre de Post.to_dict()
+POST_FIELDS = ('id', 'topic_id', 'author', 'date', 'content_original', 'content_translated', 'url')
+
+
+class PostTable:
+    """
+    Posts d'un sujet stockés en colonnes.
+
+    topic_id n'est stocké qu'une fois, les auteurs sont internés (un pseudo répété sur des
+    milliers de posts ne coûte qu'une chaîne) et les dates sont des timestamps entiers, avec
+    le décalage UTC d'origine pour les dates avec fuseau : date_at restitue exactement la
+    chaîne ISO de Post.to_dict().
+    L'itération produit des PostView : des vues sans copie qui se lisent (et pour
+    content_translated, s'écrivent) comme les dicts de Post.to_dict().
+    """
+    __slots__ = ('topic_id', 'ids', 'authors', 'timestamps', 'offsets', 'contents_original',
+                 'contents_translated', 'urls', '_raw_dates')
+
+    def __init__(self, topic_id: str):
+        self.topic_id = sys.intern(topic_id)
+        self.ids: List[str] = []
+        self.authors: List[str] = []
+        # Date naïve : heure murale lue comme UTC ; avec fuseau : instant réel + décalage (secondes)
+        self.timestamps: List[Optional[int]] = []
+        self.offsets: List[Optional[int]] = []
+        self.contents_original: List[str] = []
+        self.contents_translated: List[Optional[str]] = []
+        self.urls: List[Optional[str]] = []
+        # Dates non ISO ou à la microseconde (rares) conservées telles quelles, par index
+        self._raw_dates: Dict[int, str] = {}
+
+    @classmethod
+    def from_dicts(cls, topic_id: str, posts: Iterable[dict]) -> 'PostTable':
+        table = cls(topic_id)
+        table.extend(posts)
+        return table
+
+    def append(self, post: dict) -> None:
+        self.add(post.get('id'), post.get('author'), post.get('date'), post.get('content_original'),
+                 post.get('content_translated'), post.get('url'))
+
+    def extend(self, posts: Iterable[dict]) -> None:
+        for post in posts:
+            self.append(post)
+
+    def add(self, post_id: str, author: Optional[str], date: Union[datetime, str, None],
+            content_original: Optional[str], content_translated: Optional[str] = None,
+            url: Optional[str] = None) -> None:
+        """Ajoute une ligne (sans passer par un dict)"""
+        timestamp = offset = None
+        if isinstance(date, str):
+            try:
+                parsed = datetime.fromisoformat(date)
+            except ValueError:
+                parsed = None
+            if parsed is None or parsed.microsecond:
+                self._raw_dates[len(self.ids)] = date
+            date = parsed
+        if isinstance(date, datetime) and len(self.ids) not in self._raw_dates:
+            if date.microsecond:
+                self._raw_dates[len(self.ids)] = date.isoformat()
+            elif date.tzinfo is None:
+                timestamp = int(date.replace(tzinfo=timezone.utc).timestamp())
+            else:
+                timestamp = int(date.timestamp())
+                offset = int(date.utcoffset().total_seconds())
+
+        self.ids.append(post_id)
+        self.authors.append(sys.intern(author) if author else author)
+        self.timestamps.append(timestamp)
+        self.offsets.append(offset)
+        self.contents_original.append(content_original)
+        self.contents_translated.append(content_translated)
+        self.urls.append(url)
+
+    def date_at(self, index: int) -> Optional[str]:
+        """Date ISO de la ligne, avec son fuseau d'origine s'il y en avait un, comme dans Post.to_dict()"""
+        timestamp = self.timestamps[index]
+        if timestamp is None:
+            return self._raw_dates.get(index)
+        offset = self.offsets[index]
+        if offset is None:
+            return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None).isoformat()
+        return datetime.fromtimestamp(timestamp, timezone(timedelta(seconds=offset))).isoformat()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator['PostView']:
+        return (PostView(self, i) for i in range(len(self.ids)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [PostView(self, i) for i in range(*index.indices(len(self.ids)))]
+        if index < 0:
+            index += len(self.ids)
+        if not 0 <= index < len(self.ids):
+            raise IndexError(index)
+        return PostView(self, index)
+
+
+class PostView:
+    """Vue d'une ligne de PostTable, avec l'interface d'un dict de post"""
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table: PostTable, index: int):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key: str):
+        table, i = self.table, self.index
+        if key == 'id':
+            return table.ids[i]
+        if key == 'topic_id':
+            return table.topic_id
+        if key == 'author':
+            return table.authors[i]
+        if key == 'date':
+            return table.date_at(i)
+        if key == 'content_original':
+            return table.contents_original[i]
+        if key == 'content_translated':
+            return table.contents_translated[i]
+        if key == 'url':
+            return table.urls[i]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key != 'content_translated':
+            raise KeyError(f"{key} est en lecture seule")
+        self.table.contents_translated[self.index] = value
+
+    def get(self, key: str, default=None):
+        return self[key] if key in POST_FIELDS else default
+
+    def keys(self):
+        return POST_FIELDS
+
+    def __iter__(self):
+        return iter(POST_FIELDS)
+
+    def __len__(self) -> int:
+        return len(POST_FIELDS)
+
+    def __contains__(self, key) -> bool:
+        return key in POST_FIELDS
+
+    def items(self):
+        return [(key, self[key]) for key in POST_FIELDS]
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"PostView({self.to_dict()!r})"
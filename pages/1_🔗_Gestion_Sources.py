@@ -2,6 +2,7 @@ import streamlit as st
 import uuid
 import json
 from scrapers.detector import detect_forum_type
+from scrapers.cache import HttpCache
 from services.storage import StorageService
 from models.topic import Topic
 
@@ -9,6 +10,8 @@ st.set_page_config(page_title="Gestion Sources", page_icon="🔗")
 
 st.title("🔗 Gestion des Sources")
 
+StorageService.ensure_sources()
+
 # --- Formulaire Ajout ---
 with st.expander("➕ Ajouter une nouvelle source", expanded=True):
     with st.form("add_source_form"):
@@ -28,6 +31,8 @@ with st.expander("➕ Ajouter une nouvelle source", expanded=True):
             """)
             cookies_json = st.text_area("Cookies (JSON)", placeholder='[{"name": "cf_clearance", "value": "..."}, ...]')
             user_agent = st.text_input("User-Agent Spécifique", placeholder="Laissez vide pour défaut")
+            use_cache = st.checkbox("Utiliser le cache HTTP disque", value=False,
+                                    help="Une page déjà testée est revalidée au lieu d'être retéléchargée.")
 
         submitted = st.form_submit_button("Ajouter & Tester")
 
@@ -55,8 +60,9 @@ with st.expander("➕ Ajouter une nouvelle source", expanded=True):
                 status_msg.info("⏳ Test de connexion en cours...")
 
                 detected_type = "unknown"
+                http_cache = HttpCache() if use_cache else None
                 if type_choice == "Auto-detect":
-                    d_type, d_msg = detect_forum_type(url, cookies=cookies_dict, user_agent=user_agent)
+                    d_type, d_msg = detect_forum_type(url, cookies=cookies_dict, user_agent=user_agent, cache=http_cache)
                     if d_type != "unknown":
                         detected_type = d_type
                         st.success(f"✅ {d_msg}")
@@ -65,8 +71,9 @@ with st.expander("➕ Ajouter une nouvelle source", expanded=True):
                         detected_type = "auto" # Keep auto if failed, or let user force it
                 else:
                     detected_type = type_choice.lower()
-                    # Just test reachability
-                    d_type, d_msg = detect_forum_type(url, cookies=cookies_dict, user_agent=user_agent)
+                    # Just test reachability (toujours une vraie requête, même pour un domaine connu)
+                    d_type, d_msg = detect_forum_type(url, cookies=cookies_dict, user_agent=user_agent,
+                                                      cache=http_cache, refresh=True)
                     if d_msg.startswith("Accès refusé"):
                         st.error(f"❌ {d_msg}")
                     else:
@@ -82,9 +89,7 @@ with st.expander("➕ Ajouter une nouvelle source", expanded=True):
                     "user_agent": user_agent
                 }
 
-                if "sources" not in st.session_state:
-                    st.session_state.sources = []
-                st.session_state.sources.append(new_topic)
+                StorageService.save_sources(st.session_state.sources + [new_topic])
                 st.success("Source ajoutée avec succès !")
                 st.rerun()
 
@@ -95,7 +100,7 @@ st.subheader("📋 Sources configurées")
 if "sources" not in st.session_state or not st.session_state.sources:
     st.info("Aucune source configurée.")
 else:
-    for idx, source in enumerate(st.session_state.sources):
+    for source in st.session_state.sources:
         with st.container(border=True):
             c1, c2, c3 = st.columns([4, 2, 1])
             with c1:
@@ -106,8 +111,8 @@ else:
                 if source.get('cookies'):
                     st.caption("🍪 Cookies configurés")
             with c3:
-                if st.button("🗑️", key=f"del_{source['id']}"):
-                    st.session_state.sources.pop(idx)
+                if st.button("🗑️", key=f"del_{source['id']}", help="Supprime la source et ses messages extraits"):
+                    StorageService.delete_source(source['id'])
                     st.rerun()
 
 # --- Export/Import ---
@@ -131,7 +136,7 @@ with c_imp:
         data = StorageService.import_from_json(content)
         if isinstance(data, list):
             if st.button("Confirmer l'import (Écrase l'existant)"):
-                st.session_state.sources = data
+                StorageService.save_sources(data)
                 st.success("Configuration importée !")
                 st.rerun()
         else:
@@ -1,15 +1,26 @@
 import streamlit as st
 from datetime import datetime, timedelta
+from urllib.parse import urlparse
 import time
-from scrapers.vbulletin import VBulletinScraper
-from scrapers.xenforo import XenForoScraper
 from models.post import Post
+from services.extraction import ExtractionRunner
+from services.pipeline import StreamingPipeline
+from services.translator import TranslationService
+from services.translation_cache import TranslationCache
+from services.watermarks import WatermarkStore
+from scrapers.base import BaseScraper
+from scrapers.cache import HttpCache
+from scrapers.pool import configure_session_pool, httpx
+from scrapers.ratelimit import get_rate_limiter
+from services.storage import StorageService
 
 st.set_page_config(page_title="Extraction", page_icon="📥")
 
 st.title("📥 Extraction des Messages")
 
-if "sources" not in st.session_state or not st.session_state.sources:
+store = StorageService.get_store()
+
+if not StorageService.ensure_sources():
     st.warning("Veuillez d'abord configurer des sources.")
     st.stop()
 
@@ -45,92 +56,148 @@ with st.container(border=True):
         )
 
         max_pages = st.number_input("Max pages par sujet", min_value=1, value=5)
-        delay = st.number_input("Délai entre requêtes (sec)", min_value=0.5, value=1.5, step=0.5)
+        delay = st.number_input("Délai entre requêtes (sec)", min_value=0.5, value=1.5, step=0.5,
+                                help="Intervalle moyen entre deux requêtes vers un même forum.")
+        burst = st.number_input("Rafale max par forum", min_value=1, max_value=10, value=1,
+                                help="Nombre de requêtes pouvant partir immédiatement avant que le délai ne s'applique.")
+        concurrency = st.number_input("Pages téléchargées en parallèle", min_value=1, max_value=8, value=1,
+                                      help="Au-delà de 1, les pages d'un sujet sont récupérées simultanément "
+                                           "(dans la limite du débit par forum).")
+        host_concurrency = st.number_input("Requêtes simultanées max par forum", min_value=1, max_value=8,
+                                           value=BaseScraper.HOST_CONCURRENCY,
+                                           help="Plafond commun à tous les sujets d'un même forum "
+                                                "(pages en parallèle comprises).")
+        parallel_sources = st.number_input("Forums traités en parallèle", min_value=1, max_value=16, value=4,
+                                           help="Les sujets d'un même forum restent traités l'un après l'autre.")
+        seek = st.checkbox("Aller directement aux pages récentes", value=True,
+                           help="Recherche par dichotomie la première page contenant des messages de la période, "
+                                "au lieu de partir de la page 1.")
+        incremental = st.checkbox("Extraction incrémentale", value=False,
+                                  help="Reprend chaque sujet à la dernière page vue lors de l'extraction précédente "
+                                       "au lieu de repartir de la première page de la période.")
+        use_cache = st.checkbox("Cache HTTP disque", value=False,
+                                help="Conserve les pages téléchargées et les revalide (ETag / Last-Modified) : "
+                                     "les pages inchangées ne sont ni retéléchargées ni re-parsées.")
+        if st.button("🧹 Vider le cache HTTP", help="Supprime les pages conservées : elles seront retéléchargées."):
+            HttpCache().clear()
+            st.success("Cache HTTP vidé.")
+        fast_parse = st.checkbox("Parsing rapide (lxml)", value=True,
+                                 help="Analyse les pages avec lxml et des sélecteurs précompilés ; "
+                                      "repasse automatiquement sur BeautifulSoup si aucun message n'est trouvé.")
+        use_http2 = st.checkbox("HTTP/2 (httpx)", value=False, disabled=httpx is None,
+                                help="Une connexion multiplexée par forum. Nécessite le paquet optionnel httpx[http2].")
+        stream_translate = st.checkbox("Traduire au fil de l'eau (ES → FR)", value=False,
+                                       help="Les messages sont traduits et enregistrés pendant l'extraction, "
+                                            "par petits lots, au lieu d'attendre la page Traduction.")
 
 # --- Runner ---
 if st.button("🚀 Lancer l'extraction", type="primary"):
     selected_sources = [s for s in st.session_state.sources if s['name'] in selected_sources_names]
 
-    st.session_state.scraped_data = {} # Reset current extraction
+    get_rate_limiter().set_defaults(rate=1 / delay, burst=burst)
+    for host in {urlparse(s['url']).netloc for s in selected_sources}:
+        BaseScraper.set_host_concurrency(host, host_concurrency)
+    # Sessions par forum conservées d'un run à l'autre (connexions keep-alive réutilisées)
+    session_pool = configure_session_pool(http2=use_http2)
+    watermarks = WatermarkStore()
+    http_cache = HttpCache() if use_cache else None
+    # Les messages sont fusionnés avec les résultats existants (identifiant stable par post) :
+    # traductions et analyses des messages déjà connus sont conservées
+    counts_before = store.topic_counts()
+
+    scraper_options = dict(delay=delay, concurrency=concurrency, cache=http_cache, fast_parse=fast_parse)
+    translation_cache = TranslationCache() if stream_translate else None
+    if stream_translate:
+        # Extraction, traduction et stockage se chevauchent (files bornées entre les étages)
+        runner = StreamingPipeline(store, TranslationService(cache=translation_cache),
+                                   max_workers=parallel_sources, watermarks=watermarks, **scraper_options)
+    else:
+        runner = ExtractionRunner(max_workers=parallel_sources, watermarks=watermarks, post_store=store,
+                                  **scraper_options)
+    translated_count = 0
+    done_counts = {}
 
     total_sources = len(selected_sources)
     overall_progress = st.progress(0)
     status_text = st.empty()
-
-    for idx, source in enumerate(selected_sources):
-        status_text.markdown(f"**Traitement de : {source['name']}...**")
-
-        # Init Scraper
-        scraper = None
-        ftype = source['forum_type']
-
-        # Auto-resolve if needed (simple heuristic if logic in detector failed or wasn't run)
-        if ftype == 'auto':
-            if 'xenforo' in source['url'] or 'threads' in source['url']: ftype = 'xenforo'
-            else: ftype = 'vbulletin'
-
-        cookies = source.get('cookies')
-        ua = source.get('user_agent')
-
-        if ftype == 'xenforo':
-            scraper = XenForoScraper(delay=delay, cookies=cookies, user_agent=ua)
-        else:
-            scraper = VBulletinScraper(delay=delay, cookies=cookies, user_agent=ua)
-
-        # Progress for this source
-        p_bar = st.progress(0)
-        p_text = st.empty()
-
-        def progress_cb(page, total):
-            pct = min(page / total, 1.0) if total else 0
-            p_bar.progress(pct)
-            p_text.text(f"Page {page}/{total if total else '?'}")
-
-        posts = []
-        generator = scraper.scrape_all_pages(
-            base_url=source['url'],
-            topic_id=source['id'],
-            since_date=since_date,
-            max_pages=max_pages,
-            progress_callback=progress_cb
-        )
-
-        for item in generator:
-            if "error" in item:
-                st.error(f"[{source['name']}] {item['error']}")
-            else:
-                posts.append(item)
-
-        # Store results
-        if posts:
-            st.session_state.scraped_data[source['id']] = posts
-
-        overall_progress.progress((idx + 1) / total_sources)
-        p_text.empty()
-        p_bar.empty()
-
-    status_text.success("✅ Extraction terminée !")
+    status_text.markdown(f"**Extraction de {total_sources} source(s) sur "
+                         f"{len(ExtractionRunner.group_by_host(selected_sources))} forum(s)...**")
+
+    # Une ligne de statut par source, mise à jour depuis les événements du runner
+    source_lines = {source['id']: st.empty() for source in selected_sources}
+    source_progress = {source['id']: 0.0 for source in selected_sources}
+
+    for event in runner.run(selected_sources, since_date=since_date, max_pages=max_pages,
+                            seek=seek, incremental=incremental):
+        if event["type"] == "stored":
+            translated_count += event["translated"]
+            status_text.markdown(f"**Extraction en cours... ({translated_count} message(s) traduit(s))**")
+            continue
+        source = event["source"]
+        if source is None:
+            st.error(event["error"])
+            continue
+        line = source_lines[source['id']]
+
+        if event["type"] == "start":
+            line.text(f"⏳ {source['name']} : démarrage...")
+        elif event["type"] == "progress":
+            total = event["total"]
+            source_progress[source['id']] = min(event["page"] / total, 1.0) if total else 0
+            line.text(f"⏳ {source['name']} : page {event['page']}/{total if total else '?'}")
+        elif event["type"] == "error":
+            st.error(f"[{source['name']}] {event['error']}")
+        elif event["type"] == "done":
+            source_progress[source['id']] = 1.0
+            done_counts[source['id']] = event['count']
+            line.text(f"✅ {source['name']} : {event['count']} message(s)")
+
+        overall_progress.progress(sum(source_progress.values()) / total_sources)
+
+    # Posts écrits dans le store par le runner (en flux : une fois le dernier lot stocké)
+    for source in selected_sources:
+        if source['id'] in done_counts:
+            new_count = store.count_posts(source['id']) - counts_before.get(source['id'], 0)
+            source_lines[source['id']].text(f"✅ {source['name']} : {done_counts[source['id']]} message(s), "
+                                            f"dont {new_count} nouveau(x)")
+    if translation_cache:
+        translation_cache.close()
+    status_text.success(f"✅ Extraction terminée ! ({translated_count} message(s) traduit(s))"
+                        if stream_translate else "✅ Extraction terminée !")
+    # Affichées après le rerun (sinon effacées aussitôt)
+    st.session_state.http_cache_stats = http_cache.stats() if http_cache else None
+    st.session_state.connection_stats = session_pool.stats()
     time.sleep(1)
     st.rerun()
 
+if st.session_state.get("http_cache_stats"):
+    stats = st.session_state.http_cache_stats
+    st.caption(f"Cache HTTP : {stats['hits']} pages inchangées, {stats['misses']} téléchargées, "
+               f"{stats['bytes_saved'] / 1024:.0f} Ko économisés")
+for host, stats in st.session_state.get("connection_stats", {}).items():
+    if stats["reuse_rate"] is not None:
+        st.caption(f"🔌 {host} : {stats['requests']} requêtes sur {stats['connections']} connexion(s) "
+                   f"({stats['reuse_rate']:.0%} de réutilisation)")
+
 # --- Résultats ---
-if st.session_state.get("scraped_data"):
+topic_counts = store.topic_counts()
+if topic_counts:
     st.divider()
-    st.subheader(f"Résultats ({sum(len(p) for p in st.session_state.scraped_data.values())} messages)")
+    st.subheader(f"Résultats ({sum(topic_counts.values())} messages)")
 
-    tabs = st.tabs([s['name'] for s in st.session_state.sources if s['id'] in st.session_state.scraped_data])
+    extracted_sources = [s for s in st.session_state.sources if s['id'] in topic_counts]
+    tabs = st.tabs([s['name'] for s in extracted_sources])
 
-    for i, tab in enumerate(tabs):
-        source = [s for s in st.session_state.sources if s['id'] in st.session_state.scraped_data][i]
-        posts = st.session_state.scraped_data[source['id']]
+    for tab, source in zip(tabs, extracted_sources):
+        count = topic_counts[source['id']]
 
         with tab:
-            st.caption(f"{len(posts)} messages trouvés")
-            for post in posts[:10]: # Show first 10 preview
+            st.caption(f"{count} messages trouvés")
+            for post in store.get_posts(source['id'], limit=10): # Show first 10 preview
                 with st.expander(f"{post.get('author')} - {post.get('date')}"):
                     st.text(post.get('content_original'))
-            if len(posts) > 10:
-                st.info(f"... et {len(posts)-10} autres messages.")
+            if count > 10:
+                st.info(f"... et {count-10} autres messages.")
 
     col1, col2 = st.columns(2)
     with col1:
@@ -1,16 +1,22 @@
 import streamlit as st
 from services.translator import TranslationService
+from services.translation_cache import TranslationCache
+from services.storage import StorageService
 
 st.set_page_config(page_title="Traduction", page_icon="🌐")
 
 st.title("🌐 Traduction ES → FR")
 
-if "scraped_data" not in st.session_state or not st.session_state.scraped_data:
+StorageService.ensure_sources()
+store = StorageService.get_store()
+
+total_posts = store.count_posts()
+if not total_posts:
     st.warning("Aucune donnée extraite à traduire. Veuillez passer par l'étape d'extraction.")
     st.stop()
 
-total_posts = sum(len(p) for p in st.session_state.scraped_data.values())
-st.info(f"{total_posts} messages chargés prêts à être traduits.")
+untranslated = store.count_posts(untranslated_only=True)
+st.info(f"{total_posts} messages chargés ({untranslated} à traduire).")
 
 col1, col2 = st.columns(2)
 with col1:
@@ -18,43 +24,71 @@ with col1:
 with col2:
     target_lang = st.selectbox("Langue cible", ["fr", "en"], index=0)
 
+with st.expander("⚙️ Options avancées"):
+    max_workers = st.slider("Lots traduits en parallèle", 1, 8, 4,
+                            help="Les messages courts sont regroupés en lots d'une seule requête")
+    requests_per_second = st.number_input("Requêtes par seconde (max)", min_value=0.5, max_value=20.0,
+                                          value=5.0, step=0.5)
+    use_cache = st.checkbox("Mémoire de traduction", value=True,
+                            help="Réutilise les traductions déjà faites (persistées sur disque)")
+    if st.button("🧹 Vider la mémoire de traduction", help="Les prochaines traductions repasseront par le service."):
+        translation_cache = TranslationCache()
+        translation_cache.clear()
+        translation_cache.close()
+        st.session_state.pop("translation_cache_stats", None)
+        st.success("Mémoire de traduction vidée.")
+
 if st.button("🌐 Lancer la traduction", type="primary"):
-    translator = TranslationService(source=src_lang, target=target_lang)
+    translation_cache = TranslationCache() if use_cache else None
+    translator = TranslationService(source=src_lang, target=target_lang,
+                                    max_workers=max_workers, requests_per_second=requests_per_second,
+                                    cache=translation_cache)
 
     prog_bar = st.progress(0)
     status = st.empty()
 
-    current_count = 0
+    # Posts non traduits de toutes les sources, par tranches lues dans le store
+    # (les lots de traduction se remplissent mieux qu'avec une source à la fois)
+    done_before = 0
 
-    # Iterate all sources
-    for source_id, posts in st.session_state.scraped_data.items():
-        # Define a callback that updates global progress
-        def batch_cb(done, total):
-            pass # We handle global progress manually below
+    def progress_cb(done, total):
+        current = done_before + done
+        prog_bar.progress(current / max(untranslated, 1))
+        status.text(f"Traduction : {current}/{untranslated}")
 
-        # We process one by one to update global bar
-        for i, post in enumerate(posts):
-            if not post.get('content_translated'):
-                post['content_translated'] = translator.translate_text(post.get('content_original', ''))
+    for posts in store.iter_posts(untranslated_only=True, batch_size=500):
+        translator.translate_posts(posts, progress_callback=progress_cb)
+        store.save_translations(posts, lang=target_lang)
+        done_before += len(posts)
 
-            current_count += 1
-            prog_bar.progress(current_count / total_posts)
-            status.text(f"Traduction : {current_count}/{total_posts}")
+    if translation_cache:
+        stats = translation_cache.stats()
+        st.session_state.translation_cache_stats = stats
+        translation_cache.close()
 
     status.success("✅ Traduction terminée !")
     st.rerun()
 
+if st.session_state.get("translation_cache_stats"):
+    stats = st.session_state.translation_cache_stats
+    st.caption(f"🗄️ Mémoire de traduction : {stats['hits']} réutilisées, {stats['misses']} nouvelles "
+               f"({stats['hit_rate']:.0%} de réutilisation, {stats['entries']} entrées)")
+
 # --- Affichage Résultats ---
 st.divider()
 st.subheader("📋 Résultats")
 
-tabs = st.tabs([s['name'] for s in st.session_state.sources if s['id'] in st.session_state.scraped_data])
-
-for i, tab in enumerate(tabs):
-    source = [s for s in st.session_state.sources if s['id'] in st.session_state.scraped_data][i]
-    posts = st.session_state.scraped_data[source['id']]
+PAGE_SIZE = 20
+topic_counts = store.topic_counts()
+extracted_sources = [s for s in st.session_state.sources if s['id'] in topic_counts]
+tabs = st.tabs([s['name'] for s in extracted_sources])
 
+for tab, source in zip(tabs, extracted_sources):
     with tab:
+        n_pages = max(1, -(-topic_counts[source['id']] // PAGE_SIZE))
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, key=f"page_{source['id']}",
+                               help=f"{n_pages} page(s) de {PAGE_SIZE} messages")
+        posts = store.get_posts(source['id'], offset=(page - 1) * PAGE_SIZE, limit=PAGE_SIZE)
         for post in posts:
             with st.container(border=True):
                 c1, c2 = st.columns([1, 4])
@@ -1,11 +1,17 @@
 import streamlit as st
 from services.analyzer import AnalyzerService
+from services.analysis_cache import AnalysisCache
+from services.analysis_state import AnalysisStateStore
+from services.storage import StorageService
 
 st.set_page_config(page_title="Analyse IA", page_icon="🤖")
 
 st.title("🤖 Analyse IA (Gemini)")
 
-if "scraped_data" not in st.session_state or not st.session_state.scraped_data:
+StorageService.ensure_sources()
+store = StorageService.get_store()
+
+if not store.count_posts():
     st.warning("Pas de données.")
     st.stop()
 
@@ -14,10 +20,9 @@ if not st.session_state.get("api_key"):
     st.error("⚠️ Clé API Gemini manquante. Configurez-la dans le menu latéral ou .streamlit/secrets.toml")
     st.stop()
 
-# Prepare Data
-all_posts = []
-for pid, posts in st.session_state.scraped_data.items():
-    all_posts.extend(posts)
+# Prepare Data (l'analyse porte sur tout le corpus : chargé depuis le store, en tables compactes)
+post_tables = store.load_tables()
+all_posts = [post for table in post_tables.values() for post in table]
 
 translated_count = sum(1 for p in all_posts if p.get('content_translated'))
 st.info(f"📊 {len(all_posts)} messages chargés ({translated_count} traduits) prêts pour analyse.")
@@ -38,8 +43,30 @@ with opts_col2:
 
 custom_instr = st.text_area("📝 Instructions supplémentaires (optionnel)", placeholder="Ex: Focus sur les avis négatifs concernant la livraison...")
 
+with st.expander("⚙️ Options avancées"):
+    chunk_tokens = st.number_input("Taille d'un bloc (tokens estimés)", min_value=2000, max_value=200000,
+                                   value=AnalyzerService.CHUNK_TOKENS, step=2000,
+                                   help="Au-delà, les messages sont analysés par blocs puis fusionnés")
+    max_workers = st.slider("Blocs analysés en parallèle", 1, 8, 4)
+    use_cache = st.checkbox("Réutiliser les analyses en cache", value=True,
+                            help="Mêmes messages + mêmes instructions = pas de nouvel appel à Gemini")
+    if st.button("🧹 Vider le cache d'analyse", help="Les prochaines analyses rappelleront Gemini pour chaque bloc."):
+        AnalysisCache().clear()
+        st.success("Cache d'analyse vidé.")
+    incremental = st.checkbox("Analyse incrémentale par sujet", value=False,
+                              help="Pour les sujets suivis : seuls les nouveaux messages sont envoyés, "
+                                   "avec le résumé précédent, pour mettre l'analyse à jour")
+    use_ranking = st.checkbox("Pré-sélection par pertinence", value=False,
+                              help="Écarte les messages quasi vides et ne garde que les plus pertinents pour "
+                                   "l'instruction supplémentaire (sinon les plus riches et récents), "
+                                   "dans la limite du budget")
+    token_budget = st.number_input("Budget de tokens (pré-sélection)", min_value=1000, max_value=1000000,
+                                   value=AnalyzerService.CHUNK_TOKENS, step=1000, disabled=not use_ranking)
+
 if st.button("🤖 Lancer l'analyse", type="primary"):
-    analyzer = AnalyzerService(st.session_state.api_key)
+    analysis_cache = AnalysisCache() if use_cache else None
+    analyzer = AnalyzerService(st.session_state.api_key, max_workers=max_workers, chunk_tokens=chunk_tokens,
+                               cache=analysis_cache)
 
     # Build Instruction String
     instructions = []
@@ -51,19 +78,65 @@ if st.button("🤖 Lancer l'analyse", type="primary"):
 
     full_instruction = "\n".join(instructions)
 
-    # Format Content
-    formatted_content = AnalyzerService.format_posts_for_analysis(all_posts)
-
-    with st.spinner("Gemini analyse les discussions..."):
-        result = analyzer.analyze_posts(formatted_content, full_instruction)
+    prog_bar = st.progress(0)
+
+    def progress_cb(done, total):
+        prog_bar.progress(done / total, text=f"Blocs analysés : {done}/{total}")
+
+    if incremental:
+        # Un résumé glissant par sujet, mis à jour avec les seuls nouveaux messages
+        state_store = AnalysisStateStore()
+        source_names = {s['id']: s['name'] for s in st.session_state.sources}
+        sections = []
+        with st.spinner("Gemini met à jour les analyses des sujets..."):
+            for source_id, posts in post_tables.items():
+                summary = analyzer.analyze_incremental(source_id, posts, full_instruction, state_store,
+                                                       progress_callback=progress_cb)
+                sections.append(f"## {source_names.get(source_id, source_id)}\n\n{summary}")
+        result = "\n\n".join(sections)
+    else:
+        selected_posts = all_posts
+        if use_ranking:
+            # Requête = instruction saisie par l'utilisateur, pas le gabarit des cases à cocher
+            selected_posts, used_tokens = AnalyzerService.select_relevant_posts(all_posts, custom_instr, token_budget)
+            st.caption(f"🎯 {len(selected_posts)}/{len(all_posts)} messages retenus (~{used_tokens} tokens)")
+
+        # Format Content
+        formatted_content = AnalyzerService.format_posts_for_analysis(selected_posts)
+
+        n_chunks = len(AnalyzerService.chunk_text(formatted_content, chunk_tokens))
+        if n_chunks > 1:
+            st.caption(f"~{AnalyzerService.estimate_tokens(formatted_content)} tokens : analyse en {n_chunks} blocs puis fusion")
+
+        with st.spinner("Gemini analyse les discussions..."):
+            result, failed_chunks = analyzer.analyze_posts(formatted_content, full_instruction,
+                                                           progress_callback=progress_cb)
+        if failed_chunks:
+            # Analyse partielle : signalée à l'écran et dans le rapport enregistré
+            warning = (f"⚠️ Analyse incomplète : {failed_chunks}/{n_chunks} blocs n'ont pas pu être analysés, "
+                       f"une partie des messages n'est pas couverte.")
+            st.warning(f"{warning} Relancez l'analyse : les blocs réussis sont repris du cache.")
+            result = f"> {warning}\n\n{result}"
+
+    if analysis_cache:
+        stats = analysis_cache.stats()
+        st.caption(f"🗄️ Cache d'analyse : {stats['hits']} réponses réutilisées, {stats['misses']} appels à Gemini")
 
     if result:
         st.session_state.analysis_results["last_run"] = result
+        store.add_analysis("incremental" if incremental else "all", result,
+                           instructions=full_instruction, model=analyzer.model_name)
         st.success("Analyse terminée !")
     else:
         st.error("Erreur lors de l'analyse.")
 
 # Display Result
+if "last_run" not in st.session_state.get("analysis_results", {}):
+    # Nouvelle session : dernière analyse persistée
+    latest = store.latest_analysis()
+    if latest:
+        st.session_state.setdefault("analysis_results", {})["last_run"] = latest["result"]
+
 if "analysis_results" in st.session_state and "last_run" in st.session_state.analysis_results:
     st.divider()
     st.subheader("📊 Résultats de l'analyse")
@@ -1,61 +1,106 @@
 import streamlit as st
+import os
+from datetime import datetime, timedelta
 from services.storage import StorageService
-import json
+from services.backup import BackupService
 
 st.set_page_config(page_title="Historique", page_icon="📚")
 
 st.title("📚 Historique & Sauvegardes")
 
+StorageService.ensure_sources()
+store = StorageService.get_store()
+
 # --- Import ---
 st.subheader("📂 Charger une sauvegarde")
-uploaded_file = st.file_uploader("Glisser un fichier JSON ici (Export complet)", type=["json"])
+uploaded_file = st.file_uploader("Glisser une sauvegarde ici (.ndjson.gz, ou ancien export JSON)",
+                                 type=["gz", "json"])
 
 if uploaded_file:
-    try:
-        content = json.load(uploaded_file)
-        if st.button("Restaurer cette sauvegarde"):
-            # Restore everything
-            if "sources" in content: st.session_state.sources = content["sources"]
-            if "scraped_data" in content: st.session_state.scraped_data = content["scraped_data"]
-            if "analysis_results" in content: st.session_state.analysis_results = content["analysis_results"]
-            st.success("Session restaurée avec succès !")
+    if st.button("Restaurer cette sauvegarde"):
+        try:
+            # Lecture en flux : les messages sont fusionnés dans le store par lots
+            restored = BackupService.restore(uploaded_file, store)
+            if restored["sources"]: StorageService.save_sources(restored["sources"])
+            if restored["analysis_results"]: st.session_state.analysis_results = restored["analysis_results"]
+            st.success(f"Session restaurée avec succès ! ({restored['counts']['post']} messages, "
+                       f"format {restored['version']})")
             st.rerun()
-    except Exception as e:
-        st.error(f"Erreur de lecture du fichier : {e}")
+        except Exception as e:
+            st.error(f"Erreur de lecture du fichier : {e}")
 
 st.divider()
 
 # --- Export ---
 st.subheader("💾 Sauvegarder la session actuelle")
 
-# Prepare Full Dump
-full_dump = {
-    "sources": st.session_state.get("sources", []),
-    "scraped_data": st.session_state.get("scraped_data", {}),
-    "analysis_results": st.session_state.get("analysis_results", {})
-}
-
-json_str = StorageService.export_to_json(full_dump)
+topic_counts = store.topic_counts()
+analysis_results = st.session_state.get("analysis_results", {})
 
 col1, col2 = st.columns(2)
 with col1:
     st.info(f"""
     **Statistiques Session :**
-    - Sources : {len(full_dump['sources'])}
-    - Sujets extraits : {len(full_dump['scraped_data'])}
-    - Analyse disponible : {"Oui" if full_dump['analysis_results'] else "Non"}
+    - Sources : {len(st.session_state.get("sources", []))}
+    - Sujets extraits : {len(topic_counts)}
+    - Messages : {sum(topic_counts.values())}
+    - Analyse disponible : {"Oui" if analysis_results or store.latest_analysis() else "Non"}
     """)
 
 with col2:
-    st.download_button(
-        "📥 Télécharger Sauvegarde Complète",
-        data=json_str,
-        file_name="forum_tracker_full_backup.json",
-        mime="application/json",
-        help="Contient sources, messages extraits et analyses."
-    )
+    if st.button("📦 Préparer la sauvegarde complète", help="Contient sources, messages extraits et analyses."):
+        # Écrite sur disque en flux (NDJSON gzip), sans construire de gros JSON en mémoire
+        st.session_state.backup_path = BackupService.export_to_file(
+            store, st.session_state.get("sources", []), analysis_results
+        )
+
+    backup_path = st.session_state.get("backup_path")
+    if backup_path and os.path.exists(backup_path):
+        with open(backup_path, "rb") as f:
+            st.download_button(
+                "📥 Télécharger Sauvegarde Complète",
+                data=f,
+                file_name=os.path.basename(backup_path),
+                mime="application/gzip",
+            )
+        st.caption(f"{os.path.getsize(backup_path) / 1024:.0f} Ko")
+
+# --- Recherche ---
+st.divider()
+st.subheader("🔎 Rechercher dans les messages")
+
+search_query = st.text_input("Mots recherchés", placeholder="Ex: batería garant*  (texte original ou traduit)")
+with st.expander("Filtres"):
+    f1, f2 = st.columns(2)
+    source_names = {s['id']: s['name'] for s in st.session_state.get("sources", [])}
+    with f1:
+        search_topic = st.selectbox("Sujet", [None] + list(topic_counts),
+                                    format_func=lambda t: "Tous" if t is None else source_names.get(t, t))
+        search_author = st.selectbox("Auteur", [None] + store.authors(search_topic),
+                                     format_func=lambda a: "Tous" if a is None else a)
+    with f2:
+        search_from, search_to = None, None
+        if st.checkbox("Filtrer par période"):
+            search_from = st.date_input("Depuis le", value=datetime.now() - timedelta(days=30))
+            search_to = st.date_input("Jusqu'au", value=datetime.now())
+
+if search_query:
+    RESULTS_PER_PAGE = 20
+    result_page = st.number_input("Page de résultats", min_value=1, value=1)
+    total, results = store.search(search_query, search_topic, search_author, search_from, search_to,
+                                  offset=(result_page - 1) * RESULTS_PER_PAGE, limit=RESULTS_PER_PAGE)
+    st.caption(f"{total} message(s) trouvé(s) · page {result_page}/{max(1, -(-total // RESULTS_PER_PAGE))}")
+    for post in results:
+        with st.container(border=True):
+            st.caption(f"👤 {post['author']} · 📅 {post['date']} · {source_names.get(post['topic_id'], post['topic_id'])}")
+            st.markdown(post['snippet'])
 
 # --- Preview Data ---
 st.divider()
 with st.expander("👁️ Aperçu des données brutes (JSON)"):
-    st.json(full_dump)
+    # Aperçu limité aux premiers messages de chaque sujet
+    st.json({
+        "sources": st.session_state.get("sources", []),
+        "scraped_data": {topic_id: store.get_posts(topic_id, limit=20) for topic_id in topic_counts},
+        "analysis_results": analysis_results,
+    })
@@ -1,13 +1,24 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Generator, Dict
+from typing import List, Optional, Generator, Dict, Iterator, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 from urllib.parse import urlparse
-import time
+import threading
 import random
 import requests
 from bs4 import BeautifulSoup
+from lxml import etree
 import logging
 import urllib3
+from models.post import post_datetime, posts_after_mark
+from scrapers import fastparse
+from scrapers.cache import HttpCache, prefetched_pages
+from scrapers.cookies import merge_cookie_header
+from scrapers.pool import SessionPool, get_session_pool
+from scrapers.ratelimit import HostRateLimiter, get_rate_limiter
+from scrapers.retry import CircuitBreaker, RetryPolicy, get_circuit_breaker, get_retry_policy, request_with_retry
 
 # Désactiver les warnings SSL pour le scraping
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -41,73 +52,111 @@ class BaseScraper(ABC):
         'Cache-Control': 'max-age=0',
     }
 
-    MAX_RETRIES = 3
-    RETRY_DELAYS = [2, 5, 10]  # Délais en secondes pour retry
-
-    def __init__(self, delay: float = 1.5, cookies: Optional[Dict] = None, user_agent: Optional[str] = None):
-        self.delay = delay
-        self.session = requests.Session()
+    # Nombre max de requêtes simultanées vers un même hôte, tous scrapers confondus
+    HOST_CONCURRENCY = 4
+    _host_slots: Dict[str, threading.BoundedSemaphore] = {}
+    _host_slots_lock = threading.Lock()
+
+    def __init__(self, delay: float = 1.5, cookies: Optional[Dict] = None, user_agent: Optional[str] = None,
+                 concurrency: int = 1, cache: Optional[HttpCache] = None,
+                 rate_limiter: Optional[HostRateLimiter] = None, fast_parse: bool = False,
+                 pool: Optional[SessionPool] = None, retry_policy: Optional[RetryPolicy] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None):
+        self.delay = delay  # Intervalle min entre requêtes vers un hôte, sauf débit configuré sur le limiteur
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.fast_parse = fast_parse  # Parsing sur arbre lxml natif (XPath compilés) au lieu de BeautifulSoup
+        self.cache = cache  # Cache HTTP disque optionnel (revalidation ETag / Last-Modified)
+        self.concurrency = max(1, concurrency)  # Pages téléchargées en parallèle (1 = séquentiel)
+        self.watermark = None  # High-water mark du dernier scrape_all_pages (voir services/watermarks.py)
+        # Sessions partagées par hôte (connexions keep-alive réutilisées entre sujets et runs) :
+        # headers et cookies propres à cette source sont passés à chaque requête
+        self.pool = pool or get_session_pool()
+        # Backoff avec jitter / Retry-After, et disjoncteur par hôte partagé entre les sujets
+        self.retry_policy = retry_policy or get_retry_policy()
+        self.circuit_breaker = circuit_breaker or get_circuit_breaker()
         self.base_domain = None  # Pour le Referer dynamique
 
         # Update headers
-        headers = self.DEFAULT_HEADERS.copy()
+        self.headers = self.DEFAULT_HEADERS.copy()
         if user_agent:
-            headers['User-Agent'] = user_agent
+            self.headers['User-Agent'] = user_agent
         else:
             # Sélectionner un User-Agent aléatoire pour plus de réalisme
-            headers['User-Agent'] = random.choice(self.USER_AGENTS)
-        self.session.headers.update(headers)
+            self.headers['User-Agent'] = random.choice(self.USER_AGENTS)
 
         # Set cookies if provided
-        if cookies:
-            self.session.cookies.update(cookies)
+        self.cookies = dict(cookies or {})
 
     def _set_referer(self, url: str) -> None:
         """Configure le header Referer basé sur l'URL cible"""
         parsed = urlparse(url)
         base_url = f"{parsed.scheme}://{parsed.netloc}"
-        self.session.headers['Referer'] = base_url
-        self.session.headers['Origin'] = base_url
+        self.headers['Referer'] = base_url
+        self.headers['Origin'] = base_url
         # Mettre à jour Sec-Fetch-Site pour indiquer same-origin après la première requête
         if self.base_domain == parsed.netloc:
-            self.session.headers['Sec-Fetch-Site'] = 'same-origin'
+            self.headers['Sec-Fetch-Site'] = 'same-origin'
         else:
             self.base_domain = parsed.netloc
 
+    @classmethod
+    def set_host_concurrency(cls, host: str, limit: int) -> None:
+        """
+        Fixe le nombre max de requêtes simultanées pour un hôte (ex: 'forum.com').
+        À appeler avant le lancement des scrapers (la page Extraction le règle à chaque run).
+        """
+        with cls._host_slots_lock:
+            cls._host_slots[host] = threading.BoundedSemaphore(max(1, limit))
+
+    @classmethod
+    def _host_slot(cls, url: str) -> threading.BoundedSemaphore:
+        """Sémaphore partagé limitant les requêtes simultanées vers l'hôte de l'URL"""
+        host = urlparse(url).netloc
+        with cls._host_slots_lock:
+            slot = cls._host_slots.get(host)
+            if slot is None:
+                slot = cls._host_slots[host] = threading.BoundedSemaphore(cls.HOST_CONCURRENCY)
+            return slot
+
+    def _throttle(self, url: str) -> None:
+        """Attend le jeton de l'hôte dans le limiteur partagé (remplace les time.sleep entre pages)"""
+        self.rate_limiter.acquire(url, rate=1 / self.delay if self.delay > 0 else 0)
+
     def _make_request_with_retry(self, url: str, timeout: int = 15) -> Optional[requests.Response]:
         """
-        Effectue une requête HTTP avec retry et backoff exponentiel pour les erreurs 403.
-        Retourne la Response ou None si échec après tous les retries.
+        Effectue une requête HTTP selon la politique de retry (voir scrapers/retry.py) :
+        backoff exponentiel avec jitter, Retry-After respecté, disjoncteur par hôte.
+        Retourne la dernière Response ; lève CircuitOpenError si l'hôte est bloqué.
+        Une page déjà téléchargée par la détection du type de forum est reprise telle quelle.
         """
-        self._set_referer(url)
+        prefetched = prefetched_pages.take(url)
+        if prefetched is not None:
+            if self.cache:
+                self.cache.store(url, prefetched)
+            return prefetched
 
-        for attempt in range(self.MAX_RETRIES + 1):
-            try:
-                # verify=False pour éviter les erreurs SSL sur certains sites
-                response = self.session.get(url, timeout=timeout, verify=False)
-
-                if response.status_code == 403:
-                    if attempt < self.MAX_RETRIES:
-                        delay = self.RETRY_DELAYS[attempt]
-                        logging.warning(f"403 reçu, retry {attempt + 1}/{self.MAX_RETRIES} dans {delay}s...")
-                        time.sleep(delay)
-                        # Changer de User-Agent pour le retry
-                        self.session.headers['User-Agent'] = random.choice(self.USER_AGENTS)
-                        continue
-                    else:
-                        return response  # Retourner le 403 après tous les retries
-
-                return response
-
-            except requests.RequestException as e:
-                if attempt < self.MAX_RETRIES:
-                    delay = self.RETRY_DELAYS[attempt]
-                    logging.warning(f"Erreur requête: {e}, retry dans {delay}s...")
-                    time.sleep(delay)
-                    continue
-                raise
-
-        return None
+        self._set_referer(url)
+        cached = self.cache.get(url) if self.cache else None
+
+        def send() -> requests.Response:
+            # verify=False pour éviter les erreurs SSL sur certains sites
+            self._throttle(url)
+            with self._host_slot(url):
+                session = self.pool.get(url)
+                headers = {**self.headers, **HttpCache.conditional_headers(cached)}
+                # Jar de l'hôte (persisté entre runs) + cookies de la source, qui priment
+                cookie_header = merge_cookie_header(session.cookies, self.cookies)
+                if cookie_header:
+                    headers['Cookie'] = cookie_header
+                return session.get(url, timeout=timeout, verify=False, headers=headers)
+
+        def rotate_user_agent(response: Optional[requests.Response]) -> None:
+            # Changer de User-Agent pour le retry après un blocage anti-bot
+            if response is not None and response.status_code == 403:
+                self.headers['User-Agent'] = random.choice(self.USER_AGENTS)
+
+        response = request_with_retry(url, send, self.retry_policy, self.circuit_breaker, rotate_user_agent)
+        return self.cache.resolve(url, cached, response) if self.cache else response
 
     @abstractmethod
     def get_page_url(self, base_url: str, page_num: int) -> str:
@@ -115,116 +164,305 @@ class BaseScraper(ABC):
         pass
 
     @abstractmethod
-    def get_total_pages(self, soup: BeautifulSoup) -> int:
-        """Détecte le nombre total de pages"""
+    def get_total_pages(self, root: fastparse.Node) -> int:
+        """Détecte le nombre total de pages (soupe BeautifulSoup ou arbre lxml, voir scrapers/fastparse.py)"""
         pass
 
     @abstractmethod
-    def parse_posts(self, soup: BeautifulSoup, topic_id: str) -> List[dict]:
-        """Parse les posts d'une page"""
+    def parse_posts(self, root: fastparse.Node, topic_id: str) -> List[dict]:
+        """Parse les posts d'une page (soupe BeautifulSoup ou arbre lxml)"""
         pass
 
+    def _fetch_page(self, url: str, page: int) -> Tuple[Optional[requests.Response], Optional[dict]]:
+        """
+        Télécharge une page.
+        Retourne (response, None) ou (None, dict d'erreur) si la page est inaccessible.
+        """
+        try:
+            response = self._make_request_with_retry(url, timeout=15)
+
+            if response is None:
+                return None, {"error": "Impossible de se connecter après plusieurs tentatives.", "page": page}
+
+            if response.status_code == 403:
+                return None, {
+                    "error": "Accès refusé (403) après plusieurs tentatives. Protection anti-bot détectée.\n"
+                             "Solutions:\n"
+                             "1. Ajoutez des cookies Cloudflare (cf_clearance) dans les options avancées\n"
+                             "2. Utilisez l'extension 'Cookie-Editor' pour exporter les cookies du site\n"
+                             "3. Augmentez le délai entre les requêtes",
+                    "page": page
+                }
+
+            response.raise_for_status()
+        except requests.RequestException as e:
+            return None, {"error": str(e), "page": page}
+
+        return response, None
+
+    def _parse_fast(self, html: str, topic_id: str) -> Optional[Tuple[int, List[dict]]]:
+        """
+        Parsing rapide : même routine d'extraction (parse_posts / get_total_pages), appliquée
+        à un arbre lxml natif avec les sélecteurs XPath compilés, sans construire de soupe.
+        Retourne (total_pages, posts), ou None s'il ne trouve aucun post (mise en page
+        inattendue) : le chemin BeautifulSoup prend alors le relais.
+        """
+        try:
+            tree = fastparse.build_tree(html)
+        except (ValueError, etree.ParserError) as e:
+            logging.warning(f"Parsing rapide impossible, retour à BeautifulSoup: {e}")
+            return None
+
+        total_pages = self._detect_total_pages(tree)
+        posts = self.parse_posts(tree, topic_id)
+        if not posts:
+            return None
+        return total_pages, posts
+
+    def _load_page(self, base_url: str, page: int, topic_id: str) -> Tuple[Optional[int], List[dict], Optional[dict]]:
+        """
+        Télécharge et parse une page.
+        Retourne (total_pages, posts, erreur) où total_pages est le nombre de pages annoncé
+        par la pagination de cette page. total_pages vaut None si la page n'a pas pu être
+        récupérée (erreur bloquante) ; une erreur de parsing seule n'interrompt pas le scraping.
+        Une page revalidée par le cache HTTP (304) n'est pas re-parsée.
+        """
+        url = self.get_page_url(base_url, page)
+        response, error = self._fetch_page(url, page)
+        if response is None:
+            return None, [], error
+
+        if getattr(response, 'from_cache', False):
+            parsed = self.cache.get_parsed(url, topic_id, response)
+            if parsed:
+                return parsed['total_pages'], parsed['posts'], None
+
+        fast_result = None
+        if self.fast_parse:
+            try:
+                fast_result = self._parse_fast(response.text, topic_id)
+            except Exception as e:
+                logging.warning(f"Erreur de parsing rapide sur la page {page}, retour à BeautifulSoup: {e}")
+
+        if fast_result:
+            total_pages, posts = fast_result
+        else:
+            soup = BeautifulSoup(response.text, 'lxml')
+            total_pages = self._detect_total_pages(soup)
+            try:
+                posts = self.parse_posts(soup, topic_id)
+            except Exception as e:
+                return total_pages, [], {"error": f"Erreur de parsing sur la page {page}: {str(e)}", "page": page}
+
+        if self.cache:
+            self.cache.store_parsed(url, topic_id, total_pages, posts, response)
+        return total_pages, posts, None
+
+    def _load_pages_sequentially(self, base_url: str, pages: range, topic_id: str,
+                                 preloaded: Optional[Dict[int, tuple]] = None) -> Iterator[tuple]:
+        """
+        Charge les pages une par une (le débit est réglé par le limiteur partagé).
+        Les pages déjà présentes dans preloaded (ex: sondes du mode seek) ne sont pas retéléchargées.
+        """
+        preloaded = preloaded or {}
+        for page in pages:
+            if page in preloaded:
+                yield (page, *preloaded.pop(page))
+                continue
+            yield (page, *self._load_page(base_url, page, topic_id))
+
+    def _load_pages_concurrently(self, base_url: str, pages: range, topic_id: str,
+                                 preloaded: Optional[Dict[int, tuple]] = None) -> Iterator[tuple]:
+        """
+        Charge les pages en parallèle (au plus self.concurrency en vol) et les restitue
+        dans l'ordre. Le plafond par hôte et le limiteur de débit restent appliqués.
+        """
+        preloaded = preloaded or {}
+        pages = iter(pages)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            def submit(page: int) -> None:
+                if page in preloaded:
+                    future = Future()
+                    future.set_result(preloaded.pop(page))
+                else:
+                    future = executor.submit(self._load_page, base_url, page, topic_id)
+                pending.append((page, future))
+
+            try:
+                for page in islice(pages, self.concurrency):
+                    submit(page)
+
+                while pending:
+                    page, future = pending.popleft()
+                    next_page = next(pages, None)
+                    if next_page is not None:
+                        submit(next_page)
+                    yield (page, *future.result())
+            finally:
+                # Le consommateur a arrêté (erreur, break...) : on abandonne les pages en attente
+                for _, future in pending:
+                    future.cancel()
+
+    def _detect_total_pages(self, root: fastparse.Node) -> int:
+        try:
+            detected_total = self.get_total_pages(root)
+            return detected_total if detected_total > 0 else 1
+        except Exception as e:
+            logging.warning(f"Erreur detection pages: {e}")
+            return 1
+
+    def _seek_start_page(self, base_url: str, topic_id: str, since_date: datetime, total_pages: int,
+                         loaded: Dict[int, tuple]) -> int:
+        """
+        Trouve la première page susceptible de contenir des posts >= since_date.
+
+        Les sujets étant chronologiques, la date du premier post de chaque page croît avec
+        le numéro de page : on sonde la dernière page puis on fait une recherche dichotomique
+        (O(log n) requêtes). Les pages sondées sont conservées dans loaded pour ne pas être
+        retéléchargées. Une page sans date exploitable est traitée comme récente (prudent).
+        """
+        def first_post_date(page: int) -> Optional[datetime]:
+            if page not in loaded:
+                loaded[page] = self._load_page(base_url, page, topic_id)
+            total, posts, _ = loaded[page]
+            if total is None:
+                raise LookupError(page)
+            for post in posts:
+                post_date = post_datetime(post)
+                if post_date is not None:
+                    return post_date
+            return None
+
+        def is_old(page: int) -> bool:
+            post_date = first_post_date(page)
+            return post_date is not None and post_date < since_date
+
+        try:
+            if not is_old(1):
+                return 1
+            if is_old(total_pages):
+                return total_pages
+
+            # Invariant : la page lo commence avant since_date, la page hi après
+            lo, hi = 1, total_pages
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if is_old(mid):
+                    lo = mid
+                else:
+                    hi = mid
+            return lo
+        except LookupError as e:
+            # Sonde impossible : on repart de la page 1, l'erreur sera remontée au scraping
+            logging.warning(f"Seek: page {e} inaccessible, scraping depuis la page 1")
+            return 1
+
+    def _filter_posts(self, posts: List[dict], since_date: datetime) -> Iterator[dict]:
+        """
+        Filtre les posts par date.
+        Les sujets sont chronologiques (page 1 = plus anciens) : un post trop ancien est ignoré
+        mais on continue, les suivants peuvent être plus récents.
+        Un post sans date est conservé pour vérification manuelle.
+        """
+        for post in posts:
+            post_date = post_datetime(post)
+            if post_date is None or post_date >= since_date:
+                yield post
+
+    def _advance_watermark(self, page: int, posts: List[dict]) -> None:
+        """Met à jour self.watermark avec le dernier post (filtré ou non) de la page"""
+        if posts:
+            last_post = posts[-1]
+            self.watermark = {
+                "last_page": page,
+                "last_post_id": last_post.get('id'),
+                "last_post_date": last_post.get('date'),
+            }
+
     def scrape_all_pages(
         self,
         base_url: str,
         topic_id: str,
         since_date: datetime,
         max_pages: int = 10,
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        seek: bool = False,
+        watermark: Optional[dict] = None
     ) -> Generator[dict, None, None]:
         """
         Scrape toutes les pages avec pagination.
-        Yield les posts un par un pour feedback temps réel.
+        Yield les posts un par un pour feedback temps réel, toujours dans l'ordre des pages.
+
+        La page 1 est chargée seule (elle donne le nombre total de pages). Si concurrency > 1,
+        les pages suivantes sont ensuite téléchargées en parallèle, jusqu'au total détecté.
+
+        Avec seek=True, on saute directement à la première page contenant des posts
+        >= since_date (voir _seek_start_page) puis on scrape max_pages pages à partir de là.
+        La progression est alors rapportée relativement à cette page de départ.
+
+        Avec un watermark (high-water mark d'un run précédent : last_page, last_post_id,
+        last_post_date), on reprend directement à last_page et seuls les posts postérieurs
+        au dernier post vu sont émis ; seek est alors ignoré. Si last_page n'existe plus,
+        la marque est abandonnée et le scraping repart comme sans watermark. À la fin,
+        self.watermark contient la nouvelle marque à persister.
         """
-        page = 1
-        total_pages = None
+        self.watermark = dict(watermark) if watermark else None
+        first_page = (watermark.get('last_page') or 1) if watermark else 1
+
+        detected_total, posts, error = self._load_page(base_url, first_page, topic_id)
+        if first_page > 1 and (detected_total is None or detected_total < first_page or not posts):
+            # Page de reprise disparue (sujet élagué, posts supprimés : 404 ou hors limites) :
+            # on repart sans marque (seek ou page 1), la nouvelle marque remplacera l'ancienne
+            logging.warning(f"Reprise impossible à la page {first_page} du sujet {topic_id}, "
+                            f"nouveau départ sans watermark")
+            watermark = self.watermark = None
+            first_page = 1
+            detected_total, posts, error = self._load_page(base_url, first_page, topic_id)
+        if detected_total is None:
+            yield error
+            return
+
+        # Le total de pages est celui annoncé par la première page chargée
+        loaded = {first_page: (detected_total, posts, error)}
+        detected_total = max(detected_total, first_page)
+
+        if watermark:
+            start_page = first_page
+            last_page = min(detected_total, start_page + max_pages - 1)
+        elif seek:
+            start_page = self._seek_start_page(base_url, topic_id, since_date, detected_total, loaded)
+            last_page = min(detected_total, start_page + max_pages - 1)
+        else:
+            start_page, last_page = 1, min(detected_total, max_pages)
+        total_pages = last_page - start_page + 1
+
+        # Dans tous les modes, on s'arrête au total détecté (max_pages n'est qu'un plafond) :
+        # au-delà, le forum répond 404 ou renvoie la dernière page (doublons, marque invalide)
+        following = range(start_page + 1, last_page + 1)
+        loader = self._load_pages_concurrently if self.concurrency > 1 else self._load_pages_sequentially
+        remaining = loader(base_url, following, topic_id, loaded)
+
+        page = start_page
+        page_total, posts, error = loaded.pop(start_page)
+        while True:
+            if page_total is None:
+                yield error
+                remaining.close()
+                break
+
+            # Callback progression
+            if progress_callback:
+                progress_callback(page - start_page + 1, total_pages)
+
+            if error:
+                yield error
 
-        while page <= max_pages:
-            url = self.get_page_url(base_url, page)
+            new_posts = posts_after_mark(posts, watermark) if watermark and page == start_page else posts
+            yield from self._filter_posts(new_posts, since_date)
+            self._advance_watermark(page, posts)
 
             try:
-                response = self._make_request_with_retry(url, timeout=15)
-
-                if response is None:
-                    yield {"error": "Impossible de se connecter après plusieurs tentatives.", "page": page}
-                    break
-
-                if response.status_code == 403:
-                    yield {
-                        "error": "Accès refusé (403) après plusieurs tentatives. Protection anti-bot détectée.\n"
-                                 "Solutions:\n"
-                                 "1. Ajoutez des cookies Cloudflare (cf_clearance) dans les options avancées\n"
-                                 "2. Utilisez l'extension 'Cookie-Editor' pour exporter les cookies du site\n"
-                                 "3. Augmentez le délai entre les requêtes",
-                        "page": page
-                    }
-                    break
-
-                response.raise_for_status()
-                soup = BeautifulSoup(response.text, 'lxml')
-
-                # Détecte le total de pages à la première itération
-                if total_pages is None:
-                    try:
-                        detected_total = self.get_total_pages(soup)
-                        total_pages = min(detected_total, max_pages) if detected_total > 0 else 1
-                    except Exception as e:
-                        logging.warning(f"Erreur detection pages: {e}")
-                        total_pages = 1
-
-                # Callback progression
-                if progress_callback:
-                    progress_callback(page, total_pages)
-
-                # Parse les posts
-                try:
-                    posts = self.parse_posts(soup, topic_id)
-                except Exception as e:
-                    yield {"error": f"Erreur de parsing sur la page {page}: {str(e)}", "page": page}
-                    posts = []
-
-                stop_scraping = False
-                for post in posts:
-                    # 'date' is expected to be a datetime object here (parsed by the subclass)
-                    post_date = post.get('date')
-
-                    if post_date:
-                        # Logic:
-                        # If post_date >= since_date: keep it.
-                        # If post_date < since_date: discard it AND stop scraping if threads are chronological.
-                        # Usually threads are chronological (oldest first).
-                        # So if we find a post OLDER than since_date, it means we are at the beginning of the thread (page 1).
-                        # Wait, normal scraping goes Page 1 -> Page N.
-                        # Page 1 has OLDEST posts. Page N has NEWEST posts.
-                        # If user wants posts SINCE Jan 1st 2025:
-                        # - We should probably check the LAST page first? Or filter as we go?
-                        # Standard scraping: Start Page 1.
-                        # Post 1 (2020) < 2025 -> Skip.
-                        # ...
-                        # Post X (2025) >= 2025 -> Keep.
-                        #
-                        # Optimization: If we know threads are chronological (Page 1 = Oldest),
-                        # we iterate normally. We just skip posts until we hit the date.
-                        # We do NOT stop scraping if date < since_date. We continue until we find newer posts.
-                        #
-                        # BUT, if the user only wants "Last 24h", we might want to start from the LAST page?
-                        # The requirements say "Scrape messages with pagination management".
-                        # Let's keep it simple: Start Page 1, scrape everything, filter by date.
-                        # If max_pages is hit, we stop.
-
-                        if post_date >= since_date:
-                            yield post
-                        else:
-                            # Too old, but maybe subsequent posts are newer.
-                            pass
-                    else:
-                        # No date found, yield anyway or log? Let's yield for manual check
-                        yield post
-
-                page += 1
-                if page <= max_pages:
-                    time.sleep(self.delay)
-
-            except requests.RequestException as e:
-                yield {"error": str(e), "page": page}
+                page, page_total, posts, error = next(remaining)
+            except StopIteration:
                 break
@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional, Dict, List
+import requests
+from config import DATA_DIR
+
+
+class HttpCache:
+    """
+    Cache disque (opt-in) des réponses HTTP, indexé par URL.
+
+    Chaque entrée est un fichier JSON compressé (gzip) contenant le corps de la page et ses
+    validateurs ETag / Last-Modified. Les requêtes suivantes sont revalidées avec
+    If-None-Match / If-Modified-Since : sur un 304, le corps est servi depuis le disque, et
+    les posts déjà parsés pour ce sujet sont réutilisés tels quels (pas de re-parsing).
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.path.join(DATA_DIR, "http_cache")
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0          # 304 servis depuis le cache
+        self.misses = 0        # Réponses complètes téléchargées
+        self.bytes_saved = 0   # Octets de corps non retéléchargés grâce aux 304
+
+    def _path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def _write(self, entry: dict) -> None:
+        path = self._path(entry["url"])
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> Optional[dict]:
+        """Entrée en cache pour l'URL, ou None"""
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            logging.warning(f"Entrée de cache illisible pour {url}: {e}")
+            return None
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict]) -> Dict[str, str]:
+        """Headers de revalidation pour une entrée en cache"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def validators(response: requests.Response) -> tuple:
+        """(ETag, Last-Modified) du corps porté par la réponse"""
+        return response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    def resolve(self, url: str, entry: Optional[dict], response: requests.Response) -> requests.Response:
+        """
+        Réponse à utiliser après une requête (conditionnelle si entry) : sur un 304, le corps
+        est servi depuis l'entrée (hit) ; sinon la réponse est retenue (miss sur un 200) et
+        mise en cache.
+        """
+        if response.status_code == 304 and entry:
+            return self.cached_response(entry, response)
+        if response.status_code == 200:
+            with self._lock:
+                self.misses += 1
+        self.store(url, response)
+        return response
+
+    def store(self, url: str, response: requests.Response) -> None:
+        """Met en cache une réponse 200 si le serveur fournit des validateurs"""
+        if response.status_code != 200:
+            return
+        etag, last_modified = self.validators(response)
+        if not (etag or last_modified):
+            return
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": response.encoding,
+            "content_type": response.headers.get("Content-Type"),
+            "body": response.text,
+            "stored_at": datetime.now().isoformat(),
+            "parsed": {},
+        }
+        with self._lock:
+            self._write(entry)
+
+    def cached_response(self, entry: dict, not_modified: requests.Response) -> requests.Response:
+        """Reconstruit une Response 200 à partir d'une entrée, suite à un 304"""
+        body = entry["body"].encode(entry.get("encoding") or "utf-8", errors="replace")
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(body)
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry["url"]
+        response.encoding = entry.get("encoding")
+        response._content = body
+        response.headers.update(not_modified.headers)
+        if entry.get("content_type"):
+            response.headers["Content-Type"] = entry["content_type"]
+        # Validateurs du corps servi (ceux de l'entrée), pour store_parsed
+        for header, value in (("ETag", entry.get("etag")), ("Last-Modified", entry.get("last_modified"))):
+            if value:
+                response.headers[header] = value
+            else:
+                response.headers.pop(header, None)
+        response.from_cache = True
+        return response
+
+    def get_parsed(self, url: str, topic_id: str, response: requests.Response) -> Optional[dict]:
+        """Résultat de parsing mémorisé ({total_pages, posts}) du corps de response pour un sujet"""
+        entry = self.get(url)
+        if entry and (entry.get("etag"), entry.get("last_modified")) == self.validators(response):
+            return entry.get("parsed", {}).get(topic_id)
+        return None
+
+    def store_parsed(self, url: str, topic_id: str, total_pages: int, posts: List[dict],
+                     response: requests.Response) -> None:
+        """
+        Mémorise le résultat de parsing du corps de response, si l'entrée en cache est bien
+        celle de ce corps (mêmes ETag / Last-Modified) : une entrée remplacée entre-temps
+        par une autre réponse n'hérite pas de posts qui ne sont pas les siens.
+        """
+        with self._lock:
+            entry = self.get(url)
+            if entry is None or (entry.get("etag"), entry.get("last_modified")) != self.validators(response):
+                return
+            entry.setdefault("parsed", {})[topic_id] = {"total_pages": total_pages, "posts": posts}
+            self._write(entry)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bytes_saved": self.bytes_saved}
+
+    def clear(self) -> None:
+        """Vide le cache disque"""
+        for name in os.listdir(self.directory):
+            if name.endswith(".json.gz"):
+                os.remove(os.path.join(self.directory, name))
+
+
+class PrefetchedPages:
+    """
+    Pages déjà téléchargées hors du scraper (ex: par la détection du type de forum), remises
+    une seule fois au premier scraper qui les demande, pour ne pas les retélécharger.
+    En mémoire, bornées en nombre et en âge.
+    """
+
+    MAX_ENTRIES = 32
+    TTL = 900  # secondes
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages: Dict[str, tuple] = {}
+
+    def put(self, url: str, response: requests.Response) -> None:
+        # Une page servie par le cache HTTP disque y reste disponible : inutile de la garder ici
+        if response.status_code != 200 or getattr(response, 'from_cache', False):
+            return
+        with self._lock:
+            self._pages.pop(url, None)
+            self._pages[url] = (datetime.now(), response)
+            while len(self._pages) > self.MAX_ENTRIES:
+                self._pages.pop(next(iter(self._pages)))
+
+    def take(self, url: str) -> Optional[requests.Response]:
+        """Réponse mise de côté pour l'URL (retirée au passage), ou None si absente ou trop ancienne"""
+        with self._lock:
+            entry = self._pages.pop(url, None)
+        if entry and (datetime.now() - entry[0]).total_seconds() <= self.TTL:
+            return entry[1]
+        return None
+
+
+# Partagé par la détection et les scrapers du processus
+prefetched_pages = PrefetchedPages()
@@ -0,0 +1,61 @@
+import time
+from http.cookiejar import CookieJar
+from typing import Dict, Optional
+from requests.cookies import create_cookie
+from jsonstore import JsonStore
+
+
+class CookieStore(JsonStore):
+    """
+    Cookies posés par les serveurs, conservés par hôte d'un run à l'autre (ex: cf_clearance
+    de Cloudflare), dans un fichier JSON. Ils sont rechargés dans la session de l'hôte à sa
+    création ; les cookies saisis dans la configuration d'une source sont envoyés avec
+    chaque requête et priment sur ceux du jar.
+    """
+
+    FILENAME = "cookies.json"
+    LABEL = "Cookies"
+
+    def load_into(self, host: str, jar: CookieJar) -> int:
+        """Ajoute au jar les cookies non expirés de l'hôte. Retourne leur nombre."""
+        now = time.time()
+        with self._lock:
+            entries = list(self._data.get(host, []))
+        loaded = 0
+        for entry in entries:
+            if entry.get("expires") is not None and entry["expires"] <= now:
+                continue
+            jar.set_cookie(create_cookie(entry["name"], entry["value"], domain=entry.get("domain", ""),
+                                         path=entry.get("path", "/"), expires=entry.get("expires"),
+                                         secure=entry.get("secure", False)))
+            loaded += 1
+        return loaded
+
+    def save_from(self, host: str, jar: CookieJar) -> None:
+        """Remplace les cookies mémorisés pour l'hôte par ceux (non expirés) du jar"""
+        entries = [
+            {"name": cookie.name, "value": cookie.value, "domain": cookie.domain, "path": cookie.path,
+             "expires": cookie.expires, "secure": cookie.secure}
+            for cookie in jar if not cookie.is_expired()
+        ]
+        with self._lock:
+            if self._data.get(host, []) == entries:
+                return
+            if entries:
+                self._data[host] = entries
+            else:
+                self._data.pop(host, None)
+            self._save()
+
+
+def merge_cookie_header(jar: CookieJar, cookies: Optional[Dict[str, str]]) -> Optional[str]:
+    """
+    Header Cookie d'une requête : cookies du jar de l'hôte, remplacés par ceux de la source
+    quand le nom est le même (les cookies saisis par l'utilisateur priment).
+    None si la source n'a pas de cookies (le jar s'applique alors normalement).
+    """
+    if not cookies:
+        return None
+    merged = {cookie.name: cookie.value for cookie in jar if not cookie.is_expired()}
+    merged.update(cookies)
+    return "; ".join(f"{name}={value}" for name, value in merged.items())
@@ -2,10 +2,17 @@ import requests
 from bs4 import BeautifulSoup
 from typing import Literal, Optional, Tuple, Dict
 from urllib.parse import urlparse
-import logging
-import time
+from datetime import datetime
+import re
+import threading
 import random
 import urllib3
+from jsonstore import JsonStore
+from scrapers.cache import HttpCache, prefetched_pages
+from scrapers.cookies import merge_cookie_header
+from scrapers.pool import get_session_pool
+from scrapers.ratelimit import get_rate_limiter
+from scrapers.retry import get_circuit_breaker, get_retry_policy, request_with_retry
 
 # Désactiver les warnings SSL pour le scraping
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -19,13 +26,128 @@ USER_AGENTS = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:123.0) Gecko/20100101 Firefox/123.0',
 ]
 
-def detect_forum_type(url: str, cookies: Optional[Dict] = None, user_agent: Optional[str] = None) -> Tuple[ForumType, Optional[str]]:
+# Signatures cherchées dans le début de la page (octets bruts), avant tout parsing.
+# L'ordre de décision reprend celui de la détection DOM : XenForo fort, puis vBulletin.
+SNIFF_BYTES = 16384
+XENFORO_SIGNATURE = re.compile(
+    rb'<html[^>]*\bdata-app=["\']public["\']|\bdata-xf-init=|\bXF\.ready\b|<html[^>]*\bid=["\']XF["\']', re.I)
+VBULLETIN_SIGNATURE = re.compile(
+    rb'<meta[^>]+content=["\']vBulletin|\bvbulletin_html\b|\bvb-postbit\b|\bvBulletin\.|\bvbphrase\b', re.I)
+
+# Détection sur indices faibles : jamais mise en cache (voir detect_forum_type)
+WEAK_XENFORO_MESSAGE = "Forum XenForo détecté (Indices faibles)"
+
+ACCESS_DENIED_MESSAGE = (
+    "Accès refusé (403) après plusieurs tentatives. Protection anti-bot détectée.\n"
+    "Solutions:\n"
+    "1. Ajoutez des cookies Cloudflare (cf_clearance) dans les options avancées\n"
+    "2. Utilisez l'extension 'Cookie-Editor' pour exporter les cookies\n"
+    "3. Attendez quelques minutes et réessayez"
+)
+
+
+class DetectionCache(JsonStore):
+    """
+    Type de forum détecté par domaine, persisté dans un fichier JSON : un domaine déjà
+    reconnu n'est plus retéléchargé ni analysé. Seules les détections sûres, faites sur une
+    page servie normalement (200), sont gardées.
+    """
+
+    FILENAME = "detections.json"
+    LABEL = "Cache de détection"
+
+    def get(self, domain: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(domain)
+            return dict(entry) if entry else None
+
+    def store(self, domain: str, forum_type: ForumType, message: str) -> None:
+        if forum_type == "unknown":
+            return
+        with self._lock:
+            self._data[domain] = {"forum_type": forum_type, "message": message,
+                                  "detected_at": datetime.now().isoformat()}
+            self._save()
+
+
+_detection_cache: Optional[DetectionCache] = None
+_detection_cache_lock = threading.Lock()
+
+
+def get_detection_cache() -> DetectionCache:
+    """Cache de détection partagé par le processus"""
+    global _detection_cache
+    with _detection_cache_lock:
+        if _detection_cache is None:
+            _detection_cache = DetectionCache()
+        return _detection_cache
+
+
+def match_signatures(head: bytes) -> Optional[Tuple[ForumType, str]]:
+    """Détection sur les premiers octets de la page ; None si ce n'est pas concluant"""
+    if XENFORO_SIGNATURE.search(head):
+        return "xenforo", "Forum XenForo détecté (Signature HTML)"
+    if VBULLETIN_SIGNATURE.search(head):
+        return "vbulletin", "Forum vBulletin détecté"
+    return None
+
+
+def detect_from_dom(text: str) -> Tuple[ForumType, str]:
+    """Détection complète sur l'arbre HTML (repli quand les signatures ne suffisent pas)"""
+    html = text.lower()
+    soup = BeautifulSoup(text, 'lxml')
+
+    # Détection XenForo (Prioritaire car plus structuré)
+    xenforo_signs = [
+        'xenforo' in html,
+        'xf-' in html,
+        soup.find('html', {'data-app': 'public'}), # Strong signal
+        soup.find('div', class_='p-body'),
+        soup.find('div', class_='p-pageWrapper'),
+        'bbwrapper' in html, # Often used in XF content
+    ]
+
+    # Détection vBulletin
+    vbulletin_signs = [
+        'vbulletin' in html,
+        'vb_' in html,
+        soup.find('div', class_='vb-postbit'),
+        soup.find('div', id='vbulletin_html'),
+        soup.find('div', class_='postbit'), # Common in vB
+        soup.find('table', class_='tborder'), # vB 3.x classic
+        'postcontainer' in html, # vB 4/5
+    ]
+
+    if any(xenforo_signs) and soup.find('html', {'data-app': 'public'}):
+        return "xenforo", "Forum XenForo détecté (Signature HTML)"
+
+    if any(vbulletin_signs):
+        return "vbulletin", "Forum vBulletin détecté"
+
+    if any(xenforo_signs): # Fallback weak detection
+        return "xenforo", WEAK_XENFORO_MESSAGE
+
+    return "unknown", "Type de forum non reconnu ou structure inconnue"
+
+
+def detect_forum_type(url: str, cookies: Optional[Dict] = None, user_agent: Optional[str] = None,
+                      cache: Optional[HttpCache] = None, refresh: bool = False) -> Tuple[ForumType, Optional[str]]:
     """
     Détecte automatiquement le type de forum.
     Retourne (type, message_info)
+
+    Un domaine déjà reconnu est servi depuis le cache de détection, sans requête
+    (refresh=True force un nouveau téléchargement, ex: pour tester l'accès).
+    La page téléchargée est mise de côté pour le scraper (voir PrefetchedPages).
+    Avec un cache HTTP, la page est revalidée (ETag / Last-Modified) au lieu d'être retéléchargée.
     """
     parsed = urlparse(url)
     base_url = f"{parsed.scheme}://{parsed.netloc}"
+    detections = get_detection_cache()
+
+    known = None if refresh else detections.get(parsed.netloc)
+    if known:
+        return known["forum_type"], f"{known['message']} (domaine déjà connu)"
 
     headers = {
         'User-Agent': user_agent or random.choice(USER_AGENTS),
@@ -44,74 +166,40 @@ def detect_forum_type(url: str, cookies: Optional[Dict] = None, user_agent: Opti
         'Referer': base_url,
     }
 
-    max_retries = 3
-    retry_delays = [2, 5, 10]
+    cached = cache.get(url) if cache else None
+    headers.update(HttpCache.conditional_headers(cached))
+
+    def send() -> requests.Response:
+        get_rate_limiter().acquire(url)
+        # Session du pool partagé avec les scrapers : la connexion ouverte ici leur resservira
+        session = get_session_pool().get(url)
+        cookie_header = merge_cookie_header(session.cookies, cookies)
+        if cookie_header:
+            headers['Cookie'] = cookie_header
+        return session.get(url, timeout=15, headers=headers, verify=False)
+
+    def rotate_user_agent(response: Optional[requests.Response]) -> None:
+        if response is not None and response.status_code == 403:
+            headers['User-Agent'] = random.choice(USER_AGENTS)
 
     try:
-        response = None
-        for attempt in range(max_retries + 1):
-            try:
-                response = requests.get(url, timeout=15, headers=headers, cookies=cookies, verify=False)
-
-                if response.status_code == 403:
-                    if attempt < max_retries:
-                        delay = retry_delays[attempt]
-                        logging.warning(f"Détection: 403 reçu, retry {attempt + 1}/{max_retries} dans {delay}s...")
-                        time.sleep(delay)
-                        headers['User-Agent'] = random.choice(USER_AGENTS)
-                        continue
-                    else:
-                        return "unknown", (
-                            "Accès refusé (403) après plusieurs tentatives. Protection anti-bot détectée.\n"
-                            "Solutions:\n"
-                            "1. Ajoutez des cookies Cloudflare (cf_clearance) dans les options avancées\n"
-                            "2. Utilisez l'extension 'Cookie-Editor' pour exporter les cookies\n"
-                            "3. Attendez quelques minutes et réessayez"
-                        )
-                break
-            except requests.RequestException as e:
-                if attempt < max_retries:
-                    time.sleep(retry_delays[attempt])
-                    continue
-                raise
-
-        if response is None:
-            return "unknown", "Impossible de se connecter après plusieurs tentatives."
-
-        html = response.text.lower()
-        soup = BeautifulSoup(response.text, 'lxml')
-
-        # Détection XenForo (Prioritaire car plus structuré)
-        xenforo_signs = [
-            'xenforo' in html,
-            'xf-' in html,
-            soup.find('html', {'data-app': 'public'}), # Strong signal
-            soup.find('div', class_='p-body'),
-            soup.find('div', class_='p-pageWrapper'),
-            'bbwrapper' in html, # Often used in XF content
-        ]
-
-        # Détection vBulletin
-        vbulletin_signs = [
-            'vbulletin' in html,
-            'vb_' in html,
-            soup.find('div', class_='vb-postbit'),
-            soup.find('div', id='vbulletin_html'),
-            soup.find('div', class_='postbit'), # Common in vB
-            soup.find('table', class_='tborder'), # vB 3.x classic
-            'postcontainer' in html, # vB 4/5
-        ]
-
-        if any(xenforo_signs) and soup.find('html', {'data-app': 'public'}):
-             return "xenforo", "Forum XenForo détecté (Signature HTML)"
-
-        if any(vbulletin_signs):
-            return "vbulletin", "Forum vBulletin détecté"
-
-        if any(xenforo_signs): # Fallback weak detection
-             return "xenforo", "Forum XenForo détecté (Indices faibles)"
-
-        return "unknown", "Type de forum non reconnu ou structure inconnue"
+        response = request_with_retry(url, send, get_retry_policy(), get_circuit_breaker(), rotate_user_agent)
+        if cache:
+            response = cache.resolve(url, cached, response)
+
+        if response.status_code == 403:
+            return "unknown", ACCESS_DENIED_MESSAGE
+        if response.status_code in (429, 503):
+            return "unknown", f"Forum indisponible ou limitation de débit ({response.status_code}), réessayez plus tard."
+
+        prefetched_pages.put(url, response)
+        get_session_pool().save_cookies()
+        # Signatures sur les premiers Ko ; l'arbre HTML complet seulement si ce n'est pas concluant
+        result = match_signatures(response.content[:SNIFF_BYTES]) or detect_from_dom(response.text)
+        # Un indice faible, une page d'erreur (404, 5xx) ou de challenge ne fixe pas le type du domaine
+        if response.status_code == 200 and result[1] != WEAK_XENFORO_MESSAGE:
+            detections.store(parsed.netloc, *result)
+        return result
 
     except Exception as e:
         return "unknown", f"Erreur de connexion lors de la détection: {str(e)}"
@@ -0,0 +1,31 @@
+from urllib.parse import urlparse
+from scrapers.base import BaseScraper
+from scrapers.detector import get_detection_cache
+from scrapers.vbulletin import VBulletinScraper
+from scrapers.xenforo import XenForoScraper
+
+
+def resolve_forum_type(source: dict) -> str:
+    """
+    Type de forum effectif d'une source.
+    'auto' (détection échouée ou non lancée) est résolu par le type déjà détecté pour le
+    domaine, sinon par une heuristique simple sur l'URL.
+    """
+    ftype = source.get('forum_type') or 'auto'
+    if ftype == 'auto':
+        known = get_detection_cache().get(urlparse(source.get('url', '')).netloc)
+        if known:
+            return known['forum_type']
+
+        url = source.get('url', '')
+        ftype = 'xenforo' if 'xenforo' in url or 'threads' in url else 'vbulletin'
+    return ftype
+
+
+def create_scraper(source: dict, **options) -> BaseScraper:
+    """
+    Construit le scraper adapté à une source (dict de configuration).
+    Les options (delay, concurrency, cache...) sont transmises au constructeur.
+    """
+    scraper_cls = XenForoScraper if resolve_forum_type(source) == 'xenforo' else VBulletinScraper
+    return scraper_cls(cookies=source.get('cookies'), user_agent=source.get('user_agent'), **options)
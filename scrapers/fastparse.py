@@ -0,0 +1,139 @@
+"""
+Accès au document partagé par les deux backends de parsing des scrapers.
+
+Chaque moteur n'a qu'une routine d'extraction (parse_posts / get_total_pages), écrite avec
+les Selector et helpers ci-dessous. Elle s'applique indifféremment :
+- à une soupe BeautifulSoup (chemin historique) ;
+- à un arbre lxml natif (mode fast_parse) : les sélecteurs y sont des XPath compilés une
+  fois au niveau de la classe, évalués en C et limités aux conteneurs de posts (requêtes
+  relatives au post), sans parcours de l'arbre en Python.
+Les helpers reproduisent sur lxml la sémantique BeautifulSoup utilisée (find / find_all sur
+les descendants, get_text(strip=True), stripped_strings, decompose) : les posts sont identiques.
+"""
+from functools import lru_cache
+from typing import Iterator, List, Optional, Pattern, Union
+from bs4 import BeautifulSoup, Tag
+from lxml import etree, html as lxml_html
+
+# Document ou élément, selon le backend
+Node = Union[Tag, BeautifulSoup, etree._Element]
+
+# Expressions régulières EXSLT (re:test applique re.search, comme BeautifulSoup)
+XPATH_NS = {'re': 'http://exslt.org/regular-expressions'}
+
+# Textes ignorés par BeautifulSoup.get_text (Script, Stylesheet, TemplateString)
+_TEXTS = etree.XPath('.//text()[not(ancestor::script or ancestor::style or ancestor::template)]')
+
+
+def build_tree(html: str) -> etree._Element:
+    """Parse une page HTML avec lxml (une dizaine de fois plus rapide que BeautifulSoup)"""
+    return lxml_html.document_fromstring(html)
+
+
+def _is_lxml(node: Node) -> bool:
+    return isinstance(node, etree._Element)
+
+
+def _xpath_literal(value: str) -> str:
+    if "'" not in value:
+        return f"'{value}'"
+    return '"' + value + '"'
+
+
+class Selector:
+    """
+    Sélecteur d'un moteur, déclaré une fois au niveau de la classe du scraper : équivalent de
+    find / find_all(tag, class_=cls, attr=regex) de BeautifulSoup, compilé en XPath pour lxml.
+    Une valeur d'attribut True exige seulement sa présence.
+    """
+    __slots__ = ('tag', 'filters', '_find_all', '_find')
+
+    def __init__(self, tag: str, cls: Optional[str] = None, **attrs: Union[Pattern, bool]):
+        self.tag = tag
+        # Filtres BeautifulSoup (class_=None y signifierait « sans attribut class »)
+        self.filters = dict(attrs, class_=cls) if cls is not None else dict(attrs)
+
+        conditions = []
+        if cls is not None:
+            conditions.append(f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')")
+        for name, pattern in attrs.items():
+            if pattern is True:
+                conditions.append(f"@{name}")
+            else:
+                conditions.append(f"@{name} and re:test(@{name}, {_xpath_literal(pattern.pattern)})")
+        path = f".//{tag}" + "".join(f"[{condition}]" for condition in conditions)
+        self._find_all = etree.XPath(path, namespaces=XPATH_NS)
+        self._find = etree.XPath(f"({path})[1]", namespaces=XPATH_NS)
+
+    def find_all(self, root: Node) -> List:
+        if _is_lxml(root):
+            return self._find_all(root)
+        return root.find_all(self.tag, **self.filters)
+
+    def find(self, root: Node):
+        if _is_lxml(root):
+            found = self._find(root)
+            return found[0] if found else None
+        return root.find(self.tag, **self.filters)
+
+
+def stripped_strings(el: Node) -> Iterator[str]:
+    """Équivalent de Tag.stripped_strings"""
+    if not _is_lxml(el):
+        yield from el.stripped_strings
+        return
+    for s in _TEXTS(el):
+        s = s.strip()
+        if s:
+            yield s
+
+
+def get_text(el: Node, separator: str = '') -> str:
+    """Équivalent de Tag.get_text(separator=..., strip=True)"""
+    if not _is_lxml(el):
+        return el.get_text(separator=separator, strip=True)
+    return separator.join(stripped_strings(el))
+
+
+def find_string(root: Node, pattern: Pattern) -> Optional[str]:
+    """Première chaîne de texte correspondant au motif (équivalent de find(string=regex))"""
+    if not _is_lxml(root):
+        return root.find(string=pattern)
+    found = _string_xpath(pattern.pattern)(root)
+    return str(found[0]) if found else None
+
+
+@lru_cache(maxsize=None)
+def _string_xpath(pattern: str) -> etree.XPath:
+    return etree.XPath(f"(.//text()[re:test(., {_xpath_literal(pattern)})])[1]", namespaces=XPATH_NS)
+
+
+def parent(el: Node):
+    """Élément parent (Tag.parent)"""
+    return el.getparent() if _is_lxml(el) else el.parent
+
+
+def find_parent(el: Node, tag: str):
+    """Équivalent de Tag.find_parent(tag)"""
+    if not _is_lxml(el):
+        return el.find_parent(tag)
+    for ancestor in el.iterancestors(tag):
+        return ancestor
+    return None
+
+
+def decompose(el: Node) -> None:
+    """
+    Équivalent de Tag.decompose() : retire le sous-arbre en gardant le texte qui le suit.
+    Sur lxml, un commentaire vide prend sa place pour que ce texte reste une chaîne distincte
+    (drop_tree le fusionnerait avec le texte précédent, ce qui changerait get_text).
+    """
+    if not _is_lxml(el):
+        el.decompose()
+        return
+    parent_el = el.getparent()
+    if parent_el is None:
+        return
+    placeholder = etree.Comment()
+    placeholder.tail = el.tail
+    parent_el.replace(el, placeholder)
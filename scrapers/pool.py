@@ -0,0 +1,177 @@
+import logging
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from scrapers.cookies import CookieStore
+
+try:  # Optionnel : HTTP/2 via httpx (pip install "httpx[http2]")
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class _Http2Session:
+    """
+    Client httpx (HTTP/2) avec l'interface de requests.Session utilisée par les scrapers :
+    get() retourne une requests.Response et les erreurs sont des requests.RequestException.
+    """
+
+    def __init__(self, max_connections: int):
+        self.client = httpx.Client(http2=True, verify=False, follow_redirects=True,
+                                   limits=httpx.Limits(max_connections=max_connections,
+                                                       max_keepalive_connections=max_connections))
+        self.requests = 0
+
+    @property
+    def cookies(self):
+        return self.client.cookies.jar
+
+    def get(self, url: str, headers: Optional[dict] = None, timeout: float = 15,
+            verify: bool = False) -> requests.Response:
+        try:
+            request = self.client.build_request("GET", url, headers=headers, timeout=timeout)
+            reply = self.client.send(request)
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e)) from e
+        self.requests += 1
+
+        response = requests.Response()
+        response.status_code = reply.status_code
+        response.url = str(reply.url)
+        response.headers.update(reply.headers)
+        response.encoding = reply.encoding
+        response._content = reply.content
+        response.reason = reply.reason_phrase
+        return response
+
+    def stats(self) -> dict:
+        # httpx n'expose pas le nombre de connexions ouvertes : une connexion HTTP/2 multiplexe tout
+        return {"requests": self.requests, "connections": None, "http2": True}
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class SessionPool:
+    """
+    Sessions HTTP partagées par hôte, pour tous les scrapers et la détection.
+
+    Une session par hôte (scheme://netloc) dont l'adaptateur garde jusqu'à pool_maxsize
+    connexions keep-alive : les sujets d'un même forum, d'une extraction à l'autre,
+    réutilisent les connexions TCP/TLS déjà ouvertes. Les sessions ne portent ni headers ni
+    cookies propres à une source : ils sont passés à chaque requête.
+    Avec http2=True et httpx installé, un client HTTP/2 remplace la session requests.
+    Avec un cookie_store, le jar de chaque session est rechargé à sa création et
+    sauvegardé par save_cookies() (appelé en fin d'extraction).
+    """
+
+    POOL_MAXSIZE = 8  # >= BaseScraper.HOST_CONCURRENCY : pas de connexion jetée après usage
+
+    def __init__(self, pool_maxsize: Optional[int] = None, http2: bool = False,
+                 cookie_store: Optional[CookieStore] = None):
+        self.pool_maxsize = pool_maxsize or self.POOL_MAXSIZE
+        self.cookie_store = cookie_store
+        self.http2 = http2
+        if http2 and httpx is None:
+            logging.warning("HTTP/2 demandé mais httpx n'est pas installé : repli sur requests (HTTP/1.1)")
+            self.http2 = False
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, object] = {}
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    @staticmethod
+    def _host(key: str) -> str:
+        return key.split("://", 1)[1]
+
+    def _new_session(self, key: str):
+        if self.http2:
+            session = _Http2Session(self.pool_maxsize)
+        else:
+            session = requests.Session()
+            # Les retries sont gérés par les scrapers : l'adaptateur n'en fait pas
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        if self.cookie_store:
+            self.cookie_store.load_into(self._host(key), session.cookies)
+        return session
+
+    def get(self, url: str):
+        """Session de l'hôte de l'URL (créée au premier appel)"""
+        key = self.host_key(url)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = self._new_session(key)
+            return session
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Réutilisation des connexions par hôte : requêtes envoyées, connexions ouvertes
+        (chaque ouverture = une poignée de main TCP/TLS) et taux de réutilisation.
+        """
+        with self._lock:
+            sessions = dict(self._sessions)
+        stats = {}
+        for key, session in sessions.items():
+            if isinstance(session, requests.Session):
+                # Un pool urllib3 par paramètres TLS : on cumule ceux de l'hôte
+                manager = session.get_adapter(key).poolmanager
+                pools = [manager.pools[pool_key] for pool_key in manager.pools.keys()]
+                requests_count = sum(pool.num_requests for pool in pools)
+                connections = sum(pool.num_connections for pool in pools)
+                entry = {"requests": requests_count, "connections": connections, "http2": False}
+            else:
+                entry = session.stats()
+                requests_count, connections = entry["requests"], entry["connections"]
+            entry["reuse_rate"] = (1 - connections / requests_count) if requests_count and connections is not None else None
+            stats[self._host(key)] = entry
+        return stats
+
+    def save_cookies(self) -> None:
+        """Persiste le jar de chaque hôte (cookies posés par les serveurs pendant ce run)"""
+        if not self.cookie_store:
+            return
+        with self._lock:
+            sessions = dict(self._sessions)
+        for key, session in sessions.items():
+            self.cookie_store.save_from(self._host(key), session.cookies)
+
+    def close(self) -> None:
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+
+
+_pool: Optional[SessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> SessionPool:
+    """Pool partagé par le processus (les runs Streamlit successifs le réutilisent)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SessionPool(cookie_store=CookieStore())
+        return _pool
+
+
+def configure_session_pool(pool_maxsize: Optional[int] = None, http2: bool = False) -> SessionPool:
+    """Remplace le pool partagé si sa configuration change (les sessions existantes sont fermées)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool.http2 == http2 and _pool.pool_maxsize == (pool_maxsize or SessionPool.POOL_MAXSIZE):
+            return _pool
+        old = _pool
+        _pool = SessionPool(pool_maxsize, http2, cookie_store=old.cookie_store if old else CookieStore())
+    if old is not None:
+        old.save_cookies()
+        old.close()
+    return _pool
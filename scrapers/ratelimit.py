@@ -0,0 +1,106 @@
+import threading
+import time
+from typing import Optional, Dict
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    Seau à jetons thread-safe : `rate` jetons par seconde, au plus `burst` d'avance.
+    acquire() réserve un jeton (le solde peut devenir négatif) puis dort le temps
+    nécessaire : les appelants concurrents sont servis dans l'ordre, sans attente active.
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self._lock = threading.Lock()
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def configure(self, rate: Optional[float], burst: int = 1) -> None:
+        """Change le débit sans perdre les jetons déjà accumulés"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.burst = max(1, burst)
+            self.tokens = min(self.tokens, self.burst)
+
+    def acquire(self) -> float:
+        """Prend un jeton, en attendant si besoin. Retourne le temps d'attente (s)."""
+        if not self.rate:
+            return 0.0  # Débit illimité
+
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class HostRateLimiter:
+    """
+    Limiteur de débit partagé par tout le processus : un TokenBucket par hôte.
+    Deux sources sur le même forum se partagent le même débit, deux forums différents
+    ne se ralentissent pas l'un l'autre.
+    """
+
+    def __init__(self, default_rate: Optional[float] = 1 / 1.5, default_burst: int = 1):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._configured = set()
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+
+    def configure(self, host: str, rate: Optional[float], burst: int = 1) -> None:
+        """Fixe explicitement le débit d'un hôte (prioritaire sur les débits proposés à acquire)"""
+        with self._lock:
+            self._configured.add(host)
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                self._buckets[host] = TokenBucket(rate, burst)
+                return
+        bucket.configure(rate, burst)
+
+    def set_defaults(self, rate: Optional[float], burst: int = 1) -> None:
+        """
+        Débit par défaut des hôtes non configurés explicitement.
+        S'applique aussi aux seaux déjà créés pour ces hôtes.
+        """
+        with self._lock:
+            self.default_rate = rate
+            self.default_burst = burst
+            buckets = [b for h, b in self._buckets.items() if h not in self._configured]
+        for bucket in buckets:
+            bucket.configure(rate, burst)
+
+    def bucket(self, host: str, rate: Optional[float] = None, burst: Optional[int] = None) -> TokenBucket:
+        """Seau de l'hôte, créé au premier appel avec rate/burst (ou les valeurs par défaut)"""
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(
+                    rate if rate is not None else self.default_rate,
+                    burst if burst is not None else self.default_burst
+                )
+            return bucket
+
+    def acquire(self, url: str, rate: Optional[float] = None, burst: Optional[int] = None) -> float:
+        """Attend un jeton pour l'hôte de l'URL. Retourne le temps d'attente (s)."""
+        return self.bucket(urlparse(url).netloc, rate, burst).acquire()
+
+
+_rate_limiter = HostRateLimiter()
+
+
+def get_rate_limiter() -> HostRateLimiter:
+    """Limiteur partagé par tous les scrapers et le détecteur"""
+    return _rate_limiter
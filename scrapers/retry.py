@@ -0,0 +1,193 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+import requests
+
+
+class CircuitOpenError(requests.RequestException):
+    """Requête refusée sans être envoyée : l'hôte bloque (circuit ouvert)"""
+
+
+class RetryPolicy:
+    """
+    Politique de retry partagée par les scrapers et la détection.
+
+    Backoff exponentiel avec jitter (base_delay × 2^tentative, tiré entre la moitié et la
+    totalité de cette valeur, plafonné à max_delay). Sur 429/503, un Retry-After plus long
+    est respecté ; s'il dépasse max_delay, on n'attend pas : la réponse est rendue et le
+    circuit de l'hôte s'ouvre pour cette durée.
+    """
+
+    # 403 : protection anti-bot (on change de User-Agent) ; 429/5xx : surcharge ou limitation
+    RETRY_STATUSES = frozenset({403, 429, 500, 502, 503, 504})
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 2.0, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @staticmethod
+    def retry_after(response: Optional[requests.Response]) -> Optional[float]:
+        """Délai demandé par le serveur (Retry-After en secondes ou date HTTP), sinon None"""
+        if response is None or response.status_code not in (429, 503):
+            return None
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def delay(self, attempt: int, response: Optional[requests.Response] = None) -> Optional[float]:
+        """Attente avant la tentative suivante, ou None s'il ne faut plus réessayer"""
+        if attempt >= self.max_retries:
+            return None
+        retry_after = self.retry_after(response)
+        if retry_after is not None and retry_after > self.max_delay:
+            return None
+        return max(self.backoff(attempt), retry_after or 0.0)
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur par hôte, partagé par tous les scrapers.
+
+    Après failure_threshold échecs consécutifs (réponses bloquantes ou erreurs réseau),
+    le circuit s'ouvre : les requêtes vers l'hôte échouent aussitôt (CircuitOpenError)
+    au lieu de refaire chacune toute la série de retries. Passé le délai, une seule
+    requête d'essai est laissée passer (semi-ouvert) : un succès referme le circuit, un
+    échec le rouvre pour un délai doublé (plafonné à max_cooldown).
+    """
+
+    def __init__(self, failure_threshold: int = 4, cooldown: float = 60.0, max_cooldown: float = 900.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, dict] = {}
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlparse(url).netloc or url
+
+    def _state(self, host: str) -> dict:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {"failures": 0, "open_until": None, "cooldown": self.cooldown,
+                                         "probing": False}
+        return state
+
+    def allow(self, url: str) -> None:
+        """Lève CircuitOpenError si l'hôte est bloqué ; sinon la requête peut partir"""
+        host = self._host(url)
+        with self._lock:
+            state = self._state(host)
+            if state["open_until"] is None:
+                return
+            remaining = state["open_until"] - time.monotonic()
+            if remaining <= 0 and not state["probing"]:
+                state["probing"] = True  # Semi-ouvert : cette requête sert d'essai
+                return
+        wait = f"nouvel essai dans {remaining:.0f}s" if remaining > 0 else "essai en cours"
+        raise CircuitOpenError(f"{host} bloque les requêtes (circuit ouvert, {wait}).")
+
+    def record_success(self, url: str) -> None:
+        with self._lock:
+            state = self._state(self._host(url))
+            if state["open_until"] is not None:
+                logging.info(f"{self._host(url)} répond de nouveau : circuit refermé")
+            state.update(failures=0, open_until=None, cooldown=self.cooldown, probing=False)
+
+    def _open(self, host: str, state: dict, duration: float) -> None:
+        state.update(open_until=time.monotonic() + duration, probing=False)
+        logging.warning(f"{host} bloque les requêtes : circuit ouvert pour {duration:.0f}s")
+
+    def record_failure(self, url: str) -> None:
+        host = self._host(url)
+        with self._lock:
+            state = self._state(host)
+            state["failures"] += 1
+            if state["probing"]:
+                # L'essai a échoué : rouvert pour plus longtemps
+                state["cooldown"] = min(self.max_cooldown, state["cooldown"] * 2)
+            elif state["failures"] < self.failure_threshold:
+                return
+            self._open(host, state, state["cooldown"])
+
+    def trip(self, url: str, duration: float) -> None:
+        """Ouvre le circuit pour une durée imposée (ex: long Retry-After du serveur)"""
+        host = self._host(url)
+        with self._lock:
+            state = self._state(host)
+            self._open(host, state, max(duration, state["cooldown"]))
+
+
+def request_with_retry(url: str, send: Callable[[], requests.Response], policy: RetryPolicy,
+                       breaker: Optional[CircuitBreaker] = None,
+                       on_retry: Optional[Callable[[Optional[requests.Response]], None]] = None) -> requests.Response:
+    """
+    Envoie une requête (send) selon la politique de retry, sous le disjoncteur de l'hôte.
+    Retourne la dernière réponse (éventuellement en erreur si les retries sont épuisés) ;
+    l'erreur réseau de la dernière tentative est relevée. on_retry(response) est appelé
+    avant chaque nouvelle tentative (ex: changer de User-Agent après un 403).
+    """
+    attempt = 0
+    while True:
+        if breaker:
+            breaker.allow(url)
+        try:
+            response = send()
+        except requests.RequestException as e:
+            if breaker:
+                breaker.record_failure(url)
+            delay = policy.delay(attempt)
+            if delay is None:
+                raise
+            logging.warning(f"Erreur requête: {e}, retry dans {delay:.1f}s...")
+        else:
+            if response.status_code not in policy.RETRY_STATUSES:
+                if breaker:
+                    breaker.record_success(url)
+                return response
+            if breaker:
+                breaker.record_failure(url)
+            delay = policy.delay(attempt, response)
+            if delay is None:
+                retry_after = policy.retry_after(response)
+                if breaker and retry_after and retry_after > policy.max_delay:
+                    breaker.trip(url, retry_after)
+                return response
+            logging.warning(f"{response.status_code} reçu, retry {attempt + 1}/{policy.max_retries} "
+                            f"dans {delay:.1f}s...")
+            if on_retry:
+                on_retry(response)
+        time.sleep(delay)
+        attempt += 1
+
+
+_retry_policy = RetryPolicy()
+_circuit_breaker = CircuitBreaker()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Politique de retry par défaut des scrapers et du détecteur"""
+    return _retry_policy
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Disjoncteur partagé par tous les scrapers et le détecteur"""
+    return _circuit_breaker
@@ -1,12 +1,41 @@
 from typing import List
-from bs4 import BeautifulSoup
 from scrapers.base import BaseScraper
+from scrapers.fastparse import Node, Selector, decompose, find_parent, find_string, get_text, parent, stripped_strings
 from models.post import Post
 import re
 import logging
 
 class VBulletinScraper(BaseScraper):
 
+    # Motifs compilés une seule fois (et non à chaque post)
+    PAGE_PARAM = re.compile(r'page=\d+')
+    PAGE_OF_TEXT = re.compile(r'Page \d+ of \d+')
+    PAGE_OF_TOTAL = re.compile(r'of (\d+)')
+    PAGE_PARAM_NUM = re.compile(r'page=(\d+)')
+    PAGE_PATH_NUM = re.compile(r'page(\d+)')
+    POST_MESSAGE_ID = re.compile(r'^post_message_\d+')
+    POST_MESSAGE_PREFIX = re.compile(r'post_message_')
+    POST_ANCHOR_ID = re.compile(r'^post\d+')
+    POST_LINK = re.compile(r'p=\d+')
+    POST_LINK_ID = re.compile(r'p=(\d+)')
+
+    # Sélecteurs compilés une fois (XPath sur lxml, find / find_all sur BeautifulSoup)
+    SEL_PAGENAV = Selector('div', 'pagenav')
+    SEL_PAGINATION = Selector('div', 'pagination')
+    SEL_LINK = Selector('a')
+    SEL_POST_CONTAINERS = (Selector('li', 'postbit'), Selector('li', 'postbitlegacy'), Selector('div', 'postbit'))
+    SEL_POST_MESSAGE = Selector('div', id=POST_MESSAGE_ID)
+    SEL_POST_ANCHOR = Selector('a', id=POST_ANCHOR_ID)
+    SEL_POST_LINK = Selector('a', href=POST_LINK)
+    SEL_USERNAME = Selector('a', 'username')
+    SEL_BIGUSERNAME = Selector('a', 'bigusername')
+    SEL_DATE = Selector('span', 'date')
+    SEL_TIME = Selector('span', 'time')
+    SEL_CONTENT = Selector('div', 'content')
+    SEL_CONTENT_VB3 = Selector('div', id=POST_MESSAGE_PREFIX)
+    SEL_QUOTE = Selector('div', 'quote')
+    SEL_POSTCOUNTER = Selector('a', 'postcounter')
+
     def get_page_url(self, base_url: str, page_num: int) -> str:
         """
         Construit l'URL vBulletin.
@@ -20,7 +49,7 @@ class VBulletinScraper(BaseScraper):
         if '?' in base_url:
             # Type Query param (e.g. showthread.php?t=...)
             if 'page=' in base_url:
-                return re.sub(r'page=\d+', f'page={page_num}', base_url)
+                return self.PAGE_PARAM.sub(f'page={page_num}', base_url)
             return f"{base_url}&page={page_num}"
         else:
             # Type Rewrite URL
@@ -28,37 +57,38 @@ class VBulletinScraper(BaseScraper):
                 return f"{base_url}page{page_num}"
             return f"{base_url}/page{page_num}"
 
-    def get_total_pages(self, soup: BeautifulSoup) -> int:
+    def get_total_pages(self, root: Node) -> int:
         # Generic vBulletin pagination check
 
         # Look for "Page X of Y" text
-        nav_text = soup.find(string=re.compile(r'Page \d+ of \d+'))
+        nav_text = find_string(root, self.PAGE_OF_TEXT)
         if nav_text:
-            match = re.search(r'of (\d+)', nav_text)
+            match = self.PAGE_OF_TOTAL.search(nav_text)
             if match:
                 return int(match.group(1))
 
         # Look for pagination links
-        pagenav = soup.find('div', class_='pagenav') or soup.find('div', class_='pagination')
-        if pagenav:
-            links = pagenav.find_all('a')
+        pagenav = self.SEL_PAGENAV.find(root)
+        if pagenav is None:
+            pagenav = self.SEL_PAGINATION.find(root)
+        if pagenav is not None:
             max_page = 1
-            for link in links:
+            for link in self.SEL_LINK.find_all(pagenav):
                 # vBulletin often has 'Last Page' link with title="Last Page"
                 if 'Last' in link.get('title', '') or 'Última' in link.get('title', ''):
                     href = link.get('href')
-                    match = re.search(r'page=(\d+)', href) or re.search(r'page(\d+)', href)
+                    match = self.PAGE_PARAM_NUM.search(href) or self.PAGE_PATH_NUM.search(href)
                     if match:
                         return int(match.group(1))
 
-                txt = link.get_text(strip=True)
+                txt = get_text(link)
                 if txt.isdigit():
                     max_page = max(max_page, int(txt))
             return max_page
 
         return 1
 
-    def parse_posts(self, soup: BeautifulSoup, topic_id: str) -> List[dict]:
+    def parse_posts(self, root: Node, topic_id: str) -> List[dict]:
         posts_data = []
 
         # vBulletin has multiple layouts.
@@ -68,59 +98,57 @@ class VBulletinScraper(BaseScraper):
         # Selectors: div.postbit, li.postbit, li.postbitlegacy, table.tborder (checking id starts with post)
 
         candidates = []
-        candidates.extend(soup.find_all('li', class_='postbit'))
-        candidates.extend(soup.find_all('li', class_='postbitlegacy'))
-        candidates.extend(soup.find_all('div', class_='postbit'))
+        for selector in self.SEL_POST_CONTAINERS:
+            candidates.extend(selector.find_all(root))
 
         if not candidates:
             # Fallback for vB 3.x tables
             # Find divs with id starting with 'post_message_' and work backwards
-            msgs = soup.find_all('div', id=re.compile(r'^post_message_\d+'))
-            for msg in msgs:
-                # This is just content, we need to wrap it to simulate a post object
-                # Or traverse up to find the container
-                candidates.append(msg.find_parent('table'))
+            for msg in self.SEL_POST_MESSAGE.find_all(root):
+                # This is just content, traverse up to find the container
+                candidates.append(find_parent(msg, 'table'))
 
         for item in candidates:
-            if not item: continue
+            if item is None: continue
 
             try:
                 # ID
                 post_id = None
                 # Try to find id in anchor
-                anchor = item.find('a', id=re.compile(r'^post\d+'))
-                if anchor:
+                anchor = self.SEL_POST_ANCHOR.find(item)
+                if anchor is not None:
                     post_id = anchor.get('id')
                 else:
                     # Try to extract from edit link or reply link
-                    link = item.find('a', href=re.compile(r'p=\d+'))
-                    if link:
-                        m = re.search(r'p=(\d+)', link['href'])
+                    link = self.SEL_POST_LINK.find(item)
+                    if link is not None:
+                        m = self.POST_LINK_ID.search(link.get('href'))
                         if m: post_id = m.group(1)
 
                 # Author
                 author = "Inconnu"
-                author_elem = item.find('a', class_='username') or item.find('a', class_='bigusername')
-                if author_elem:
-                    author = author_elem.get_text(strip=True)
+                author_elem = self.SEL_USERNAME.find(item)
+                if author_elem is None:
+                    author_elem = self.SEL_BIGUSERNAME.find(item)
+                if author_elem is not None:
+                    author = get_text(author_elem)
 
                 # Date
                 date_str = ""
                 # Usually in a thead or a div near top
                 # vB4: <span class="date">...</span>
-                date_elem = item.find('span', class_='date')
-                if not date_elem:
+                date_elem = self.SEL_DATE.find(item)
+                if date_elem is None:
                     # vB3: inside first td of table usually "Yesterday, 10:00 PM"
                     # Hard to pinpoint, try searching text node with date pattern?
                     # Or look for class="time"
-                    date_elem = item.find('span', class_='time')
+                    date_elem = self.SEL_TIME.find(item)
 
-                if date_elem:
-                     date_str = date_elem.get_parent().get_text(strip=True) # Get date + time
+                if date_elem is not None:
+                    date_str = get_text(parent(date_elem))  # Get date + time
                 else:
                     # Fallback text search at top of post
-                    text_nodes = item.stripped_strings
-                    for s in text_nodes:
+                    for s in stripped_strings(item):
                         # Simple heuristic: if it contains a year or "Ayer/Hoy"
                         if any(x in s.lower() for x in ['ayer', 'hoy', '202']):
                             date_str = s
@@ -131,25 +159,26 @@ class VBulletinScraper(BaseScraper):
                 # Content
                 content = ""
                 # vB4
-                msg_div = item.find('div', class_='content')
-                if not msg_div:
+                msg_div = self.SEL_CONTENT.find(item)
+                if msg_div is None:
                     # vB3
-                    msg_div = item.find('div', id=re.compile(r'post_message_'))
+                    msg_div = self.SEL_CONTENT_VB3.find(item)
 
-                if msg_div:
+                if msg_div is not None:
                     # Remove quotes
-                    for quote in msg_div.find_all('div', class_='quote'):
-                        quote.decompose()
-                    content = msg_div.get_text(separator='\n', strip=True)
+                    for quote in self.SEL_QUOTE.find_all(msg_div):
+                        decompose(quote)
+                    content = get_text(msg_div, separator='\n')
 
                 # Permalink
                 permalink = None
-                perma_elem = item.find('a', class_='postcounter')
-                if perma_elem:
+                perma_elem = self.SEL_POSTCOUNTER.find(item)
+                if perma_elem is not None:
                     permalink = perma_elem.get('href')
 
                 post = Post(
-                    id=post_id or f"unknown-{len(posts_data)}",
+                    # Sans id natif : identifiant dérivé du contenu et de la date brute
+                    id=post_id or Post.content_id(topic_id, author, date_str, content),
                     topic_id=topic_id,
                     author=author,
                     date=date_obj,
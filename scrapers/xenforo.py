@@ -1,12 +1,29 @@
-from typing import List, Optional
-from bs4 import BeautifulSoup
+from typing import List
 from scrapers.base import BaseScraper
+from scrapers.fastparse import Node, Selector, decompose, get_text
 from models.post import Post
 import re
 import logging
 
 class XenForoScraper(BaseScraper):
 
+    PAGE_SUFFIX = re.compile(r'page-\d+')
+
+    # Sélecteurs compilés une fois (XPath sur lxml, find / find_all sur BeautifulSoup)
+    SEL_PAGENAV = Selector('nav', 'pageNavWrapper')
+    SEL_PAGENAV_PAGE = Selector('li', 'pageNav-page')
+    SEL_LINK = Selector('a')
+    SEL_ARTICLE = Selector('article', 'message')
+    SEL_ARTICLE_FALLBACK = Selector('div', 'message')
+    SEL_USERNAME_LINK = Selector('a', 'username')
+    SEL_USERNAME_SPAN = Selector('span', 'username')
+    SEL_TIME = Selector('time')
+    SEL_ATTRIBUTION = Selector('div', 'message-attribution')
+    SEL_BBWRAPPER = Selector('div', 'bbWrapper')
+    SEL_MESSAGE_BODY = Selector('div', 'message-body')
+    SEL_BLOCKQUOTE = Selector('blockquote')
+    SEL_PERMALINK = Selector('a', 'u-concealed')
+
     def get_page_url(self, base_url: str, page_num: int) -> str:
         """
         Construit l'URL XenForo.
@@ -17,48 +34,47 @@ class XenForoScraper(BaseScraper):
 
         # Check if already has page-X
         if 'page-' in base_url:
-            return re.sub(r'page-\d+', f'page-{page_num}', base_url)
+            return self.PAGE_SUFFIX.sub(f'page-{page_num}', base_url)
 
         # Add page-X at the end
         if base_url.endswith('/'):
             return f"{base_url}page-{page_num}"
         return f"{base_url}/page-{page_num}"
 
-    def get_total_pages(self, soup: BeautifulSoup) -> int:
+    def get_total_pages(self, root: Node) -> int:
         """
         XenForo pagination structure:
         <ul class="pageNav-main"> ... <li class="pageNav-page"><a href="...">LastPage</a></li>
         """
-        nav = soup.find('nav', class_='pageNavWrapper')
-        if not nav:
+        nav = self.SEL_PAGENAV.find(root)
+        if nav is None:
             return 1
 
         # Try to find the last page number in the navigation list
-        pages = nav.find_all('li', class_='pageNav-page')
+        pages = self.SEL_PAGENAV_PAGE.find_all(nav)
         if pages:
             try:
-                return int(pages[-1].get_text(strip=True))
+                return int(get_text(pages[-1]))
             except ValueError:
                 pass
 
         # Sometimes structure is simpler, just look for integers in pageNav
-        links = nav.find_all('a')
         max_page = 1
-        for link in links:
-            txt = link.get_text(strip=True)
+        for link in self.SEL_LINK.find_all(nav):
+            txt = get_text(link)
             if txt.isdigit():
                 max_page = max(max_page, int(txt))
         return max_page
 
-    def parse_posts(self, soup: BeautifulSoup, topic_id: str) -> List[dict]:
+    def parse_posts(self, root: Node, topic_id: str) -> List[dict]:
         posts_data = []
 
         # XenForo posts are usually in article.message
-        articles = soup.find_all('article', class_='message')
+        articles = self.SEL_ARTICLE.find_all(root)
 
         if not articles:
             # Fallback for some themes
-            articles = soup.find_all('div', class_='message')
+            articles = self.SEL_ARTICLE_FALLBACK.find_all(root)
 
         for article in articles:
             try:
@@ -70,49 +86,51 @@ class XenForoScraper(BaseScraper):
                 # Author
                 author = article.get('data-author', 'Inconnu')
                 if author == 'Inconnu':
-                    author_elem = article.find('a', class_='username') or article.find('span', class_='username')
-                    if author_elem:
-                        author = author_elem.get_text(strip=True)
+                    author_elem = self.SEL_USERNAME_LINK.find(article)
+                    if author_elem is None:
+                        author_elem = self.SEL_USERNAME_SPAN.find(article)
+                    if author_elem is not None:
+                        author = get_text(author_elem)
 
                 # Date
-                date_elem = article.find('time')
+                date_elem = self.SEL_TIME.find(article)
                 date_str = ""
-                date_val = None
 
-                if date_elem:
+                if date_elem is not None:
                     # Prefer datetime attribute (ISO)
                     if date_elem.get('datetime'):
                         date_str = date_elem.get('datetime')
                     else:
-                        date_str = date_elem.get_text(strip=True)
+                        date_str = get_text(date_elem)
                 else:
                     # Fallback to finding date in header
-                    header = article.find('div', class_='message-attribution')
-                    if header:
-                        date_str = header.get_text(strip=True)
+                    header = self.SEL_ATTRIBUTION.find(article)
+                    if header is not None:
+                        date_str = get_text(header)
 
                 date_obj = Post.parse_spanish_date(date_str)
 
                 # Content
-                content_div = article.find('div', class_='bbWrapper')
-                if not content_div:
-                    content_div = article.find('div', class_='message-body')
+                content_div = self.SEL_BBWRAPPER.find(article)
+                if content_div is None:
+                    content_div = self.SEL_MESSAGE_BODY.find(article)
 
                 content = ""
-                if content_div:
+                if content_div is not None:
                     # Remove quotes to avoid duplicating text
-                    for quote in content_div.find_all('blockquote'):
-                        quote.decompose()
-                    content = content_div.get_text(separator='\n', strip=True)
+                    for quote in self.SEL_BLOCKQUOTE.find_all(content_div):
+                        decompose(quote)
+                    content = get_text(content_div, separator='\n')
 
                 # Permalink
                 permalink = None
-                perma_elem = article.find('a', class_='u-concealed')
-                if perma_elem and perma_elem.get('href'):
+                perma_elem = self.SEL_PERMALINK.find(article)
+                if perma_elem is not None and perma_elem.get('href'):
                     permalink = perma_elem.get('href')
 
                 post = Post(
-                    id=post_id or f"unknown-{len(posts_data)}",
+                    # Sans id natif : identifiant dérivé du contenu et de la date brute
+                    id=post_id or Post.content_id(topic_id, author, date_str, content),
                     topic_id=topic_id,
                     author=author,
                     date=date_obj,
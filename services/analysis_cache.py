@@ -0,0 +1,77 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+from config import DATA_DIR
+
+
+class AnalysisCache:
+    """
+    Cache disque des réponses Gemini, adressé par contenu.
+
+    La clé est le hash SHA-256 du modèle, du type d'appel (analyse complète, bloc, fusion),
+    des instructions et du contenu envoyé : une même question sur les mêmes messages
+    n'appelle le modèle qu'une fois. En map-reduce, chaque bloc est mis en cache séparément :
+    ajouter quelques messages ne relance que les blocs modifiés et la fusion.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.path.join(DATA_DIR, "analysis_cache")
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            data = part.encode("utf-8")
+            # Longueur en préfixe : ("ab", "c") et ("a", "bc") donnent des clés différentes
+            digest.update(f"{len(data)}:".encode("ascii"))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str, count_miss: bool = True) -> Optional[str]:
+        """
+        Résultat en cache, ou None. Un miss compte comme un appel au modèle, sauf avec
+        count_miss=False (simple vérification, l'appel n'est pas forcément fait ensuite).
+        """
+        path = self._path(key)
+        result = None
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    result = json.load(f)["result"]
+            except (OSError, KeyError, json.JSONDecodeError) as e:
+                logging.warning(f"Entrée de cache d'analyse illisible ({key}): {e}")
+        with self._lock:
+            if result is not None:
+                self.hits += 1
+            elif count_miss:
+                self.misses += 1
+        return result
+
+    def store(self, key: str, result: str, kind: str = "") -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"kind": kind, "result": result, "stored_at": datetime.now().isoformat()},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def clear(self) -> None:
+        """Vide le cache disque"""
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
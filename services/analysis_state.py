@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Optional, List
+from jsonstore import JsonStore
+from models.post import posts_after_mark
+
+
+class AnalysisStateStore(JsonStore):
+    """
+    État de l'analyse incrémentale par sujet : dernier résumé produit et high-water mark
+    des posts déjà analysés (dernier id / dernière date), pour un jeu d'instructions donné.
+    Persisté en JSON (reset(topic_id) oublie l'état d'un sujet).
+    """
+
+    FILENAME = "analysis_state.json"
+    LABEL = "État d'analyse"
+
+    def get(self, topic_id: str) -> Optional[dict]:
+        with self._lock:
+            state = self._data.get(topic_id)
+            return dict(state) if state else None
+
+    def update(self, topic_id: str, summary: str, posts: List[dict], instructions_key: str) -> None:
+        """Enregistre le résumé d'un sujet et la marque du dernier post analysé"""
+        if not posts:
+            return
+        last_post = posts[-1]
+        with self._lock:
+            previous = self._data.get(topic_id) or {}
+            same_run = previous.get("instructions_key") == instructions_key
+            self._data[topic_id] = {
+                "summary": summary,
+                "instructions_key": instructions_key,
+                "last_post_id": last_post.get("id"),
+                "last_post_date": last_post.get("date"),
+                "analysed_posts": (previous.get("analysed_posts", 0) if same_run else 0) + len(posts),
+                "updated_at": datetime.now().isoformat(),
+            }
+            self._save()
+
+    @staticmethod
+    def new_posts(posts: List[dict], state: dict) -> List[dict]:
+        """Posts postérieurs à la marque de l'état (voir models.post.posts_after_mark)"""
+        return posts_after_mark(posts, state)
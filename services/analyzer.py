@@ -1,22 +1,59 @@
 import google.generativeai as genai
+import hashlib
 import logging
-from typing import Optional
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, List, Tuple
+from services.analysis_cache import AnalysisCache
+from services.analysis_state import AnalysisStateStore
+from services.relevance import select_relevant
 
 class AnalyzerService:
 
-    def __init__(self, api_key: str):
+    MODEL_NAME = 'gemini-1.5-flash'
+    # Budget d'un bloc envoyé en une fois (estimation grossière, voir estimate_tokens)
+    CHUNK_TOKENS = 24000
+    # Découpage par ancres (voir chunk_text), en fraction de la taille max d'un bloc :
+    # ancres rares avant CHUNK_FILL (une tous les ~3 blocs), fréquentes ensuite
+    CHUNK_FILL = 0.8
+    CHUNK_EARLY_ANCHOR_SPACING = 3.0
+    CHUNK_ANCHOR_SPACING = 0.15
+    # Début d'un message dans le texte formaté : on ne coupe qu'à ces frontières
+    MESSAGE_BOUNDARY = re.compile(r'(?m)^(?=--- Message de )')
+
+    def __init__(self, api_key: str, model_name: Optional[str] = None, max_workers: int = 4,
+                 chunk_tokens: Optional[int] = None, cache: Optional[AnalysisCache] = None):
         if not api_key:
             raise ValueError("API Key is missing")
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+        self.model_name = model_name or self.MODEL_NAME
+        self.model = genai.GenerativeModel(self.model_name)
+        self.max_workers = max(1, max_workers)
+        self.chunk_tokens = chunk_tokens or self.CHUNK_TOKENS
+        self.cache = cache
+
+    def _generate(self, prompt: str) -> str:
+        """Un appel au modèle (les erreurs remontent à l'appelant)"""
+        return self.model.generate_content(prompt).text
 
-    def analyze_posts(self, posts_text: str, instructions: str) -> Optional[str]:
+    def _generate_cached(self, kind: str, prompt: str, instructions: str, *content: str) -> str:
         """
-        Envoie les posts à Gemini pour analyse.
+        Appel au modèle via le cache : la clé porte sur le modèle, le type d'appel,
+        les instructions et le contenu (pas sur le gabarit du prompt).
         """
-        try:
-            # Construct prompt
-            prompt = f"""
+        if not self.cache:
+            return self._generate(prompt)
+        key = AnalysisCache.make_key(self.model_name, kind, instructions, *content)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        result = self._generate(prompt)
+        self.cache.store(key, result, kind)
+        return result
+
+    @staticmethod
+    def _task_prompt(instructions: str, posts_text: str) -> str:
+        return f"""
             Tu es un expert en analyse de discussions de forums.
             Voici une série de messages extraits d'un forum (traduits en français).
 
@@ -24,22 +61,304 @@ class AnalyzerService:
             {instructions}
 
             CONTENU A ANALYSER:
-            {posts_text[:30000]}  # Limit context window safety check
+            {posts_text}
             """
 
-            response = self.model.generate_content(prompt)
-            return response.text
+    @staticmethod
+    def _map_prompt(instructions: str, posts_text: str, part: int, parts: int) -> str:
+        return f"""
+            Tu es un expert en analyse de discussions de forums.
+            Voici la partie {part}/{parts} d'une série de messages extraits d'un forum (traduits en français).
+            Ton analyse sera fusionnée avec celles des autres parties : reste factuel, garde les
+            noms d'auteurs, dates et éléments marquants utiles à la synthèse finale.
+
+            TACHE:
+            {instructions}
+
+            CONTENU A ANALYSER:
+            {posts_text}
+            """
+
+    @staticmethod
+    def _reduce_prompt(instructions: str, partials: List[str]) -> str:
+        sections = "\n\n".join(f"=== Analyse partielle {i} ===\n{text}" for i, text in enumerate(partials, 1))
+        return f"""
+            Tu es un expert en analyse de discussions de forums.
+            Une longue discussion a été analysée par parties successives. Fusionne ces analyses
+            partielles en une analyse unique et cohérente de toute la discussion (sans doublons,
+            sans mentionner le découpage en parties).
+
+            TACHE:
+            {instructions}
+
+            ANALYSES PARTIELLES:
+            {sections}
+            """
+
+    @staticmethod
+    def _rolling_prompt(instructions: str, previous_summary: str, posts_text: str) -> str:
+        return f"""
+            Tu es un expert en analyse de discussions de forums.
+            Une discussion suivie a déjà été analysée ; de nouveaux messages ont été publiés depuis.
+            Mets à jour l'analyse précédente avec ces nouveaux messages et renvoie l'analyse complète
+            à jour (pas seulement les nouveautés), en respectant la tâche ci-dessous.
+
+            TACHE:
+            {instructions}
+
+            ANALYSE PRECEDENTE:
+            {previous_summary}
+
+            NOUVEAUX MESSAGES:
+            {posts_text}
+            """
+
+    def analyze_posts(self, posts_text: str, instructions: str, progress_callback=None) -> Tuple[Optional[str], int]:
+        """
+        Envoie les posts à Gemini pour analyse.
+        Au-delà d'un bloc (chunk_tokens), analyse en map-reduce : les blocs sont analysés en
+        parallèle (max_workers appels simultanés), puis les analyses partielles sont fusionnées.
+        progress_callback(done, total) est appelé à chaque bloc analysé.
+        Retourne (analyse, nombre de blocs en erreur) : avec des blocs en erreur, l'analyse
+        ne couvre pas tous les messages.
+        """
+        try:
+            return self._analyze(posts_text, instructions, progress_callback)
         except Exception as e:
             logging.error(f"Gemini Analysis Error: {e}")
+            return f"Erreur lors de l'analyse : {str(e)}", 0
+
+    def analyze_incremental(self, topic_id: str, posts: List[dict], instructions: str,
+                            state_store: AnalysisStateStore, progress_callback=None) -> Optional[str]:
+        """
+        Analyse glissante d'un sujet suivi : seuls les posts postérieurs à la dernière analyse
+        sont envoyés, avec le résumé précédent, pour obtenir un résumé mis à jour.
+        Sans état (ou si les instructions ou le modèle ont changé), analyse complète.
+        Si un bloc échoue, le passage échoue sans avancer l'état : les messages seront
+        renvoyés au passage suivant (les blocs réussis sont repris du cache).
+        """
+        instructions_key = AnalysisCache.make_key(self.model_name, instructions)
+        state = state_store.get(topic_id)
+        if state and state.get("instructions_key") != instructions_key:
+            state = None
+
+        try:
+            if state is None:
+                result, failed = self._analyze(self.format_posts_for_analysis(posts), instructions, progress_callback)
+                if failed:
+                    raise RuntimeError(f"analyse incomplète ({failed} bloc(s) en erreur)")
+                state_store.update(topic_id, result, posts, instructions_key)
+                return result
+
+            new_posts = state_store.new_posts(posts, state)
+            if not new_posts:
+                if progress_callback:
+                    progress_callback(1, 1)
+                return state["summary"]
+
+            posts_text = self.format_posts_for_analysis(new_posts)
+            chunks = self.chunk_text(posts_text, self.chunk_tokens)
+            if len(chunks) > 1:
+                # Beaucoup de nouveautés : elles sont d'abord analysées par blocs
+                partials, failed = self._map(chunks, instructions, progress_callback)
+                if failed:
+                    raise RuntimeError(f"analyse incomplète ({failed}/{len(chunks)} bloc(s) en erreur)")
+                posts_text = "\n\n".join(partials)
+            result = self._generate_cached("rolling", self._rolling_prompt(instructions, state["summary"], posts_text),
+                                           instructions, state["summary"], posts_text)
+            if progress_callback and len(chunks) <= 1:
+                progress_callback(1, 1)
+            state_store.update(topic_id, result, new_posts, instructions_key)
+            return result
+        except Exception as e:
+            logging.error(f"Gemini Analysis Error ({topic_id}): {e}")
             return f"Erreur lors de l'analyse : {str(e)}"
 
+    def _analyze(self, posts_text: str, instructions: str, progress_callback=None) -> Tuple[str, int]:
+        """
+        Analyse complète (un appel, ou map-reduce) ; les erreurs remontent à l'appelant.
+        Retourne (analyse, nombre de blocs en erreur).
+        """
+        chunks = self.chunk_text(posts_text, self.chunk_tokens)
+        if len(chunks) <= 1:
+            result = self._generate_cached("analysis", self._task_prompt(instructions, posts_text),
+                                           instructions, posts_text)
+            if progress_callback:
+                progress_callback(1, 1)
+            return result, 0
+
+        # Analyse complète déjà en cache : aucun appel. Une absence n'est pas comptée comme
+        # un appel à Gemini : les blocs et la fusion peuvent encore venir du cache.
+        key = AnalysisCache.make_key(self.model_name, "analysis", instructions, posts_text)
+        if self.cache:
+            cached = self.cache.get(key, count_miss=False)
+            if cached is not None:
+                if progress_callback:
+                    progress_callback(len(chunks), len(chunks))
+                return cached, 0
+
+        partials, failed = self._map(chunks, instructions, progress_callback)
+        result = self._reduce(partials, instructions)
+        if self.cache and not failed:
+            # Une analyse incomplète (blocs en erreur) n'est pas mise en cache
+            self.cache.store(key, result, "analysis")
+        return result, failed
+
+    def _map(self, chunks: List[str], instructions: str, progress_callback=None) -> Tuple[List[str], int]:
+        """
+        Analyse chaque bloc en parallèle ; les résultats gardent l'ordre des blocs.
+        Retourne (analyses partielles, nombre de blocs en erreur).
+        """
+        total = len(chunks)
+        partials: List[Optional[str]] = [None] * total
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._generate_cached, "map", self._map_prompt(instructions, chunk, i + 1, total),
+                                instructions, chunk): i
+                for i, chunk in enumerate(chunks)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    partials[i] = future.result()
+                except Exception as e:
+                    logging.error(f"Gemini Analysis Error (partie {i + 1}/{total}): {e}")
+                done += 1
+                if progress_callback:
+                    progress_callback(done, total)
+
+        results = [p for p in partials if p]
+        if not results:
+            raise RuntimeError("aucune partie n'a pu être analysée")
+        if len(results) < total:
+            logging.warning(f"Analyse incomplète : {total - len(results)}/{total} parties en erreur")
+        return results, total - len(results)
+
+    def _reduce(self, partials: List[str], instructions: str) -> str:
+        """Fusionne les analyses partielles, par étages si elles dépassent elles-mêmes un bloc"""
+        while len(partials) > 1:
+            groups, current, size = [], [], 0
+            for partial in partials:
+                tokens = self.estimate_tokens(partial)
+                if current and size + tokens > self.chunk_tokens:
+                    groups.append(current)
+                    current, size = [], 0
+                current.append(partial)
+                size += tokens
+            groups.append(current)
+
+            if len(groups) == 1:
+                return self._merge(partials, instructions)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                partials = list(executor.map(
+                    lambda group: self._merge(group, instructions) if len(group) > 1 else group[0],
+                    groups
+                ))
+        return partials[0]
+
+    def _merge(self, partials: List[str], instructions: str) -> str:
+        return self._generate_cached("reduce", self._reduce_prompt(instructions, partials), instructions, *partials)
+
     @staticmethod
-    def format_posts_for_analysis(posts: list) -> str:
+    def estimate_tokens(text: str) -> int:
+        """Estimation grossière du nombre de tokens (~4 caractères par token)"""
+        return len(text) // 4 + 1
+
+    @classmethod
+    def chunk_text(cls, posts_text: str, max_tokens: int) -> List[str]:
+        """
+        Découpe le texte formaté en blocs d'au plus max_tokens, aux frontières de messages.
+        Un message seul plus gros qu'un bloc est réparti sur plusieurs blocs (voir split_message).
+
+        Les blocs se ferment sur des messages « ancres » choisis d'après leur seul contenu
+        (voir is_anchor), et non quand le bloc est plein : un message ajouté au milieu du
+        corpus ne change que son bloc et les quelques suivants, le temps que le découpage se
+        recale : les autres gardent leur contenu et donc leur entrée dans le cache d'analyse. Les ancres sont rares tant que le bloc
+        n'est pas rempli à CHUNK_FILL (elles suffisent à recaler le découpage après un ajout),
+        fréquentes ensuite : les blocs restent proches de la taille max, et le nombre d'appels
+        proche de celui d'un remplissage glouton.
+        """
+        max_chars = max_tokens * 4
+        # Un texte qui tient dans un bloc reste d'un seul tenant (un seul appel, sans fusion)
+        chunked = len(posts_text) > max_chars
+        fill_chars = max_chars * cls.CHUNK_FILL
+        early_anchor_chars = max_chars * cls.CHUNK_EARLY_ANCHOR_SPACING
+        anchor_chars = max_chars * cls.CHUNK_ANCHOR_SPACING
+        chunks, current, size = [], [], 0
+        for message in cls.MESSAGE_BOUNDARY.split(posts_text):
+            if not message.strip():
+                continue
+            for piece in cls.split_message(message, max_chars):
+                if current and size + len(piece) > max_chars:
+                    chunks.append("".join(current))
+                    current, size = [], 0
+                current.append(piece)
+                size += len(piece)
+                if chunked and cls.is_anchor(piece, anchor_chars if size >= fill_chars else early_anchor_chars):
+                    chunks.append("".join(current))
+                    current, size = [], 0
+        if current:
+            chunks.append("".join(current))
+        return chunks
+
+    @staticmethod
+    def is_anchor(message: str, target_chars: float) -> bool:
+        """
+        Le message ferme-t-il son bloc ? Tirage déterministe sur le hash du message, avec une
+        probabilité proportionnelle à sa taille : une ancre tous les ~target_chars caractères.
+        """
+        digest = hashlib.sha256(message.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64 < len(message) / target_chars
+
+    @staticmethod
+    def split_message(message: str, max_chars: int) -> List[str]:
+        """
+        Coupe un message trop long en morceaux d'au plus max_chars, de préférence à un saut de
+        ligne ou une espace. Chaque suite reprend l'en-tête (auteur, date) marqué "(suite)".
+        """
+        if len(message) <= max_chars:
+            return [message]
+        header, _, body = message.partition("\n")
+        continuation = f"{header} (suite)\n"
+        pieces, prefix = [], f"{header}\n"
+        while body:
+            room = max(1, max_chars - len(prefix) - 1)
+            if len(body) <= room:
+                cut = len(body)
+            else:
+                cut = max(body.rfind("\n", 0, room), body.rfind(" ", 0, room)) + 1 or room
+            piece = prefix + body[:cut]
+            pieces.append(piece if piece.endswith("\n") else piece + "\n")
+            body = body[cut:]
+            prefix = continuation
+        return pieces
+
+    @staticmethod
+    def format_post(p: dict) -> str:
+        """Formate un post en bloc de texte pour l'analyse"""
+        author = p.get('author', 'Inconnu')
+        date = p.get('date', '')
+        content = p.get('content_translated') or p.get('content_original', '')
+        return f"--- Message de {author} le {date} ---\n{content}\n"
+
+    @classmethod
+    def format_posts_for_analysis(cls, posts: list) -> str:
         """Helper to format posts into a string buffer"""
-        buffer = []
-        for p in posts:
-            author = p.get('author', 'Inconnu')
-            date = p.get('date', '')
-            content = p.get('content_translated') or p.get('content_original', '')
-            buffer.append(f"--- Message de {author} le {date} ---\n{content}\n")
-        return "\n".join(buffer)
+        return "\n".join(cls.format_post(p) for p in posts)
+
+    @classmethod
+    def select_relevant_posts(cls, posts: list, query: str, token_budget: int) -> Tuple[list, int]:
+        """
+        Pré-sélection locale : posts les plus pertinents pour la requête de l'utilisateur (BM25
+        sur le contenu traduit, sinon original), posts quasi vides écartés, dans la limite de
+        token_budget (estimé sur le texte formaté). Sans requête (instructions génériques
+        seulement), classement par richesse puis récence. Retourne (posts, tokens estimés).
+        """
+        return select_relevant(
+            posts,
+            query,
+            token_budget,
+            text_of=lambda p: p.get('content_translated') or p.get('content_original', ''),
+            cost_of=lambda p: cls.estimate_tokens(cls.format_post(p)),
+        )
@@ -0,0 +1,149 @@
+import gzip
+import io
+import json
+import os
+import re
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional
+from config import data_path
+from models.post import Post
+from services.post_store import PostStore
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Identifiants positionnels des exports v1.0 (rang du post dans sa page) : non uniques
+LEGACY_POSITIONAL_ID = re.compile(r"^unknown-\d+$")
+
+
+class BackupService:
+    """
+    Sauvegardes en flux : NDJSON compressé (gzip), un enregistrement par ligne.
+
+    Première ligne : {"type": "header", "version": "2.0", ...}, puis des enregistrements
+    "source", "post", "analysis" et "analysis_result". L'écriture lit le store par lots et
+    la lecture applique les posts par lots : la mémoire reste constante quelle que soit la
+    taille de la sauvegarde. Les exports JSON v1.0 (StorageService.export_to_json)
+    restent importables.
+    """
+
+    VERSION = "2.0"
+    POST_BATCH_SIZE = 1000
+
+    @staticmethod
+    def _line(record: dict) -> bytes:
+        return (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+    @classmethod
+    def write_backup(cls, fileobj: BinaryIO, store: PostStore, sources: List[dict],
+                     analysis_results: Optional[dict] = None) -> Dict[str, int]:
+        """Écrit la sauvegarde compressée dans fileobj. Retourne le nombre d'enregistrements par type."""
+        counts = {"source": 0, "post": 0, "analysis": 0, "analysis_result": 0}
+        with gzip.GzipFile(fileobj=fileobj, mode="wb") as gz:
+            gz.write(cls._line({
+                "type": "header",
+                "version": cls.VERSION,
+                "exported_at": datetime.now().isoformat(),
+                "posts": store.count_posts(),
+            }))
+            for source in sources:
+                gz.write(cls._line({"type": "source", "data": source}))
+                counts["source"] += 1
+            for posts in store.iter_posts(batch_size=cls.POST_BATCH_SIZE):
+                gz.write(b"".join(cls._line({"type": "post", "data": post}) for post in posts))
+                counts["post"] += len(posts)
+            for analysis in store.get_analyses():
+                gz.write(cls._line({"type": "analysis", "data": analysis}))
+                counts["analysis"] += 1
+            for key, value in (analysis_results or {}).items():
+                gz.write(cls._line({"type": "analysis_result", "key": key, "data": value}))
+                counts["analysis_result"] += 1
+        return counts
+
+    @classmethod
+    def export_to_file(cls, store: PostStore, sources: List[dict], analysis_results: Optional[dict] = None,
+                       path: Optional[str] = None) -> str:
+        """Écrit la sauvegarde sur disque (DATA_DIR/backups par défaut) et retourne son chemin"""
+        path = path or data_path("backups", f"forum_tracker_{datetime.now():%Y%m%d_%H%M%S}.ndjson.gz")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            cls.write_backup(f, store, sources, analysis_results)
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def _legacy_records(fileobj: BinaryIO) -> Iterator[dict]:
+        """Convertit un export JSON v1.0 (chargé d'un bloc) en enregistrements"""
+        content = json.load(io.TextIOWrapper(fileobj, encoding="utf-8"))
+        content = content.get("data", content)
+        yield {"type": "header", "version": "1.0"}
+        for source in content.get("sources", []):
+            yield {"type": "source", "data": source}
+        for posts in content.get("scraped_data", {}).values():
+            for post in posts:
+                yield {"type": "post", "data": post}
+        for key, value in content.get("analysis_results", {}).items():
+            yield {"type": "analysis_result", "key": key, "data": value}
+
+    @classmethod
+    def read_records(cls, fileobj: BinaryIO) -> Iterator[dict]:
+        """Enregistrements d'une sauvegarde (NDJSON gzip ou JSON v1.0), lus au fil de l'eau"""
+        if not hasattr(fileobj, "peek"):
+            fileobj = io.BufferedReader(fileobj)
+        if fileobj.peek(2)[:2] != GZIP_MAGIC:
+            yield from cls._legacy_records(fileobj)
+            return
+        with gzip.GzipFile(fileobj=fileobj, mode="rb") as gz:
+            for line in io.TextIOWrapper(gz, encoding="utf-8"):
+                if line.strip():
+                    yield json.loads(line)
+
+    @staticmethod
+    def _post_with_id(post: dict) -> dict:
+        """
+        Post d'une sauvegarde avec un identifiant utilisable : sans id, ou avec un id
+        positionnel v1.0 ("unknown-N", qui se télescopent entre pages et sujets), l'id est
+        recalculé à partir du contenu comme au scraping (Post.content_id).
+        """
+        post_id = post.get('id')
+        if post_id and not LEGACY_POSITIONAL_ID.match(str(post_id)):
+            return post
+        post_date = post.get('date')
+        if isinstance(post_date, str):
+            try:
+                post_date = datetime.fromisoformat(post_date)
+            except ValueError:
+                pass
+        return dict(post, id=Post.content_id(post['topic_id'], post.get('author'), post_date,
+                                             post.get('content_original')))
+
+    @classmethod
+    def restore(cls, fileobj: BinaryIO, store: PostStore) -> dict:
+        """
+        Restaure une sauvegarde dans le store (les posts sont fusionnés par lots ; une analyse
+        déjà présente n'est pas dupliquée, la restauration peut donc être rejouée).
+        Retourne {"version", "sources", "analysis_results", "counts"} : sources et résultats
+        d'analyse sont à replacer dans la session par l'appelant.
+        """
+        result = {"version": None, "sources": [], "analysis_results": {}, "counts": {"post": 0, "analysis": 0}}
+        batch = []
+        for record in cls.read_records(fileobj):
+            kind = record.get("type")
+            if kind == "post":
+                batch.append(cls._post_with_id(record["data"]))
+                if len(batch) >= cls.POST_BATCH_SIZE:
+                    result["counts"]["post"] += store.upsert_posts(batch)
+                    batch = []
+            elif kind == "header":
+                result["version"] = record.get("version")
+            elif kind == "source":
+                result["sources"].append(record["data"])
+            elif kind == "analysis":
+                data = record["data"]
+                if store.add_analysis(data["scope"], data["result"], data.get("instructions"), data.get("model"),
+                                      created_at=data.get("created_at")):
+                    result["counts"]["analysis"] += 1
+            elif kind == "analysis_result":
+                result["analysis_results"][record["key"]] = record["data"]
+        if batch:
+            result["counts"]["post"] += store.upsert_posts(batch)
+        return result
@@ -0,0 +1,139 @@
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Optional, Iterator, Dict
+from urllib.parse import urlparse
+from scrapers.factory import create_scraper
+from scrapers.pool import get_session_pool
+from services.watermarks import WatermarkStore
+from services.post_store import PostStore
+
+
+class ExtractionRunner:
+    """
+    Extraction de plusieurs sources en parallèle.
+
+    Les sources sont regroupées par hôte : chaque groupe est traité par un worker, les
+    sources d'un même forum l'une après l'autre (le limiteur de débit partagé s'applique
+    en plus), tandis que des forums différents avancent simultanément.
+    run() est un générateur d'événements (dicts) à consommer depuis le thread Streamlit :
+    - {"type": "start", "source": ...}
+    - {"type": "progress", "source": ..., "page": int, "total": int}
+    - {"type": "error", "source": ..., "error": str}
+    - {"type": "done", "source": ..., "posts": [...], "count": int, "watermark": dict}
+
+    Avec un post_store, les posts sont écrits par lots au fil de l'extraction au lieu d'être
+    accumulés en mémoire : "posts" est alors vide et "count" donne le nombre de posts écrits.
+    """
+
+    # Taille des lots écrits dans le post_store pendant l'extraction
+    STORE_BATCH_SIZE = 200
+
+    def __init__(self, max_workers: int = 4, watermarks: Optional[WatermarkStore] = None,
+                 post_store: Optional[PostStore] = None, store_batch_size: Optional[int] = None,
+                 **scraper_options):
+        self.max_workers = max(1, max_workers)
+        self.watermarks = watermarks
+        self.post_store = post_store
+        self.store_batch_size = store_batch_size or self.STORE_BATCH_SIZE
+        self.scraper_options = scraper_options
+
+    @staticmethod
+    def group_by_host(sources: List[dict]) -> Dict[str, List[dict]]:
+        groups = OrderedDict()
+        for source in sources:
+            groups.setdefault(urlparse(source['url']).netloc, []).append(source)
+        return groups
+
+    def _scrape_source(self, source: dict, events: queue.Queue, cancel: threading.Event,
+                       since_date: datetime, max_pages: int, seek: bool, incremental: bool) -> None:
+        events.put({"type": "start", "source": source})
+
+        def progress_cb(page, total):
+            events.put({"type": "progress", "source": source, "page": page, "total": total})
+
+        scraper = create_scraper(source, **self.scraper_options)
+        watermark = self.watermarks.get(source['id']) if incremental and self.watermarks else None
+        posts = []
+        count = 0
+        generator = scraper.scrape_all_pages(
+            base_url=source['url'],
+            topic_id=source['id'],
+            since_date=since_date,
+            max_pages=max_pages,
+            progress_callback=progress_cb,
+            seek=seek,
+            watermark=watermark
+        )
+        for item in generator:
+            if cancel.is_set():
+                generator.close()
+                return
+            if "error" in item:
+                events.put({"type": "error", "source": source, "error": item['error']})
+            else:
+                posts.append(item)
+                count += 1
+                if self.post_store and len(posts) >= self.store_batch_size:
+                    self.post_store.upsert_posts(posts)
+                    posts = []
+
+        if self.post_store and posts:
+            self.post_store.upsert_posts(posts)
+            posts = []
+        if self.watermarks:
+            self.watermarks.update(source['id'], scraper.watermark)
+        events.put({"type": "done", "source": source, "posts": posts, "count": count, "watermark": scraper.watermark})
+
+    def _run_group(self, group: List[dict], events: queue.Queue, cancel: threading.Event, **scrape_args) -> None:
+        try:
+            for source in group:
+                if cancel.is_set():
+                    return
+                try:
+                    self._scrape_source(source, events, cancel, **scrape_args)
+                except Exception as e:
+                    logging.error(f"Extraction error on {source.get('url')}: {e}")
+                    events.put({"type": "error", "source": source, "error": str(e)})
+                    events.put({"type": "done", "source": source, "posts": [], "count": 0, "watermark": None})
+        finally:
+            events.put({"type": "group_done"})
+
+    def run(
+        self,
+        sources: List[dict],
+        since_date: datetime,
+        max_pages: int = 5,
+        seek: bool = False,
+        incremental: bool = False
+    ) -> Iterator[dict]:
+        groups = self.group_by_host(sources)
+        if not groups:
+            return
+
+        events = queue.Queue()
+        cancel = threading.Event()
+        scrape_args = dict(since_date=since_date, max_pages=max_pages, seek=seek, incremental=incremental)
+
+        try:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups))) as executor:
+                for group in groups.values():
+                    executor.submit(self._run_group, group, events, cancel, **scrape_args)
+
+                remaining = len(groups)
+                try:
+                    while remaining:
+                        event = events.get()
+                        if event["type"] == "group_done":
+                            remaining -= 1
+                            continue
+                        yield event
+                finally:
+                    # Consommateur interrompu : les workers s'arrêtent à la page suivante
+                    cancel.set()
+        finally:
+            # Cookies posés par les forums (ex: clearance Cloudflare) gardés pour le prochain run
+            (self.scraper_options.get('pool') or get_session_pool()).save_cookies()
@@ -0,0 +1,211 @@
+import logging
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional
+from services.extraction import ExtractionRunner
+from services.post_store import PostStore
+from services.translator import TranslationService
+from services.watermarks import WatermarkStore
+
+# Fin de flux entre deux étages
+_END = object()
+
+
+class _TopicEnd(NamedTuple):
+    """Fin d'un sujet dans le flux : sa nouvelle marque et le nombre de lots envoyés avant elle"""
+    topic_id: str
+    watermark: dict
+    batches: int
+
+
+class _QueueSink:
+    """
+    Remplace le post_store et les watermarks de l'ExtractionRunner : les lots partent dans une
+    file bornée, et la marque d'un sujet terminé les suit dans le flux au lieu d'être
+    enregistrée aussitôt (l'écrivain ne l'enregistre qu'une fois tous ses lots stockés).
+    """
+
+    def __init__(self, posts_queue: queue.Queue, watermarks: Optional[WatermarkStore] = None):
+        self.posts_queue = posts_queue
+        self.watermarks = watermarks
+        self._lock = threading.Lock()
+        self._batches: Dict[str, int] = {}  # Lots envoyés par sujet en cours
+
+    def upsert_posts(self, posts: List[dict]) -> int:
+        with self._lock:
+            topic_id = posts[0]['topic_id']
+            self._batches[topic_id] = self._batches.get(topic_id, 0) + 1
+        # Bloque tant que la file est pleine : le scraping ralentit au rythme de la traduction
+        self.posts_queue.put(list(posts))
+        return len(posts)
+
+    def get(self, topic_id: str) -> Optional[dict]:
+        return self.watermarks.get(topic_id) if self.watermarks else None
+
+    def update(self, topic_id: str, mark: Optional[dict]) -> None:
+        with self._lock:
+            batches = self._batches.pop(topic_id, 0)
+        if mark and self.watermarks:
+            self.posts_queue.put(_TopicEnd(topic_id, mark, batches))
+
+
+class StreamingPipeline:
+    """
+    Extraction → traduction → stockage en flux, avec des files bornées entre les étages.
+
+    Les posts produits par scrape_all_pages partent par petits lots (batch_size) vers des
+    workers de traduction, puis vers un unique écrivain qui les fusionne dans le PostStore.
+    Une file pleine bloque l'étage précédent (contre-pression) : la mémoire dépend de
+    queue_size, pas de la taille du corpus, et un nouveau post est stocké traduit quelques
+    secondes après avoir été téléchargé.
+
+    La marque (watermark) d'un sujet n'est enregistrée qu'après l'écriture réussie de tous
+    ses lots : un arrêt, une erreur SQLite ou une annulation avant ne fait pas perdre de
+    posts, le run suivant repart de l'ancienne marque.
+
+    run() produit les événements de l'ExtractionRunner, plus
+    {"type": "stored", "topic_id": ..., "count": int, "translated": int} à chaque lot écrit.
+    """
+
+    def __init__(self, store: PostStore, translator: Optional[TranslationService] = None,
+                 max_workers: int = 4, translate_workers: int = 2, batch_size: int = 20,
+                 queue_size: int = 10, watermarks: Optional[WatermarkStore] = None, **scraper_options):
+        self.store = store
+        self.translator = translator
+        self.max_workers = max_workers
+        self.translate_workers = max(1, translate_workers)
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)  # En lots, pour chaque file
+        self.watermarks = watermarks
+        self.scraper_options = scraper_options
+
+    def _translate_batch(self, posts: List[dict]) -> int:
+        """Traduit un lot en réutilisant les traductions stockées des posts inchangés"""
+        known = self.store.known_translations(posts)
+        for post in posts:
+            translation = known.get((post['topic_id'], post['id']))
+            if translation:
+                post['content_translated'] = translation
+        pending = [post for post in posts if not post.get('content_translated')]
+        if pending:
+            self.translator.translate_posts(pending)
+        return len(pending)
+
+    def _translate_worker(self, posts_queue: queue.Queue, store_queue: queue.Queue,
+                          cancel: threading.Event) -> None:
+        try:
+            while True:
+                posts = posts_queue.get()
+                if posts is _END:
+                    return
+                if isinstance(posts, _TopicEnd):
+                    store_queue.put(posts)
+                    continue
+                translated = 0
+                # Interrompu : on stocke quand même ce qui a été extrait, sans le traduire
+                if self.translator and not cancel.is_set():
+                    try:
+                        translated = self._translate_batch(posts)
+                    except Exception as e:
+                        logging.error(f"Pipeline translation error: {e}")
+                store_queue.put((posts, translated))
+        finally:
+            store_queue.put(_END)
+
+    def _store_worker(self, store_queue: queue.Queue, events: queue.Queue) -> None:
+        lang = self.translator.target if self.translator else None
+        remaining = self.translate_workers
+        stored: Dict[str, int] = {}  # Lots écrits par sujet
+        failed = set()  # Sujets dont un lot n'a pas pu être écrit : marque non enregistrée
+        ends: Dict[str, _TopicEnd] = {}  # Marques en attente de leurs lots
+
+        def commit_watermark(topic_id: str) -> None:
+            # Les traducteurs en parallèle peuvent livrer la fin d'un sujet avant ses derniers lots
+            end = ends.get(topic_id)
+            if end and stored.get(topic_id, 0) >= end.batches:
+                self.watermarks.update(topic_id, end.watermark)
+                del ends[topic_id]
+
+        try:
+            while remaining:
+                item = store_queue.get()
+                if item is _END:
+                    remaining -= 1
+                    continue
+                if isinstance(item, _TopicEnd):
+                    if item.topic_id in failed:
+                        logging.warning(f"Watermark de {item.topic_id} non enregistré (lots non stockés)")
+                    else:
+                        ends[item.topic_id] = item
+                        commit_watermark(item.topic_id)
+                    continue
+                posts, translated = item
+                topic_id = posts[0]['topic_id']
+                try:
+                    self.store.upsert_posts(posts, lang=lang)
+                except Exception as e:
+                    logging.error(f"Pipeline storage error: {e}")
+                    failed.add(topic_id)
+                    ends.pop(topic_id, None)
+                    events.put({"type": "error", "source": None, "error": str(e)})
+                    continue
+                stored[topic_id] = stored.get(topic_id, 0) + 1
+                events.put({"type": "stored", "topic_id": topic_id, "count": len(posts), "translated": translated})
+                commit_watermark(topic_id)
+        finally:
+            events.put(_END)
+
+    def _scrape(self, runner: ExtractionRunner, posts_queue: queue.Queue, events: queue.Queue,
+                cancel: threading.Event, **run_args) -> None:
+        generator = runner.run(**run_args)
+        try:
+            for event in generator:
+                events.put(event)
+                if cancel.is_set():
+                    break
+        except Exception as e:
+            logging.error(f"Pipeline extraction error: {e}")
+            events.put({"type": "error", "source": None, "error": str(e)})
+        finally:
+            generator.close()
+            for _ in range(self.translate_workers):
+                posts_queue.put(_END)
+
+    def run(
+        self,
+        sources: List[dict],
+        since_date: datetime,
+        max_pages: int = 5,
+        seek: bool = False,
+        incremental: bool = False
+    ) -> Iterator[dict]:
+        posts_queue = queue.Queue(maxsize=self.queue_size)
+        store_queue = queue.Queue(maxsize=self.queue_size)
+        events = queue.Queue()
+        cancel = threading.Event()
+
+        # Le sink sert aussi de watermarks au runner : les marques suivent les lots dans le flux
+        sink = _QueueSink(posts_queue, self.watermarks)
+        runner = ExtractionRunner(max_workers=self.max_workers, watermarks=sink if self.watermarks else None,
+                                  post_store=sink, store_batch_size=self.batch_size, **self.scraper_options)
+        threads = [threading.Thread(target=self._scrape, args=(runner, posts_queue, events, cancel),
+                                    kwargs=dict(sources=sources, since_date=since_date, max_pages=max_pages,
+                                                seek=seek, incremental=incremental), daemon=True)]
+        threads += [threading.Thread(target=self._translate_worker, args=(posts_queue, store_queue, cancel),
+                                     daemon=True) for _ in range(self.translate_workers)]
+        threads.append(threading.Thread(target=self._store_worker, args=(store_queue, events), daemon=True))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                event = events.get()
+                if event is _END:
+                    return
+                yield event
+        finally:
+            # Consommateur interrompu : l'extraction s'arrête, les lots déjà extraits sont stockés
+            cancel.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,457 @@
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime, date, timedelta
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from config import data_path
+from models.post_table import PostTable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    url TEXT,
+    forum_type TEXT,
+    position INTEGER,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS posts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    topic_id TEXT NOT NULL,
+    author TEXT,
+    date TEXT,
+    content_original TEXT,
+    url TEXT,
+    scraped_at TEXT,
+    UNIQUE (topic_id, id)
+);
+CREATE INDEX IF NOT EXISTS idx_posts_topic_date ON posts(topic_id, date);
+CREATE INDEX IF NOT EXISTS idx_posts_id ON posts(id);
+CREATE TABLE IF NOT EXISTS translations (
+    topic_id TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    lang TEXT,
+    content_translated TEXT NOT NULL,
+    translated_at TEXT,
+    PRIMARY KEY (topic_id, post_id)
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT NOT NULL,
+    instructions TEXT,
+    model TEXT,
+    result TEXT NOT NULL,
+    created_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_scope ON analyses(scope, created_at);
+-- Un post dont le texte a changé (édité) perd sa traduction, devenue fausse
+CREATE TRIGGER IF NOT EXISTS posts_content_changed AFTER UPDATE OF content_original ON posts
+WHEN old.content_original IS NOT new.content_original BEGIN
+    DELETE FROM translations WHERE topic_id = new.topic_id AND post_id = new.id;
+END;
+"""
+
+# Index plein texte (FTS5) sur le contenu original et traduit, rowid = posts.seq.
+# Tenu à jour par triggers : chaque écriture de post ou de traduction le met à jour.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE posts_fts USING fts5(
+    content_original, content_translated,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, content_original, content_translated)
+    VALUES (new.seq, new.content_original,
+            (SELECT content_translated FROM translations WHERE topic_id = new.topic_id AND post_id = new.id));
+END;
+CREATE TRIGGER posts_fts_update AFTER UPDATE OF content_original ON posts BEGIN
+    UPDATE posts_fts SET content_original = new.content_original WHERE rowid = new.seq;
+END;
+CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN
+    DELETE FROM posts_fts WHERE rowid = old.seq;
+END;
+CREATE TRIGGER translations_fts_insert AFTER INSERT ON translations BEGIN
+    UPDATE posts_fts SET content_translated = new.content_translated
+    WHERE rowid = (SELECT seq FROM posts WHERE topic_id = new.topic_id AND id = new.post_id);
+END;
+CREATE TRIGGER translations_fts_update AFTER UPDATE OF content_translated ON translations BEGIN
+    UPDATE posts_fts SET content_translated = new.content_translated
+    WHERE rowid = (SELECT seq FROM posts WHERE topic_id = new.topic_id AND id = new.post_id);
+END;
+CREATE TRIGGER translations_fts_delete AFTER DELETE ON translations BEGIN
+    UPDATE posts_fts SET content_translated = NULL
+    WHERE rowid = (SELECT seq FROM posts WHERE topic_id = old.topic_id AND id = old.post_id);
+END;
+INSERT INTO posts_fts (rowid, content_original, content_translated)
+SELECT p.seq, p.content_original, t.content_translated
+FROM posts p LEFT JOIN translations t ON t.topic_id = p.topic_id AND t.post_id = p.id;
+"""
+
+# Mots (avec * final éventuel pour une recherche par préfixe) d'une requête utilisateur
+SEARCH_TERM = re.compile(r"\w+\*?", re.UNICODE)
+
+POST_COLUMNS = "p.seq, p.id, p.topic_id, p.author, p.date, p.content_original, t.content_translated, p.url"
+
+
+class PostStore:
+    """
+    Stockage persistant des sources, posts, traductions et analyses (SQLite, mode WAL).
+
+    Les posts sont écrits par lots au fil de l'extraction et relus par tranches paginées :
+    les pages Streamlit n'ont plus à garder toute l'extraction en mémoire, et les données
+    survivent à la fermeture de l'onglet. Les traductions sont dans une table à part :
+    re-scraper un sujet ne les écrase pas.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path("forumtracker.sqlite3")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        has_fts = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'"
+        ).fetchone()
+        if not has_fts:
+            # Création (et remplissage initial pour une base existante)
+            self._conn.executescript(FTS_SCHEMA)
+        self._conn.commit()
+
+    @staticmethod
+    def _row_to_post(row: sqlite3.Row) -> dict:
+        return {
+            "id": row["id"],
+            "topic_id": row["topic_id"],
+            "author": row["author"],
+            "date": row["date"],
+            "content_original": row["content_original"],
+            "content_translated": row["content_translated"],
+            "url": row["url"],
+        }
+
+    @staticmethod
+    def _date_str(value) -> Optional[str]:
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    # --- Sources ---
+
+    def replace_sources(self, sources: List[dict]) -> None:
+        """Remplace la liste des sources (configuration complète : cookies, user-agent...)"""
+        rows = [(s['id'], s.get('name'), s.get('url'), s.get('forum_type'), position,
+                 json.dumps(s, ensure_ascii=False, default=str))
+                for position, s in enumerate(sources)]
+        with self._lock:
+            self._conn.execute("DELETE FROM sources")
+            self._conn.executemany(
+                "INSERT INTO sources (id, name, url, forum_type, position, config) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def get_sources(self) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT config FROM sources ORDER BY position").fetchall()
+        return [json.loads(row["config"]) for row in rows]
+
+    # --- Posts ---
+
+    def upsert_posts(self, posts: Iterable[dict], batch_size: int = 500, lang: Optional[str] = None) -> int:
+        """
+        Insère ou fusionne des posts par lots (un commit par lot) ; accepte un générateur,
+        consommé au fil de l'eau. Les posts sont identifiés par (topic_id, id) via l'index
+        unique : un post déjà connu et inchangé n'est pas réécrit et garde sa traduction ;
+        un post modifié est mis à jour et sa traduction est invalidée.
+        Une traduction présente sur un post est enregistrée aussi (langue `lang`).
+        Retourne le nombre de posts traités.
+        """
+        written = 0
+        iterator = iter(posts)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return written
+            now = datetime.now().isoformat()
+            rows = [(p['id'], p['topic_id'], p.get('author'), self._date_str(p.get('date')),
+                     p.get('content_original'), p.get('url'), now) for p in batch]
+            with self._lock:
+                self._conn.executemany("""
+                    INSERT INTO posts (id, topic_id, author, date, content_original, url, scraped_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(topic_id, id) DO UPDATE SET
+                        author = excluded.author, date = excluded.date,
+                        content_original = excluded.content_original, url = excluded.url,
+                        scraped_at = excluded.scraped_at
+                    WHERE posts.content_original IS NOT excluded.content_original
+                       OR posts.author IS NOT excluded.author
+                       OR posts.date IS NOT excluded.date
+                       OR posts.url IS NOT excluded.url
+                """, rows)
+                self._save_translations([p for p in batch if p.get('content_translated')], lang, now)
+                self._conn.commit()
+            written += len(batch)
+
+    def _save_translations(self, posts: List[dict], lang: Optional[str], now: str) -> None:
+        self._conn.executemany("""
+            INSERT INTO translations (topic_id, post_id, lang, content_translated, translated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(topic_id, post_id) DO UPDATE SET
+                lang = excluded.lang, content_translated = excluded.content_translated,
+                translated_at = excluded.translated_at
+        """, [(p['topic_id'], p['id'], lang, p['content_translated'], now) for p in posts])
+
+    def save_translations(self, posts: List[dict], lang: Optional[str] = None) -> None:
+        """Enregistre le champ content_translated des posts donnés"""
+        with self._lock:
+            self._save_translations([p for p in posts if p.get('content_translated')], lang,
+                                    datetime.now().isoformat())
+            self._conn.commit()
+
+    def known_translations(self, posts: List[dict]) -> Dict[tuple, str]:
+        """
+        Traductions déjà stockées pour des posts (re-)scrapés, par (topic_id, id) : seulement
+        si le texte stocké est identique à celui du post (sinon la traduction est périmée).
+        """
+        keys = {(p['topic_id'], p['id']): p.get('content_original') for p in posts}
+        found = {}
+        with self._lock:
+            for (topic_id, post_id), content in keys.items():
+                row = self._conn.execute(
+                    "SELECT p.content_original, t.content_translated FROM posts p JOIN translations t "
+                    "ON t.topic_id = p.topic_id AND t.post_id = p.id WHERE p.topic_id = ? AND p.id = ?",
+                    (topic_id, post_id)).fetchone()
+                if row and row["content_original"] == content:
+                    found[(topic_id, post_id)] = row["content_translated"]
+        return found
+
+    def delete_topic(self, topic_id: str) -> None:
+        """Supprime les posts (et traductions) d'un sujet ; l'index plein texte suit par trigger"""
+        with self._lock:
+            self._conn.execute("DELETE FROM posts WHERE topic_id = ?", (topic_id,))
+            self._conn.execute("DELETE FROM translations WHERE topic_id = ?", (topic_id,))
+            self._conn.commit()
+
+    @staticmethod
+    def _where(topic_id: Optional[str], untranslated_only: bool) -> tuple:
+        clauses, params = [], []
+        if topic_id is not None:
+            clauses.append("p.topic_id = ?")
+            params.append(topic_id)
+        if untranslated_only:
+            clauses.append("t.content_translated IS NULL")
+        return clauses, params
+
+    def count_posts(self, topic_id: Optional[str] = None, untranslated_only: bool = False) -> int:
+        clauses, params = self._where(topic_id, untranslated_only)
+        sql = ("SELECT COUNT(*) FROM posts p LEFT JOIN translations t "
+               "ON t.topic_id = p.topic_id AND t.post_id = p.id")
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def topic_counts(self) -> Dict[str, int]:
+        """Nombre de posts par sujet"""
+        with self._lock:
+            rows = self._conn.execute("SELECT topic_id, COUNT(*) FROM posts GROUP BY topic_id").fetchall()
+        return {topic_id: count for topic_id, count in rows}
+
+    def _select(self, topic_id: Optional[str], untranslated_only: bool, suffix: str, extra: list) -> List[dict]:
+        clauses, params = self._where(topic_id, untranslated_only)
+        sql = (f"SELECT {POST_COLUMNS} FROM posts p LEFT JOIN translations t "
+               f"ON t.topic_id = p.topic_id AND t.post_id = p.id")
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            rows = self._conn.execute(f"{sql} ORDER BY p.topic_id, p.date, p.seq {suffix}", params + extra).fetchall()
+        return [self._row_to_post(row) for row in rows]
+
+    def get_posts(self, topic_id: Optional[str] = None, offset: int = 0, limit: int = 50,
+                  untranslated_only: bool = False) -> List[dict]:
+        """Tranche de posts, dans l'ordre chronologique de chaque sujet"""
+        return self._select(topic_id, untranslated_only, "LIMIT ? OFFSET ?", [limit, offset])
+
+    def load_posts(self, topic_id: Optional[str] = None) -> List[dict]:
+        """Tous les posts (d'un sujet), dans l'ordre chronologique : pour les traitements qui en ont besoin"""
+        return self._select(topic_id, False, "", [])
+
+    def load_tables(self, topic_id: Optional[str] = None) -> Dict[str, PostTable]:
+        """
+        Posts chargés en tables colonnes (une par sujet), directement depuis les lignes SQL :
+        représentation compacte pour les traitements sur tout le corpus.
+        """
+        clauses, params = self._where(topic_id, False)
+        sql = (f"SELECT {POST_COLUMNS} FROM posts p LEFT JOIN translations t "
+               f"ON t.topic_id = p.topic_id AND t.post_id = p.id")
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        tables: Dict[str, PostTable] = {}
+        with self._lock:
+            cursor = self._conn.execute(f"{sql} ORDER BY p.topic_id, p.date, p.seq", params)
+            for row in cursor:
+                table = tables.get(row["topic_id"])
+                if table is None:
+                    table = tables[row["topic_id"]] = PostTable(row["topic_id"])
+                table.add(row["id"], row["author"], row["date"], row["content_original"],
+                          row["content_translated"], row["url"])
+        return tables
+
+    def iter_posts(self, topic_id: Optional[str] = None, batch_size: int = 1000,
+                   untranslated_only: bool = False) -> Iterator[List[dict]]:
+        """
+        Parcourt les posts par lots (pagination par clé sur seq, donc stable même si
+        des traductions sont écrites pendant le parcours). Yield des listes de posts.
+        """
+        last_seq = 0
+        while True:
+            clauses, params = self._where(topic_id, untranslated_only)
+            clauses.append("p.seq > ?")
+            params.append(last_seq)
+            sql = (f"SELECT {POST_COLUMNS} FROM posts p LEFT JOIN translations t "
+                   f"ON t.topic_id = p.topic_id AND t.post_id = p.id "
+                   f"WHERE {' AND '.join(clauses)} ORDER BY p.seq LIMIT ?")
+            with self._lock:
+                rows = self._conn.execute(sql, params + [batch_size]).fetchall()
+            if not rows:
+                return
+            last_seq = rows[-1]["seq"]
+            yield [self._row_to_post(row) for row in rows]
+
+    # --- Recherche ---
+
+    @staticmethod
+    def _fts_query(text: str) -> str:
+        """Requête utilisateur en requête FTS5 sûre : chaque mot entre guillemets, tous requis"""
+        terms = []
+        for term in SEARCH_TERM.findall(text or ""):
+            prefix = term.endswith("*")
+            word = term.rstrip("*")
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+        return " ".join(terms)
+
+    def search(
+        self,
+        query: str,
+        topic_id: Optional[str] = None,
+        author: Optional[str] = None,
+        date_from: Optional[Union[date, datetime]] = None,
+        date_to: Optional[Union[date, datetime]] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Tuple[int, List[dict]]:
+        """
+        Recherche plein texte (contenu original et traduit), classée par pertinence (BM25).
+        Filtres optionnels : sujet, auteur, période (date_to incluse pour une date sans heure).
+        Retourne (nombre total de résultats, tranche de résultats) ; chaque résultat est un
+        post avec un extrait "snippet" (termes trouvés en **gras**) et son score.
+        """
+        fts_query = self._fts_query(query)
+        if not fts_query:
+            return 0, []
+
+        clauses, params = ["posts_fts MATCH ?"], [fts_query]
+        if topic_id is not None:
+            clauses.append("p.topic_id = ?")
+            params.append(topic_id)
+        if author:
+            clauses.append("p.author = ?")
+            params.append(author)
+        if date_from is not None:
+            clauses.append("p.date >= ?")
+            params.append(date_from.isoformat())
+        if date_to is not None:
+            if not isinstance(date_to, datetime):
+                date_to = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+                clauses.append("p.date < ?")
+            else:
+                clauses.append("p.date <= ?")
+            params.append(date_to.isoformat())
+
+        joins = ("FROM posts_fts JOIN posts p ON p.seq = posts_fts.rowid "
+                 "LEFT JOIN translations t ON t.topic_id = p.topic_id AND t.post_id = p.id "
+                 f"WHERE {' AND '.join(clauses)}")
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) {joins}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {POST_COLUMNS}, bm25(posts_fts) AS score, "
+                f"snippet(posts_fts, -1, '**', '**', '…', 16) AS snippet "
+                f"{joins} ORDER BY score LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+
+        results = []
+        for row in rows:
+            post = self._row_to_post(row)
+            post["snippet"] = row["snippet"]
+            post["score"] = -row["score"]  # bm25() de FTS5 : plus petit = plus pertinent
+            results.append(post)
+        return total, results
+
+    def authors(self, topic_id: Optional[str] = None) -> List[str]:
+        """Auteurs distincts (pour les filtres de recherche)"""
+        sql, params = "SELECT DISTINCT author FROM posts WHERE author IS NOT NULL", []
+        if topic_id is not None:
+            sql += " AND topic_id = ?"
+            params.append(topic_id)
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql + " ORDER BY author", params).fetchall()]
+
+    # --- Analyses ---
+
+    def add_analysis(self, scope: str, result: str, instructions: Optional[str] = None,
+                     model: Optional[str] = None, created_at: Optional[str] = None) -> bool:
+        """
+        Enregistre une analyse (datée de maintenant, sauf created_at fourni, ex: restauration).
+        Une analyse identique déjà présente (même scope, date, instructions et résultat) n'est
+        pas dupliquée. Retourne True si elle a été ajoutée.
+        """
+        created_at = created_at or datetime.now().isoformat()
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM analyses WHERE scope = ? AND created_at IS ? AND instructions IS ? AND result = ?",
+                (scope, created_at, instructions, result)
+            ).fetchone()
+            if exists:
+                return False
+            self._conn.execute(
+                "INSERT INTO analyses (scope, instructions, model, result, created_at) VALUES (?, ?, ?, ?, ?)",
+                (scope, instructions, model, result, created_at)
+            )
+            self._conn.commit()
+        return True
+
+    def latest_analysis(self, scope: Optional[str] = None) -> Optional[dict]:
+        """Dernière analyse enregistrée (pour un scope donné, ou toutes confondues)"""
+        where, params = ("WHERE scope = ? ", (scope,)) if scope is not None else ("", ())
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT scope, instructions, model, result, created_at FROM analyses "
+                f"{where}ORDER BY id DESC LIMIT 1", params
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_analyses(self) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT scope, instructions, model, result, created_at FROM analyses ORDER BY id"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_post_store: Optional[PostStore] = None
+_post_store_lock = threading.Lock()
+
+
+def get_post_store() -> PostStore:
+    """Store partagé par toutes les pages (une connexion par processus)"""
+    global _post_store
+    with _post_store_lock:
+        if _post_store is None:
+            _post_store = PostStore()
+        return _post_store
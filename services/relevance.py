@@ -0,0 +1,114 @@
+"""
+Pré-sélection locale des posts avant analyse : score BM25 par rapport à la requête de l'utilisateur,
+élimination des posts quasi vides, puis remplissage d'un budget de tokens par ordre de valeur.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Callable, List, Sequence, Tuple
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Mots vides français / espagnols (les instructions sont en français, les posts en FR ou ES)
+STOPWORDS = frozenset("""
+    les des une est que qui dans pour par sur avec pas plus sont ses son leur leurs aux
+    cette ces mais comme tout tous fait faire ete etre avoir elle ils nous vous sous
+    entre aussi donc alors tres bien sans dont meme autre autres quoi quel quelle
+    los las del una uno por para con que como pero mas sus esta este esto estos estas
+    hay muy sin sobre entre tambien todo todos cuando donde porque ser sido tiene
+    hace desde hasta nos
+""".split())
+
+
+def normalize_token(token: str) -> str:
+    """Minuscules, accents retirés : 'Résumé' et 'resume' sont le même terme"""
+    token = unicodedata.normalize("NFKD", token.lower())
+    return "".join(c for c in token if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = (normalize_token(t) for t in WORD_PATTERN.findall(text or ""))
+    return [t for t in tokens if len(t) > 2 and not t.isdigit() and t not in STOPWORDS]
+
+
+class BM25Index:
+    """Index BM25 (Okapi) en mémoire sur une liste de documents déjà tokenisés (voir tokenize)"""
+
+    def __init__(self, documents: Sequence[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokens) for tokens in documents]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        doc_freqs: Counter = Counter()
+        for tf in self.term_freqs:
+            doc_freqs.update(tf.keys())
+        n = len(self.term_freqs)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+
+    def scores(self, query: str) -> List[float]:
+        """Score BM25 de chaque document pour la requête"""
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        scores = [0.0] * len(self.term_freqs)
+        if not terms or not self.avg_length:
+            return scores
+        k1, b, avg = self.k1, self.b, self.avg_length
+        for i, (tf, length) in enumerate(zip(self.term_freqs, self.lengths)):
+            norm = k1 * (1 - b + b * length / avg)
+            score = 0.0
+            for term in terms:
+                f = tf.get(term)
+                if f:
+                    score += self.idf[term] * f * (k1 + 1) / (f + norm)
+            scores[i] = score
+        return scores
+
+    def richness(self) -> List[float]:
+        """Contenu informatif d'un document (somme des idf de ses termes distincts)"""
+        return [sum(self.idf[t] for t in tf) for tf in self.term_freqs]
+
+
+def is_substantive(tokens: List[str], min_terms: int = 3) -> bool:
+    """Un post quasi vide ("+1", "gracias", smiley...) n'apporte rien à l'analyse"""
+    return len(tokens) >= min_terms
+
+
+def select_relevant(
+    posts: List[dict],
+    query: str,
+    token_budget: int,
+    text_of: Callable[[dict], str],
+    cost_of: Callable[[dict], int],
+) -> Tuple[List[dict], int]:
+    """
+    Sélectionne les posts les plus pertinents pour la requête dans la limite du budget.
+    Tri par score BM25, puis par richesse et par récence (ordre d'origine) : sans requête,
+    c'est ce classement seul qui s'applique. Les posts retenus sont rendus dans leur ordre
+    d'origine. Retourne (posts retenus, tokens consommés).
+    """
+    # Chaque post n'est tokenisé qu'une fois (filtre des posts vides et index BM25)
+    candidates, documents = [], []
+    for post in posts:
+        tokens = tokenize(text_of(post))
+        if is_substantive(tokens):
+            candidates.append(post)
+            documents.append(tokens)
+    if not candidates:
+        return [], 0
+
+    index = BM25Index(documents)
+    scores = index.scores(query)  # Tous nuls sans requête
+    richness = index.richness()
+    ranked = sorted(range(len(candidates)), key=lambda i: (scores[i], richness[i], i), reverse=True)
+
+    chosen, used = [], 0
+    for i in ranked:
+        cost = cost_of(candidates[i])
+        if used + cost > token_budget:
+            continue  # Un post plus court peut encore tenir
+        chosen.append(i)
+        used += cost
+
+    return [candidates[i] for i in sorted(chosen)], used
@@ -0,0 +1,194 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from jsonstore import JsonStore
+from scrapers.pool import get_session_pool
+from scrapers.ratelimit import get_rate_limiter
+from services.analysis_cache import AnalysisCache
+from services.analysis_state import AnalysisStateStore
+from services.extraction import ExtractionRunner
+from services.pipeline import StreamingPipeline
+from services.post_store import PostStore
+from services.translation_cache import TranslationCache
+from services.translator import TranslationService
+from services.watermarks import WatermarkStore
+
+# Instructions par défaut (cases cochées par défaut sur la page Analyse IA)
+DEFAULT_INSTRUCTIONS = "\n".join([
+    "- Fais un résumé global de la discussion.",
+    "- Liste les points clés abordés sous forme de bullet points.",
+    "- Analyse le sentiment général (Positif/Négatif/Neutre) avec justification.",
+])
+
+
+class ScheduleStore(JsonStore):
+    """Date du dernier passage de chaque sujet, persistée pour que cron/systemd respectent les intervalles"""
+
+    FILENAME = "schedule.json"
+    LABEL = "Planning"
+
+    def last_run(self, topic_id: str) -> Optional[datetime]:
+        with self._lock:
+            value = self._data.get(topic_id)
+        return datetime.fromisoformat(value) if value else None
+
+    def mark_run(self, topic_ids: List[str], when: datetime) -> None:
+        with self._lock:
+            for topic_id in topic_ids:
+                self._data[topic_id] = when.isoformat()
+            self._save()
+
+
+class PipelineScheduler:
+    """
+    Exécution sans interface du pipeline extraction → traduction → analyse.
+
+    Chaque source a son intervalle ("interval_minutes" dans sa configuration, sinon
+    l'intervalle par défaut). À chaque passage, les sources dues sont extraites
+    (incrémentalement, via les watermarks), leurs nouveaux messages traduits puis,
+    avec une clé API, leur analyse glissante mise à jour. Tout est écrit dans le PostStore.
+    """
+
+    def __init__(
+        self,
+        sources: List[dict],
+        store: PostStore,
+        interval_minutes: float = 60,
+        since_days: int = 7,
+        max_pages: int = 5,
+        delay: float = 1.5,
+        max_workers: int = 4,
+        translate: bool = True,
+        source_lang: str = 'es',
+        target_lang: str = 'fr',
+        api_key: Optional[str] = None,
+        instructions: str = DEFAULT_INSTRUCTIONS,
+        schedule: Optional[ScheduleStore] = None,
+    ):
+        self.sources = sources
+        self.store = store
+        self.interval = timedelta(minutes=interval_minutes)
+        self.since_days = since_days
+        self.max_pages = max_pages
+        self.delay = delay
+        self.max_workers = max_workers
+        self.translate = translate
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.api_key = api_key
+        self.instructions = instructions
+        self.schedule = schedule or ScheduleStore()
+
+    def interval_for(self, source: dict) -> timedelta:
+        minutes = source.get("interval_minutes")
+        return timedelta(minutes=float(minutes)) if minutes else self.interval
+
+    def next_run(self, source: dict) -> datetime:
+        last = self.schedule.last_run(source['id'])
+        return last + self.interval_for(source) if last else datetime.min
+
+    def due_sources(self, now: Optional[datetime] = None) -> List[dict]:
+        now = now or datetime.now()
+        return [source for source in self.sources if self.next_run(source) <= now]
+
+    def _extract(self, sources: List[dict]) -> Dict[str, int]:
+        """Extraction des sources ; avec traduction, en flux (les posts sont traduits pendant l'extraction)"""
+        get_rate_limiter().set_defaults(rate=1 / self.delay)
+        if self.translate:
+            cache = TranslationCache()
+            translator = TranslationService(source=self.source_lang, target=self.target_lang, cache=cache)
+            runner = StreamingPipeline(self.store, translator, max_workers=self.max_workers,
+                                       watermarks=WatermarkStore(), delay=self.delay)
+        else:
+            cache = None
+            runner = ExtractionRunner(max_workers=self.max_workers, watermarks=WatermarkStore(),
+                                      post_store=self.store, delay=self.delay)
+        counts = {}
+        since_date = datetime.now() - timedelta(days=self.since_days)
+        try:
+            for event in runner.run(sources, since_date=since_date, max_pages=self.max_pages,
+                                    seek=True, incremental=True):
+                self._log_event(event, counts)
+        finally:
+            if cache:
+                cache.close()
+        return counts
+
+    @staticmethod
+    def _log_event(event: dict, counts: Dict[str, int]) -> None:
+        source = event.get("source")
+        if event["type"] == "error":
+            logging.error(f"[{source['name'] if source else 'pipeline'}] {event['error']}")
+        elif event["type"] == "done":
+            counts[source['id']] = event["count"]
+            logging.info(f"[{source['name']}] {event['count']} message(s) extrait(s)")
+
+    def _translate(self, sources: List[dict]) -> int:
+        """Rattrapage : posts encore non traduits (erreurs, extraction interrompue)"""
+        cache = TranslationCache()
+        translator = TranslationService(source=self.source_lang, target=self.target_lang,
+                                        max_workers=self.max_workers, cache=cache)
+        translated = 0
+        try:
+            for source in sources:
+                for posts in self.store.iter_posts(source['id'], batch_size=500, untranslated_only=True):
+                    translator.translate_posts(posts)
+                    self.store.save_translations(posts, lang=self.target_lang)
+                    translated += len(posts)
+        finally:
+            cache.close()
+        return translated
+
+    def _analyze(self, sources: List[dict]) -> int:
+        # Import tardif : le SDK Gemini n'est chargé que si une analyse est demandée
+        from services.analyzer import AnalyzerService
+
+        analyzer = AnalyzerService(self.api_key, max_workers=self.max_workers, cache=AnalysisCache())
+        state_store = AnalysisStateStore()
+        updated = 0
+        for source in sources:
+            posts = self.store.load_tables(source['id']).get(source['id'])
+            if not posts:
+                continue
+            previous = (state_store.get(source['id']) or {}).get("summary")
+            result = analyzer.analyze_incremental(source['id'], posts, self.instructions, state_store)
+            if result and result != previous and not result.startswith("Erreur lors de l'analyse"):
+                self.store.add_analysis(source['id'], result, instructions=self.instructions,
+                                        model=analyzer.model_name)
+                updated += 1
+        return updated
+
+    def run_once(self, now: Optional[datetime] = None) -> dict:
+        """Un passage sur les sources dues. Retourne un résumé du passage."""
+        now = now or datetime.now()
+        sources = self.due_sources(now)
+        summary = {"sources": len(sources), "posts": 0, "translated": 0, "analyses": 0}
+        if not sources:
+            return summary
+
+        logging.info(f"Passage sur {len(sources)} source(s) : {', '.join(s['name'] for s in sources)}")
+        summary["posts"] = sum(self._extract(sources).values())
+        if self.translate:
+            summary["translated"] = self._translate(sources)
+        if self.api_key:
+            summary["analyses"] = self._analyze(sources)
+        self.schedule.mark_run([source['id'] for source in sources], now)
+        for host, stats in get_session_pool().stats().items():
+            logging.info(f"Connexions {host} : {stats['requests']} requêtes, {stats['connections']} connexion(s)")
+        logging.info(f"Passage terminé : {summary}")
+        return summary
+
+    def run_forever(self, stop: Optional[threading.Event] = None) -> None:
+        """Enchaîne les passages, en dormant jusqu'à la prochaine échéance"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Passage interrompu : {e}")
+            if not self.sources:
+                return
+            wake_at = min(self.next_run(source) for source in self.sources)
+            # Au moins une minute entre deux passages (échéance dépassée après une erreur)
+            stop.wait(max((wake_at - datetime.now()).total_seconds(), 60))
@@ -1,14 +1,48 @@
 import json
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 import streamlit as st
+from services.analysis_state import AnalysisStateStore
+from services.post_store import PostStore, get_post_store
+from services.watermarks import WatermarkStore
 
 class StorageService:
     """
-    Gestion du stockage sans base de données.
-    Utilise st.session_state + export/import JSON.
+    Gestion du stockage.
+    Sources, posts, traductions et analyses sont persistés dans le PostStore (SQLite) ;
+    st.session_state ne garde que la configuration et les résultats légers.
+    Export/import JSON pour les sauvegardes.
     """
 
+    @staticmethod
+    def get_store() -> PostStore:
+        """Store persistant partagé"""
+        return get_post_store()
+
+    @staticmethod
+    def ensure_sources() -> List[dict]:
+        """Sources de la session, rechargées depuis le store au premier accès"""
+        if "sources" not in st.session_state:
+            st.session_state.sources = get_post_store().get_sources()
+        return st.session_state.sources
+
+    @staticmethod
+    def save_sources(sources: List[dict]) -> None:
+        """Met à jour les sources de la session et les persiste"""
+        st.session_state.sources = sources
+        get_post_store().replace_sources(sources)
+
+    @staticmethod
+    def delete_source(source_id: str) -> None:
+        """
+        Supprime une source et ce qui s'y rattache : posts, traductions et index plein texte,
+        watermark d'extraction et état de l'analyse incrémentale du sujet
+        """
+        StorageService.save_sources([s for s in st.session_state.sources if s['id'] != source_id])
+        get_post_store().delete_topic(source_id)
+        WatermarkStore().reset(source_id)
+        AnalysisStateStore().reset(source_id)
+
     @staticmethod
     def save_to_session(key: str, data: any) -> None:
         """Sauvegarde dans la session Streamlit"""
@@ -0,0 +1,129 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, Optional, Tuple
+from config import data_path
+
+# Espaces horizontaux répétés (les retours à la ligne sont conservés)
+HORIZONTAL_SPACES = re.compile(r'[ \t ]+')
+
+
+class TranslationCache:
+    """
+    Mémoire de traduction persistante (SQLite), partagée entre les sessions.
+
+    Clé : hash SHA-256 de (texte normalisé, langue source, langue cible). Les signatures,
+    réponses types et citations répétées ne sont traduites qu'une fois. La taille est
+    bornée à `max_entries` : au-delà, les entrées les moins récemment utilisées sont évincées.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 200_000):
+        self.path = path or data_path("translations.sqlite3")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalisation de la clé : Unicode NFC, espaces superflus retirés"""
+        text = unicodedata.normalize("NFC", text)
+        return "\n".join(HORIZONTAL_SPACES.sub(" ", line).strip() for line in text.strip().splitlines())
+
+    @classmethod
+    def make_key(cls, text: str, source: str, target: str) -> str:
+        raw = f"{source}\x00{target}\x00{cls.normalize(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, text: str, source: str, target: str) -> Optional[str]:
+        return self.get_many([text], source, target).get(text)
+
+    def get_many(self, texts: Iterable[str], source: str, target: str) -> Dict[str, str]:
+        """Traductions connues, indexées par texte d'origine (les absents sont des défauts)"""
+        keys: Dict[str, str] = {}
+        for text in texts:
+            keys.setdefault(self.make_key(text, source, target), text)
+        if not keys:
+            return {}
+
+        found: Dict[str, str] = {}
+        key_list = list(keys)
+        with self._lock:
+            # Par tranches pour rester sous la limite de paramètres SQLite
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, translation FROM translations WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, translation in rows:
+                    found[keys[key]] = translation
+                if rows:
+                    now = time.time()
+                    self._conn.executemany("UPDATE translations SET last_used = ? WHERE key = ?",
+                                           [(now, key) for key, _ in rows])
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, text: str, translation: str, source: str, target: str) -> None:
+        self.put_many([(text, translation)], source, target)
+
+    def put_many(self, pairs: Iterable[Tuple[str, str]], source: str, target: str) -> None:
+        """Enregistre des couples (texte, traduction), puis évince les plus anciens si besoin"""
+        now = time.time()
+        rows = [(self.make_key(text, source, target), source, target, translation, now)
+                for text, translation in pairs]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)", (excess,)
+            )
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM translations")
+            self._conn.commit()
+            self.hits = self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
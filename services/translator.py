@@ -1,47 +1,208 @@
 from deep_translator import GoogleTranslator
-from typing import List
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
 import logging
+import re
+import threading
+from scrapers.ratelimit import TokenBucket
+from services.translation_cache import TranslationCache
 
 class TranslationService:
 
-    def __init__(self, source: str = 'es', target: str = 'fr'):
-        self.translator = GoogleTranslator(source=source, target=target)
+    # Limite d'une requête Google Translate (5000 caractères) avec une marge
+    MAX_CHARS = 4500
+    # Séparateur entre les textes d'un lot : un marqueur numéroté que la traduction conserve.
+    # Le découpage du résultat est vérifié ; en cas de doute, le lot est retraduit texte par texte.
+    BATCH_MARKER = "\n⟦{index}⟧\n"
+    BATCH_MARKER_PATTERN = re.compile(r'\s*⟦\s*(\d+)\s*⟧\s*')
+    SENTENCE_END = re.compile(r'(?<=[.!?…])\s+')
+
+    def __init__(self, source: str = 'es', target: str = 'fr', max_workers: int = 4,
+                 requests_per_second: float = 5.0, cache: Optional[TranslationCache] = None):
+        self.source = source
+        self.target = target
+        # Mémoire de traduction persistante (optionnelle), consultée avant tout appel API
+        self.cache = cache
+        self.max_workers = max(1, max_workers)
+        # Débit global vers l'API (tous threads confondus)
+        self.rate_limiter = TokenBucket(requests_per_second, burst=self.max_workers)
+        # GoogleTranslator garde la requête en cours sur l'instance : une instance par thread
+        self._local = threading.local()
+        self.translator = self._get_translator()
+
+    def _get_translator(self) -> GoogleTranslator:
+        translator = getattr(self._local, 'translator', None)
+        if translator is None:
+            translator = self._local.translator = GoogleTranslator(source=self.source, target=self.target)
+        return translator
+
+    def _translate_request(self, text: str) -> str:
+        """Un appel API, soumis au limiteur de débit"""
+        self.rate_limiter.acquire()
+        return self._get_translator().translate(text)
+
+    @classmethod
+    def split_text(cls, text: str, limit: Optional[int] = None) -> List[str]:
+        """
+        Découpe un texte trop long en morceaux de moins de `limit` caractères,
+        en coupant de préférence entre paragraphes, puis entre phrases.
+        """
+        limit = limit or cls.MAX_CHARS
+        if len(text) <= limit:
+            return [text]
+
+        pieces = []
+        for paragraph in text.split('\n'):
+            if len(paragraph) <= limit:
+                pieces.append(paragraph)
+                continue
+            for sentence in cls.SENTENCE_END.split(paragraph):
+                # Dernier recours : coupe franche
+                pieces.extend(sentence[i:i + limit] for i in range(0, len(sentence), limit))
+
+        chunks, current = [], ""
+        for piece in pieces:
+            candidate = f"{current}\n{piece}" if current else piece
+            if len(candidate) <= limit:
+                current = candidate
+            else:
+                if current:
+                    chunks.append(current)
+                current = piece
+        if current:
+            chunks.append(current)
+        return chunks
 
     def translate_text(self, text: str) -> str:
         if not text or len(text.strip()) < 2:
             return text
 
+        if self.cache:
+            cached = self.cache.get(text, self.source, self.target)
+            if cached is not None:
+                return cached
+        return self._translate_uncached(text)
+
+    def _translate_uncached(self, text: str) -> str:
+        """Traduction via l'API (texte découpé si trop long) ; le succès est mémorisé"""
         try:
             # Split if text is too long (Google Translate limit is usually 5000 chars)
-            if len(text) > 4500:
-                chunks = [text[i:i+4500] for i in range(0, len(text), 4500)]
-                translated_chunks = []
-                for chunk in chunks:
-                    translated_chunks.append(self.translator.translate(chunk))
-                    time.sleep(0.5)
-                return " ".join(translated_chunks)
+            if len(text) > self.MAX_CHARS:
+                translated_chunks = [self._translate_request(chunk) for chunk in self.split_text(text)]
+                translation = "\n".join(translated_chunks)
             else:
-                return self.translator.translate(text)
+                translation = self._translate_request(text)
         except Exception as e:
             logging.error(f"Translation error: {e}")
             return f"[Erreur traduction] {text[:50]}..."
 
+        if self.cache and translation:
+            self.cache.put(text, translation, self.source, self.target)
+        return translation
+
+    def _pack_batches(self, texts: List[str]) -> List[List[int]]:
+        """
+        Regroupe les indices des textes courts en lots dont la taille (séparateurs compris)
+        reste sous MAX_CHARS. Les textes trop longs forment un lot à eux seuls.
+        """
+        batches, current, size = [], [], 0
+        for i, text in enumerate(texts):
+            cost = len(text) + len(self.BATCH_MARKER.format(index=len(current)))
+            if current and size + cost > self.MAX_CHARS:
+                batches.append(current)
+                current, size = [], 0
+            current.append(i)
+            size += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    def _translate_packed(self, texts: List[str]) -> List[str]:
+        """Traduit plusieurs textes en une requête ; retombe sur une requête par texte si besoin"""
+        if len(texts) == 1:
+            return [self._translate_uncached(texts[0])]
+
+        packed = "".join(
+            (self.BATCH_MARKER.format(index=i) if i else "") + text for i, text in enumerate(texts)
+        )
+        try:
+            translated = self._translate_request(packed)
+            parts = self.BATCH_MARKER_PATTERN.split(translated)
+            # parts = [texte0, "1", texte1, "2", texte2, ...]
+            indices = [int(n) for n in parts[1::2]]
+            if indices == list(range(1, len(texts))):
+                translations = [part.strip() for part in parts[0::2]]
+                if self.cache:
+                    self.cache.put_many(zip(texts, translations), self.source, self.target)
+                return translations
+            logging.warning("Séparateurs de lot altérés par la traduction, retraduction texte par texte")
+        except Exception as e:
+            logging.error(f"Batch translation error: {e}")
+
+        return [self._translate_uncached(text) for text in texts]
+
+    def translate_batch(self, texts: List[str], progress_callback=None) -> List[str]:
+        """
+        Traduit une liste de textes : les textes courts sont regroupés en lots d'une requête,
+        et plusieurs lots partent en parallèle (max_workers), sous le limiteur de débit.
+        progress_callback(done, total) est appelé pour chaque texte, depuis le thread appelant.
+        """
+        total = len(texts)
+        results: List[Optional[str]] = list(texts)
+        todo = [i for i, text in enumerate(texts) if text and len(text.strip()) >= 2]
+
+        # Mémoire de traduction : seuls les textes inconnus partent vers l'API
+        if self.cache and todo:
+            known = self.cache.get_many((texts[i] for i in todo), self.source, self.target)
+            for i in todo:
+                if texts[i] in known:
+                    results[i] = known[texts[i]]
+            todo = [i for i in todo if texts[i] not in known]
+
+        done = total - len(todo)
+        if progress_callback and done:
+            progress_callback(done, total)
+
+        # Un texte répété (signature, réponse type) n'est envoyé qu'une fois
+        occurrences: Dict[str, List[int]] = {}
+        for i in todo:
+            occurrences.setdefault(texts[i], []).append(i)
+        unique = list(occurrences)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._translate_packed, [unique[j] for j in batch]): batch
+                for batch in self._pack_batches(unique)
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                for j, translation in zip(batch, future.result()):
+                    for i in occurrences[unique[j]]:
+                        results[i] = translation
+                        done += 1
+                        if progress_callback:
+                            progress_callback(done, total)
+
+        return results
+
     def translate_posts(self, posts: List[dict], progress_callback=None) -> List[dict]:
         """
         Traduit une liste de posts (dictionnaires).
         Modifie les dictionnaires en place ou retourne une copie.
         """
         total = len(posts)
-        for i, post in enumerate(posts):
-            if not post.get('content_translated'): # Avoid re-translating
-                original = post.get('content_original', '')
-                post['content_translated'] = self.translate_text(original)
+        pending = [post for post in posts if not post.get('content_translated')] # Avoid re-translating
+        already_done = total - len(pending)
 
+        def batch_cb(done, _):
             if progress_callback:
-                progress_callback(i + 1, total)
+                progress_callback(already_done + done, total)
+
+        translations = self.translate_batch([post.get('content_original', '') for post in pending], batch_cb)
+        for post, translation in zip(pending, translations):
+            post['content_translated'] = translation
 
-            # Petit délai pour être gentil avec l'API gratuite
-            # time.sleep(0.2)
+        if progress_callback and not pending:
+            progress_callback(total, total)
 
         return posts
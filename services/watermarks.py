@@ -0,0 +1,26 @@
+from typing import Optional
+from jsonstore import JsonStore
+
+
+class WatermarkStore(JsonStore):
+    """
+    High-water marks par sujet : dernière page, dernier id et dernière date de post vus.
+    Persistés dans un fichier JSON pour que les extractions suivantes reprennent
+    là où la précédente s'est arrêtée (reset(topic_id) oublie la marque d'un sujet).
+    """
+
+    FILENAME = "watermarks.json"
+    LABEL = "Watermarks"
+
+    def get(self, topic_id: str) -> Optional[dict]:
+        with self._lock:
+            mark = self._data.get(topic_id)
+            return dict(mark) if mark else None
+
+    def update(self, topic_id: str, mark: Optional[dict]) -> None:
+        """Enregistre la marque d'un sujet (ignoré si mark est vide)"""
+        if not mark:
+            return
+        with self._lock:
+            self._data[topic_id] = dict(mark)
+            self._save()
@@ -0,0 +1,75 @@
+"""Découpage du corpus en blocs d'analyse : taille, nombre d'appels, stabilité pour le cache"""
+import random
+
+import pytest
+
+from services.analyzer import AnalyzerService
+
+MAX_TOKENS = 2000
+MAX_CHARS = MAX_TOKENS * 4
+WORDS = ["entrega", "precio", "pedido", "tienda", "problema", "gracias", "envío", "factura"]
+
+
+def make_posts(seed: int, n: int = 300) -> list:
+    rng = random.Random(seed)
+    return [{"id": f"p{i}", "author": f"usuario{rng.randint(0, 30)}", "date": f"2024-03-{i % 28 + 1:02d}T10:00:00",
+             "content_original": " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 400)))}
+            for i in range(n)]
+
+
+def greedy_count(text: str) -> int:
+    """Nombre de blocs d'un remplissage glouton (chaque bloc rempli au maximum)"""
+    count, size = 0, 0
+    for message in AnalyzerService.MESSAGE_BOUNDARY.split(text):
+        if size and size + len(message) > MAX_CHARS:
+            count, size = count + 1, 0
+        size += len(message)
+    return count + (1 if size else 0)
+
+
+def chunks_of(posts: list) -> list:
+    return AnalyzerService.chunk_text(AnalyzerService.format_posts_for_analysis(posts), MAX_TOKENS)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_chunks_cover_text_within_size(seed):
+    text = AnalyzerService.format_posts_for_analysis(make_posts(seed))
+    chunks = AnalyzerService.chunk_text(text, MAX_TOKENS)
+
+    assert "".join(chunks) == text
+    assert all(len(chunk) <= MAX_CHARS for chunk in chunks)
+
+
+def test_chunk_count_close_to_greedy_packing():
+    texts = [AnalyzerService.format_posts_for_analysis(make_posts(seed)) for seed in range(10)]
+    calls = sum(len(AnalyzerService.chunk_text(text, MAX_TOKENS)) for text in texts)
+
+    assert calls <= 1.25 * sum(greedy_count(text) for text in texts)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_inserted_post_changes_few_chunks(seed):
+    posts = make_posts(seed)
+    before = chunks_of(posts)
+    new_post = dict(posts[0], id="new", content_original="nuevo mensaje " * 40)
+    position = random.Random(seed).randint(0, len(posts))
+    after = chunks_of(posts[:position] + [new_post] + posts[position:])
+
+    # Les autres blocs sont repris tels quels (et donc depuis le cache d'analyse)
+    assert len(set(after) - set(before)) <= 10
+    assert len(set(after) & set(before)) >= len(before) - 10
+
+
+def test_small_text_stays_in_one_chunk():
+    text = AnalyzerService.format_posts_for_analysis(make_posts(0, n=3))
+    assert AnalyzerService.chunk_text(text, MAX_TOKENS) == [text]
+
+
+def test_oversize_message_is_split_with_header():
+    post = {"id": "p", "author": "ana", "date": "2024-03-01T10:00:00", "content_original": "palabra " * 3000}
+    header = AnalyzerService.format_post(post).partition("\n")[0]
+    chunks = AnalyzerService.chunk_text(AnalyzerService.format_posts_for_analysis([post] * 2), MAX_TOKENS)
+
+    assert len(chunks) > 2
+    assert all(len(chunk) <= MAX_CHARS for chunk in chunks)
+    assert chunks[1].startswith(f"{header} (suite)\n")
@@ -0,0 +1,56 @@
+"""DateParser : formes relatives et absolues, horaires sur 12 h"""
+from datetime import datetime
+
+import pytest
+
+from models.dates import DateParser
+
+NOW = datetime(2024, 5, 2, 12, 0)
+
+
+@pytest.fixture
+def parser():
+    return DateParser()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Hoy a las 10:30", datetime(2024, 5, 2, 10, 30)),
+    ("Ayer a las 23:15", datetime(2024, 5, 1, 23, 15)),
+    ("hace 5 minutos", datetime(2024, 5, 2, 11, 55)),
+    ("Today at 9:05 AM", datetime(2024, 5, 2, 9, 5)),
+    ("Yesterday at 10:00 PM", datetime(2024, 5, 1, 22, 0)),
+    ("Yesterday, 10:00 PM", datetime(2024, 5, 1, 22, 0)),
+    ("Yesterday, 12:30 AM", datetime(2024, 5, 1, 0, 30)),
+    ("Today, 12:10 PM", datetime(2024, 5, 2, 12, 10)),
+    ("Hier à 18:40", datetime(2024, 5, 1, 18, 40)),
+])
+def test_relative_dates(parser, text, expected):
+    assert parser.parse(text, now=NOW) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("12 de marzo de 2024", datetime(2024, 3, 12)),
+    ("12 de marzo de 2024, 10:05", datetime(2024, 3, 12, 10, 5)),
+    ("Mar 12, 2024 at 10:05 PM", datetime(2024, 3, 12, 22, 5)),
+    ("March 12, 2024, 10:05pm", datetime(2024, 3, 12, 22, 5)),
+    ("12 March 2024 7:45 a.m.", datetime(2024, 3, 12, 7, 45)),
+    ("March 12, 2024 12:05 AM", datetime(2024, 3, 12, 0, 5)),
+    ("12. März 2024", datetime(2024, 3, 12)),
+    ("12 mars", datetime(2024, 3, 12)),
+    ("2024-03-12T10:05:00", datetime(2024, 3, 12, 10, 5)),
+])
+def test_absolute_dates(parser, text, expected):
+    assert parser.parse(text, now=NOW) == expected
+
+
+def test_unreadable_date_falls_back_to_now(parser):
+    assert parser.parse("sin fecha", now=NOW) == NOW
+    assert parser.parse("", now=NOW) == NOW
+
+
+def test_absolute_only_for_self_contained_dates(parser):
+    assert parser.absolute("March 12, 2024, 10:05 PM") == datetime(2024, 3, 12, 22, 5)
+    assert parser.absolute("Yesterday at 10:00 PM") is None
+    assert parser.absolute("hace 3 horas") is None
+    assert parser.absolute("12 mars") is None
+    assert parser.absolute("sin fecha") is None
@@ -0,0 +1,72 @@
+"""Détection du type de forum : seules les détections sûres sur une réponse 200 sont mises en cache"""
+import pytest
+import requests
+
+from scrapers import detector
+from scrapers.detector import DetectionCache, detect_forum_type
+
+XENFORO_HTML = b'<html data-app="public"><body><div class="p-body">forum</div></body></html>'
+WEAK_XENFORO_HTML = b'<html><body><div class="p-body">xf-theme</div></body></html>'
+
+
+class FakeSession:
+    def __init__(self, status: int, body: bytes):
+        self.status, self.body = status, body
+        self.cookies = requests.cookies.RequestsCookieJar()
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = self.body
+        response.url = url
+        response.encoding = "utf-8"
+        return response
+
+
+class FakePool:
+    def __init__(self, session: FakeSession):
+        self.session = session
+
+    def get(self, url):
+        return self.session
+
+    def save_cookies(self):
+        pass
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = DetectionCache(str(tmp_path / "detections.json"))
+    monkeypatch.setattr(detector, "_detection_cache", cache)
+    return cache
+
+
+def detect(monkeypatch, url: str, status: int, body: bytes):
+    session = FakeSession(status, body)
+    monkeypatch.setattr(detector, "get_session_pool", lambda: FakePool(session))
+    return detect_forum_type(url), session
+
+
+def test_confident_detection_is_cached(cache, monkeypatch):
+    (forum_type, _), _ = detect(monkeypatch, "https://strong.test/t/1", 200, XENFORO_HTML)
+    assert forum_type == "xenforo"
+    assert cache.get("strong.test")["forum_type"] == "xenforo"
+
+    # Domaine connu : plus de requête
+    (forum_type, message), session = detect(monkeypatch, "https://strong.test/t/2", 200, b"")
+    assert forum_type == "xenforo" and "déjà connu" in message
+    assert session.calls == 0
+
+
+def test_weak_detection_is_not_cached(cache, monkeypatch):
+    (forum_type, message), _ = detect(monkeypatch, "https://weak.test/t/1", 200, WEAK_XENFORO_HTML)
+    assert (forum_type, message) == ("xenforo", detector.WEAK_XENFORO_MESSAGE)
+    assert cache.get("weak.test") is None
+
+
+def test_error_page_is_not_cached(cache, monkeypatch):
+    (forum_type, _), _ = detect(monkeypatch, "https://gone.test/t/1", 404, XENFORO_HTML)
+    assert forum_type == "xenforo"
+    assert cache.get("gone.test") is None
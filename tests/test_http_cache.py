@@ -0,0 +1,64 @@
+"""Cache HTTP : revalidation 304 et parsing mémorisé lié aux validateurs du corps"""
+import pytest
+import requests
+
+from scrapers.cache import HttpCache
+
+URL = "https://forum.example/threads/1/page-2"
+
+
+def response(status: int, body: str = "", **headers) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.url = URL
+    resp.encoding = "utf-8"
+    resp._content = body.encode("utf-8")
+    resp.headers.update(headers)
+    return resp
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HttpCache(str(tmp_path / "http_cache"))
+
+
+def test_200_with_validators_is_stored(cache):
+    cache.resolve(URL, None, response(200, "<html>v1</html>", ETag='"v1"'))
+    entry = cache.get(URL)
+    assert entry["body"] == "<html>v1</html>"
+    assert cache.conditional_headers(entry) == {"If-None-Match": '"v1"'}
+    assert cache.stats()["misses"] == 1
+
+
+def test_200_without_validators_is_not_stored(cache):
+    cache.resolve(URL, None, response(200, "<html>v1</html>"))
+    assert cache.get(URL) is None
+
+
+def test_304_serves_the_cached_body(cache):
+    cache.resolve(URL, None, response(200, "<html>v1</html>", ETag='"v1"'))
+    served = cache.resolve(URL, cache.get(URL), response(304, ETag='"v1"'))
+    assert served.status_code == 200
+    assert served.text == "<html>v1</html>"
+    assert served.from_cache
+    assert cache.stats() == {"hits": 1, "misses": 1, "bytes_saved": len("<html>v1</html>")}
+
+
+def test_parsed_posts_follow_the_body_validators(cache):
+    first = response(200, "<html>v1</html>", ETag='"v1"')
+    cache.resolve(URL, None, first)
+    cache.store_parsed(URL, "1", 3, [{"id": "p1"}], first)
+    assert cache.get_parsed(URL, "1", first) == {"total_pages": 3, "posts": [{"id": "p1"}]}
+
+    # Le corps a changé : les posts mémorisés ne valent plus pour la nouvelle version
+    second = response(200, "<html>v2</html>", ETag='"v2"')
+    cache.resolve(URL, cache.get(URL), second)
+    assert cache.get_parsed(URL, "1", second) is None
+    cache.store_parsed(URL, "1", 3, [{"id": "p1"}], first)
+    assert cache.get(URL)["parsed"] == {}
+
+
+def test_clear_removes_entries(cache):
+    cache.resolve(URL, None, response(200, "<html>v1</html>", ETag='"v1"'))
+    cache.clear()
+    assert cache.get(URL) is None
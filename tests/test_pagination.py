@@ -0,0 +1,97 @@
+"""Pagination de BaseScraper.scrape_all_pages : pages demandées, posts émis, watermark"""
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+
+from scrapers.base import BaseScraper
+
+SINCE = datetime(2000, 1, 1)
+
+
+class FakeScraper(BaseScraper):
+    """Sujet en mémoire : posts_per_page posts datés par page, 404 au-delà de la dernière page"""
+
+    def __init__(self, total_pages: int, posts_per_page: int = 3, **kwargs):
+        super().__init__(delay=0, **kwargs)
+        self.total_pages = total_pages
+        self.posts_per_page = posts_per_page
+        self.requested: List[int] = []
+
+    def post(self, page: int, index: int) -> dict:
+        n = (page - 1) * self.posts_per_page + index
+        return {"id": f"p{n}", "topic_id": "t", "date": (datetime(2024, 1, 1) + timedelta(days=n)).isoformat()}
+
+    def get_page_url(self, base_url: str, page_num: int) -> str:
+        return f"{base_url}/page-{page_num}"
+
+    def get_total_pages(self, root) -> int:
+        return self.total_pages
+
+    def parse_posts(self, root, topic_id: str) -> List[dict]:
+        return []
+
+    def _load_page(self, base_url: str, page: int, topic_id: str):
+        self.requested.append(page)
+        if page > self.total_pages:
+            return None, [], {"error": "404 Client Error", "page": page}
+        return self.total_pages, [self.post(page, i) for i in range(self.posts_per_page)], None
+
+
+def scrape(scraper: FakeScraper, **kwargs) -> List[dict]:
+    return list(scraper.scrape_all_pages("https://forum.test/t", "t", kwargs.pop("since_date", SINCE), **kwargs))
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_stops_at_detected_last_page(concurrency):
+    scraper = FakeScraper(total_pages=2, concurrency=concurrency)
+    posts = scrape(scraper, max_pages=10)
+
+    assert sorted(scraper.requested) == [1, 2]
+    assert not [p for p in posts if "error" in p]
+    assert [p["id"] for p in posts] == [f"p{n}" for n in range(6)]
+    assert scraper.watermark["last_page"] == 2
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_max_pages_is_an_upper_bound(concurrency):
+    scraper = FakeScraper(total_pages=10, concurrency=concurrency)
+    posts = scrape(scraper, max_pages=4)
+
+    assert sorted(scraper.requested) == [1, 2, 3, 4]
+    assert len(posts) == 12
+
+
+def test_watermark_resumes_after_last_seen_post():
+    first = FakeScraper(total_pages=3)
+    scrape(first)
+    watermark = first.watermark
+    assert watermark == {"last_page": 3, "last_post_id": "p8", "last_post_date": first.post(3, 2)["date"]}
+
+    # Deux pages de plus : seule la page de reprise est rechargée, puis les nouvelles
+    second = FakeScraper(total_pages=5)
+    posts = scrape(second, watermark=watermark)
+    assert second.requested == [3, 4, 5]
+    assert [p["id"] for p in posts] == [f"p{n}" for n in range(9, 15)]
+    assert second.watermark["last_page"] == 5
+
+
+def test_watermark_past_the_end_restarts_from_page_one():
+    scraper = FakeScraper(total_pages=3)
+    posts = scrape(scraper, watermark={"last_page": 7, "last_post_id": "p20"})
+
+    assert scraper.requested == [7, 1, 2, 3]
+    assert len(posts) == 9
+    assert scraper.watermark["last_page"] == 3
+
+
+def test_seek_skips_pages_before_since_date():
+    scraper = FakeScraper(total_pages=20)
+    since = datetime(2024, 1, 1) + timedelta(days=45)  # 1er post de la page 16
+    posts = scrape(scraper, since_date=since, seek=True, max_pages=20)
+
+    assert [p["id"] for p in posts][0] == "p45"
+    assert all(datetime.fromisoformat(p["date"]) >= since for p in posts)
+    # Recherche dichotomique : bien moins de requêtes que les 15 pages sautées
+    assert len(scraper.requested) < 12
+    assert len(set(scraper.requested)) == len(scraper.requested)
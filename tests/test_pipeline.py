@@ -0,0 +1,58 @@
+"""Pipeline en flux : la marque d'un sujet n'est enregistrée qu'après l'écriture de tous ses lots"""
+import queue
+
+from services.pipeline import StreamingPipeline, _END, _TopicEnd
+
+MARK = {"date": "2024-03-12T10:30:00", "ids": ["p2"]}
+
+
+class FakeStore:
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.batches = []
+
+    def upsert_posts(self, posts, lang=None):
+        if posts[0]['id'] in self.fail_on:
+            raise RuntimeError("database is locked")
+        self.batches.append(posts)
+        return len(posts)
+
+
+class FakeMarks:
+    def __init__(self):
+        self.marks = {}
+
+    def update(self, topic_id, mark):
+        self.marks[topic_id] = mark
+
+
+def run_store_worker(store, items):
+    marks = FakeMarks()
+    pipeline = StreamingPipeline(store, translate_workers=1, watermarks=marks)
+    store_queue, events = queue.Queue(), queue.Queue()
+    for item in items + [_END]:
+        store_queue.put(item)
+    pipeline._store_worker(store_queue, events)
+    return marks.marks, [e for e in iter(events.get_nowait, _END)]
+
+
+def batch(post_id):
+    return [{"id": post_id, "topic_id": "t1"}], 0
+
+
+def test_mark_waits_for_batches_delivered_after_it():
+    marks, events = run_store_worker(FakeStore(), [batch("p1"), _TopicEnd("t1", MARK, 2), batch("p2")])
+    assert marks == {"t1": MARK}
+    assert [e["type"] for e in events] == ["stored", "stored"]
+
+
+def test_mark_not_committed_when_a_batch_is_missing():
+    marks, _ = run_store_worker(FakeStore(), [batch("p1"), _TopicEnd("t1", MARK, 2)])
+    assert marks == {}
+
+
+def test_mark_not_committed_after_a_storage_error():
+    marks, events = run_store_worker(FakeStore(fail_on={"p1"}),
+                                     [batch("p1"), batch("p2"), _TopicEnd("t1", MARK, 2)])
+    assert marks == {}
+    assert [e["type"] for e in events] == ["error", "stored"]
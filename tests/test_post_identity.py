@@ -0,0 +1,72 @@
+"""Identité des posts sans id natif : un re-scrape de la même page donne les mêmes ids"""
+from datetime import datetime
+
+import pytest
+from bs4 import BeautifulSoup
+
+import models.post
+from models.dates import DateParser
+from models.post import Post
+from scrapers import fastparse
+from scrapers.vbulletin import VBulletinScraper
+from scrapers.xenforo import XenForoScraper
+
+
+class FixedNowParser(DateParser):
+    """Parseur dont « maintenant » est fixé : simule un run à un autre moment"""
+
+    def __init__(self, now: datetime):
+        super().__init__()
+        self.now = now
+
+    def parse(self, date_str, now=None):
+        return super().parse(date_str, now=self.now)
+
+
+XENFORO_PAGE = """<html><body>
+<article class="message"><a class="username">ana</a>
+  <time>Hoy a las 10:30</time><div class="bbWrapper">Primer mensaje</div></article>
+<article class="message"><a class="username">ana</a>
+  <time>hace 3 horas</time><div class="bbWrapper">Segundo mensaje</div></article>
+<article class="message"><a class="username">luis</a>
+  <time datetime="2024-03-12T10:05:00+0100">12 Mar 2024</time><div class="bbWrapper">Tercero</div></article>
+</body></html>"""
+
+VBULLETIN_PAGE = """<html><body><ol id="posts">
+<li class="postbit"><div class="posthead"><span class="date">Yesterday, 10:00 PM</span></div>
+  <a class="username">ana</a><div class="content">Primer mensaje</div></li>
+<li class="postbit"><div class="posthead"><span class="date">12 de marzo de 2024, 10:05</span></div>
+  <a class="username">luis</a><div class="content">Segundo mensaje</div></li>
+</ol></body></html>"""
+
+
+def scrape_ids(monkeypatch, scraper, html: str, now: datetime, fast: bool):
+    monkeypatch.setattr(models.post, "default_parser", FixedNowParser(now))
+    root = fastparse.build_tree(html) if fast else BeautifulSoup(html, "lxml")
+    return [post["id"] for post in scraper.parse_posts(root, "topic-1")]
+
+
+@pytest.mark.parametrize("fast", [False, True])
+@pytest.mark.parametrize("scraper, html", [(XenForoScraper(), XENFORO_PAGE), (VBulletinScraper(), VBULLETIN_PAGE)])
+def test_rescrape_keeps_ids(monkeypatch, scraper, html, fast):
+    first = scrape_ids(monkeypatch, scraper, html, datetime(2024, 5, 2, 12, 0), fast)
+    # Le lendemain, les dates relatives s'analysent autrement
+    second = scrape_ids(monkeypatch, scraper, html, datetime(2024, 5, 3, 18, 41), fast)
+
+    assert first == second
+    assert len(set(first)) == len(first)
+    assert all(post_id.startswith("h-") for post_id in first)
+
+
+def test_content_id_keeps_absolute_dates():
+    same_text = ("t", "ana", "12 de marzo de 2024", "Hola")
+    assert Post.content_id(*same_text) == Post.content_id("t", "ana", "12 de marzo de 2024 ", "Hola")
+    assert Post.content_id(*same_text) != Post.content_id("t", "ana", "13 de marzo de 2024", "Hola")
+    # Chaîne ISO ou datetime déjà analysé : même clé
+    assert (Post.content_id("t", "ana", "2024-03-12T10:05:00", "Hola")
+            == Post.content_id("t", "ana", datetime(2024, 3, 12, 10, 5), "Hola"))
+
+
+def test_content_id_ignores_relative_dates():
+    assert Post.content_id("t", "ana", "Hoy a las 10:30", "Hola") == Post.content_id("t", "ana", "", "Hola")
+    assert Post.content_id("t", "ana", "hace 3 horas", "Hola") == Post.content_id("t", "ana", None, "Hola")
@@ -0,0 +1,42 @@
+"""PostStore : fusion des re-scrapes et suppression d'un sujet"""
+import pytest
+
+from services.post_store import PostStore
+
+
+def make_post(topic_id: str, n: int, content: str) -> dict:
+    return {"id": f"{topic_id}-{n}", "topic_id": topic_id, "author": "ana",
+            "date": f"2024-03-{n + 1:02d}T10:00:00", "content_original": content}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PostStore(str(tmp_path / "posts.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_rescrape_merges_posts(store):
+    posts = [make_post("a", n, f"mensaje {n} sobre la entrega") for n in range(3)]
+    store.upsert_posts(posts)
+    store.save_translations([dict(posts[0], content_translated="message 0 sur la livraison")], lang="fr")
+
+    store.upsert_posts(posts + [make_post("a", 3, "mensaje nuevo")])
+
+    assert store.count_posts("a") == 4
+    assert store.get_posts("a", limit=1)[0]["content_translated"] == "message 0 sur la livraison"
+
+
+def test_delete_topic_removes_posts_and_search_rows(store):
+    store.upsert_posts([make_post("a", n, "problema con la entrega") for n in range(3)])
+    store.upsert_posts([make_post("b", n, "problema con la factura") for n in range(2)])
+    assert store.search("problema")[0] == 5
+
+    store.delete_topic("a")
+
+    assert store.count_posts("a") == 0
+    assert store.topic_counts() == {"b": 2}
+    total, results = store.search("problema")
+    assert total == 2
+    assert {post["topic_id"] for post in results} == {"b"}
+    assert store.search("entrega") == (0, [])
@@ -0,0 +1,74 @@
+"""Politique de retry : Retry-After, épuisement des tentatives et ouverture du circuit"""
+import pytest
+import requests
+
+from scrapers import retry
+from scrapers.retry import CircuitBreaker, CircuitOpenError, RetryPolicy, request_with_retry
+
+URL = "https://forum.example/threads/1"
+
+
+def response(status: int, retry_after=None) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    if retry_after is not None:
+        resp.headers["Retry-After"] = str(retry_after)
+    return resp
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(retry.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_retry_after_only_for_429_and_503():
+    assert RetryPolicy.retry_after(response(429, 12)) == 12.0
+    assert RetryPolicy.retry_after(response(503, "Wed, 21 Oct 2015 07:28:00 GMT")) == 0.0
+    assert RetryPolicy.retry_after(response(500, 12)) is None
+    assert RetryPolicy.retry_after(response(429, "bientôt")) is None
+
+
+def test_short_retry_after_is_waited(no_sleep):
+    policy = RetryPolicy(max_retries=3, base_delay=0.1, max_delay=30.0)
+    responses = iter([response(429, 5), response(200)])
+    result = request_with_retry(URL, lambda: next(responses), policy)
+    assert result.status_code == 200
+    assert no_sleep == [5.0]
+
+
+def test_retries_stop_after_max_retries(no_sleep):
+    policy = RetryPolicy(max_retries=2, base_delay=0.1, max_delay=1.0)
+    calls = []
+    result = request_with_retry(URL, lambda: calls.append(1) or response(502), policy)
+    assert result.status_code == 502
+    assert len(calls) == 3
+    assert len(no_sleep) == 2
+
+
+def test_long_retry_after_trips_the_circuit(no_sleep):
+    policy = RetryPolicy(max_retries=3, base_delay=0.1, max_delay=30.0)
+    breaker = CircuitBreaker(failure_threshold=10)
+    result = request_with_retry(URL, lambda: response(429, 600), policy, breaker)
+    assert result.status_code == 429
+    assert no_sleep == []
+    with pytest.raises(CircuitOpenError):
+        request_with_retry(URL, lambda: response(200), policy, breaker)
+
+
+def test_circuit_closes_after_a_successful_probe(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(retry.time, "monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=60.0)
+    breaker.record_failure(URL)
+    breaker.record_failure(URL)
+    with pytest.raises(CircuitOpenError):
+        breaker.allow(URL)
+
+    clock[0] += 61
+    breaker.allow(URL)  # Requête d'essai
+    with pytest.raises(CircuitOpenError):
+        breaker.allow(URL)  # Une seule à la fois
+    breaker.record_success(URL)
+    breaker.allow(URL)
@@ -0,0 +1,46 @@
+"""États JSON persistés (JsonStore) et posts postérieurs à une marque"""
+from datetime import datetime
+
+from models.post import posts_after_mark
+from services.analysis_state import AnalysisStateStore
+from services.watermarks import WatermarkStore
+
+
+def test_watermarks_persist_between_instances(tmp_path):
+    path = str(tmp_path / "watermarks.json")
+    WatermarkStore(path).update("a", {"last_page": 3, "last_post_id": "p8"})
+    WatermarkStore(path).update("b", {"last_page": 1})
+
+    marks = WatermarkStore(path)
+    assert marks.get("a") == {"last_page": 3, "last_post_id": "p8"}
+    marks.reset("a")
+    assert WatermarkStore(path).get("a") is None
+    assert WatermarkStore(path).get("b") == {"last_page": 1}
+
+
+def test_unreadable_file_starts_empty(tmp_path):
+    path = tmp_path / "analysis_state.json"
+    path.write_text("{tronqué", encoding="utf-8")
+
+    states = AnalysisStateStore(str(path))
+    assert states.get("a") is None
+    states.update("a", "resumen", [{"id": "p1", "date": "2024-03-01T10:00:00"}], "k")
+    assert AnalysisStateStore(str(path)).get("a")["last_post_id"] == "p1"
+
+
+POSTS = [{"id": f"p{n}", "date": datetime(2024, 3, n + 1, 10).isoformat()} for n in range(5)]
+
+
+def test_posts_after_mark_cuts_after_last_seen_id():
+    assert [p["id"] for p in posts_after_mark(POSTS, {"last_post_id": "p2"})] == ["p3", "p4"]
+
+
+def test_posts_after_mark_falls_back_on_date():
+    # Dernier post vu supprimé depuis : comparaison sur la date
+    mark = {"last_post_id": "gone", "last_post_date": datetime(2024, 3, 3, 12).isoformat()}
+    posts = POSTS + [{"id": "undated", "date": "fecha ilegible"}]
+    assert [p["id"] for p in posts_after_mark(posts, mark)] == ["p3", "p4", "undated"]
+
+
+def test_posts_after_mark_without_mark_keeps_everything():
+    assert posts_after_mark(POSTS, {}) == POSTS